@@ -0,0 +1,60 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares the CPU time per 80 ms frame of predicting on many concurrent streams
+# one at a time (`Model.predict`) against predicting on all of them at once (`predict_streams`).
+#
+# Usage (from the repository root): python -m benchmarks.batching_benchmark --streams 1 8 32 128 --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.model import Model, predict_streams
+
+
+def run(n_streams: int, n_frames: int, model_kwargs: dict):
+    models = [Model(**model_kwargs) for _ in range(n_streams)]
+    audio = (np.random.default_rng(0).standard_normal((n_streams, n_frames*1280))*1000).astype(np.int16)
+
+    start = time.process_time()
+    for i in range(n_frames):
+        for mdl, stream in zip(models, audio):
+            mdl.predict(stream[i*1280:(i+1)*1280])
+    sequential = (time.process_time() - start)/(n_frames*n_streams)
+
+    for mdl in models:
+        mdl.reset()
+
+    start = time.process_time()
+    for i in range(n_frames):
+        predict_streams(models, [stream[i*1280:(i+1)*1280] for stream in audio])
+    batched = (time.process_time() - start)/(n_frames*n_streams)
+
+    return sequential, batched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--inference_framework", type=str, default="onnx")
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework=args.inference_framework)
+    print(f"{'streams':>8} {'sequential (ms/frame)':>22} {'batched (ms/frame)':>19} {'speedup':>8}")
+    for n in args.streams:
+        sequential, batched = run(n, args.frames, model_kwargs)
+        print(f"{n:>8} {sequential*1000:>22.3f} {batched*1000:>19.3f} {sequential/batched:>7.1f}x")
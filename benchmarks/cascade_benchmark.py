@@ -0,0 +1,70 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the CPU time per 80 ms frame of streaming prediction on mostly silent audio, with and without
+# the cascade that skips the embedding and wakeword models on silence (the `cascade` argument of `Model`),
+# and the largest difference between the scores of the frames that the cascade still computes.
+#
+# Usage (from the repository root): python -m benchmarks.cascade_benchmark --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.model import Model
+
+
+def get_audio(duration: int, speech_fraction: float, seed: int = 0):
+    """Creates quiet background noise, with loud 2 second bursts covering `speech_fraction` of the audio"""
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal(duration*16000)*20
+    n_bursts = int(duration*speech_fraction/2)
+    for start in rng.choice(duration//2, n_bursts, replace=False):
+        audio[start*32000:(start + 1)*32000] = rng.standard_normal(32000)*3000
+    return audio.astype(np.int16)
+
+
+def run(audio: np.ndarray, **kwargs):
+    model = Model(**kwargs)
+    scores = []
+    start = time.process_time()
+    for i in range(0, audio.shape[0] - 1280 + 1, 1280):
+        scores.append(list(model.predict(audio[i:i+1280]).values()))
+    elapsed = (time.process_time() - start)/len(scores)
+
+    return elapsed, np.array(scores)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--duration", type=int, default=120)
+    parser.add_argument("--speech_fraction", type=float, default=0.1)
+    parser.add_argument("--cascade", type=str, nargs="+", default=["energy", "vad"])
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework="onnx",
+                        melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path)
+    audio = get_audio(args.duration, args.speech_fraction)
+
+    full_time, full_scores = run(audio, **model_kwargs)
+    print(f"{'configuration':>16} {'CPU ms/frame':>13} {'computed frames':>16} {'max score diff':>15}")
+    print(f"{'no cascade':>16} {full_time*1000:>13.3f} {1:>16.1%} {0:>15.2e}")
+    for cascade in args.cascade:
+        cascade_time, cascade_scores = run(audio, cascade=cascade, **model_kwargs)
+        computed = np.any(cascade_scores != 0, axis=1)
+        diff = np.abs(cascade_scores - full_scores)[computed].max(initial=0)
+        print(f"{cascade:>16} {cascade_time*1000:>13.3f} {computed.mean():>16.1%} {diff:>15.2e}")
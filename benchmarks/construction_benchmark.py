@@ -0,0 +1,74 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time to create `Model` objects: the first one in a (new) process, which loads the models,
+# the next ones (e.g., one per stream of a server), and the first prediction of each, which computes
+# the initial feature buffer. The first object is timed in a separate process for each run.
+#
+# Usage (from the repository root): python -m benchmarks.construction_benchmark --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+from openwakeword.model import Model
+
+
+def time_construction(n_models: int, model_kwargs: dict):
+    """Returns the times to create models and predict on their first frame, in seconds"""
+    frame = np.zeros(1280, dtype=np.int16)
+    times = []
+    for _ in range(n_models):
+        start = time.perf_counter()
+        mdl = Model(**model_kwargs)
+        created = time.perf_counter()
+        mdl.predict(frame)
+        times.append((created - start, time.perf_counter() - created))
+
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--inference_framework", type=str, default="onnx")
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--models", type=int, default=20, help="The number of models to create after the first one")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework=args.inference_framework,
+                        melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path)
+    if args.child:
+        print(json.dumps(time_construction(1 + args.models, model_kwargs)))
+        sys.exit(0)
+
+    # Run each measurement in a new process, so that the first model is created with nothing loaded
+    cold, warm = [], []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.construction_benchmark", "--child"] + sys.argv[1:],
+                                check=True, capture_output=True, text=True).stdout
+        times = json.loads(output.strip().splitlines()[-1])
+        cold.append(times[0])
+        warm.extend(times[1:])
+
+    print(f"{'':>14} {'create (ms)':>12} {'first predict (ms)':>19}")
+    for name, times in [("first model", cold), ("next models", warm)]:
+        create, first_predict = np.median(np.array(times), axis=0)*1000
+        print(f"{name:>14} {create:>12.2f} {first_predict:>19.2f}")
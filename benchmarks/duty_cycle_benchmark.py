@@ -0,0 +1,76 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the CPU time per 80 ms frame of streaming prediction with duty cycling of the wakeword models
+# (the `duty_cycle` argument of `Model`), and the added detection latency: for every frame where the score
+# at full rate first reaches the threshold, the number of frames until the duty cycled score reaches it.
+#
+# Usage (from the repository root): python -m benchmarks.duty_cycle_benchmark --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.model import Model
+
+
+def get_audio(duration: int, seed: int = 0):
+    """Creates quiet background noise, with a loud 2 second burst every 10 seconds"""
+    rng = np.random.default_rng(seed)
+    audio = rng.standard_normal(duration*16000)*20
+    for start in range(5, duration - 2, 10):
+        audio[start*16000:(start + 2)*16000] = rng.standard_normal(32000)*3000
+    return audio.astype(np.int16)
+
+
+def run(audio: np.ndarray, **kwargs):
+    np.random.seed(0)  # the same initial features for every model
+    model = Model(**kwargs)
+    scores = []
+    start = time.process_time()
+    for i in range(0, audio.shape[0] - 1280 + 1, 1280):
+        scores.append(max(model.predict(audio[i:i+1280]).values()))
+    elapsed = (time.process_time() - start)/len(scores)
+
+    return elapsed, np.array(scores)
+
+
+def get_latencies(full_scores: np.ndarray, scores: np.ndarray, threshold: float):
+    """The frames until `scores` reach the threshold, after each frame where `full_scores` first reach it"""
+    crossings = np.where((full_scores[1:] >= threshold) & (full_scores[:-1] < threshold))[0] + 1
+    return np.array([np.argmax(scores[i:] >= threshold) for i in crossings if np.any(scores[i:] >= threshold)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--duration", type=int, default=120)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--duty_cycle_threshold", type=float, default=0.1)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework="onnx",
+                        melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path,
+                        duty_cycle_threshold=args.duty_cycle_threshold)
+    audio = get_audio(args.duration)
+
+    full_time, full_scores = run(audio, **model_kwargs)
+    print(f"{'duty cycle':>10} {'CPU ms/frame':>13} {'detections':>11} {'mean latency (ms)':>18} {'max latency (ms)':>17}")
+    for duty_cycle in [1, 2, 3]:
+        elapsed, scores = run(audio, duty_cycle=duty_cycle, **model_kwargs) if duty_cycle > 1 else (full_time, full_scores)
+        latencies = get_latencies(full_scores, scores, args.threshold)*80
+        print(f"{duty_cycle:>10} {elapsed*1000:>13.3f} {latencies.shape[0]:>11} "
+              f"{latencies.mean() if latencies.shape[0] else 0:>18.1f} {latencies.max(initial=0):>17.1f}")
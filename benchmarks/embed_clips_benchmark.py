@@ -0,0 +1,68 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the throughput (clips per second) and the peak memory use (of NumPy arrays) of `AudioFeatures.embed_clips`
+# for several numbers of threads, against calling the models one clip (melspectrogram) and one window (embedding)
+# at a time. Use longer clips (e.g., --clip_length 30) to see the memory use of the embedding windows.
+#
+# Usage (from the repository root): python -m benchmarks.embed_clips_benchmark --ncpu 1 2 4
+
+# Imports
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from openwakeword.utils import AudioFeatures
+
+
+def embed_clips_one_at_a_time(features: AudioFeatures, x: np.ndarray):
+    embeddings = []
+    for clip in x:
+        melspec = features._get_melspectrogram(clip)
+        embeddings.append([features._get_embeddings_from_melspec(melspec[i:i+76, :, None])
+                           for i in range(0, melspec.shape[0] - 75, 8)])
+    return np.array(embeddings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=256)
+    parser.add_argument("--clip_length", type=float, default=2.0, help="The length of the clips, in seconds")
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--ncpu", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    features = AudioFeatures(melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path)
+    x = (np.random.default_rng(0).standard_normal((args.clips, int(args.clip_length*16000)))*1000).astype(np.int16)
+    reference = embed_clips_one_at_a_time(features, x[0:8])
+
+    start = time.perf_counter()
+    embed_clips_one_at_a_time(features, x)
+    print(f"{'one at a time':>16} {args.clips/(time.perf_counter() - start):>10.1f} clips/s")
+
+    for ncpu in args.ncpu:
+        embeddings = features.embed_clips(x[0:8], batch_size=args.batch_size, ncpu=ncpu)  # also starts the threads
+        assert np.abs(embeddings - reference).max() < 1e-4
+
+        start = time.perf_counter()
+        features.embed_clips(x, batch_size=args.batch_size, ncpu=ncpu)
+        clips_per_second = args.clips/(time.perf_counter() - start)
+
+        tracemalloc.start()
+        features.embed_clips(x, batch_size=args.batch_size, ncpu=ncpu)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{f'embed_clips ({ncpu})':>16} {clips_per_second:>10.1f} clips/s {peak_memory/1e6:>10.1f} MB peak")
@@ -0,0 +1,79 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# A local stand-in for Deepgram's pre-recorded transcription endpoint (POST /v1/listen), for benchmarking
+# the speech-to-text path of server.py offline. Answers with a fixed transcript after a configurable latency,
+# processes audio as it is received (so chunked uploads benefit from streaming), and emulates the cost of
+# connection setup (DNS, TCP and TLS) by delaying the first request on each connection.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.fake_stt_server --port 8765
+#     DEEPGRAM_URL=http://localhost:8765/v1/listen python server.py
+
+# Imports
+import argparse
+import asyncio
+from aiohttp import web
+
+
+def create_app(latency: float = 0.1, real_time_factor: float = 0.1, connect_latency: float = 0.15,
+               transcript: str = "hello world"):
+    """
+    Creates the fake transcription app.
+
+    Args:
+        latency (float): The time taken to finalize a transcript once all of the audio has arrived, in seconds
+        real_time_factor (float): The processing time per second of audio, spent as the audio arrives
+        connect_latency (float): The additional time taken by the first request on a new connection
+        transcript (str): The transcript returned for every request
+
+    Returns:
+        aiohttp.web.Application: The app, with request and connection counts stored under "stats"
+    """
+    stats = {"requests": 0, "connections": 0}
+    seen_connections = set()
+
+    async def listen(request):
+        connection = id(request.transport)
+        if connection not in seen_connections:
+            seen_connections.add(connection)
+            stats["connections"] += 1
+            await asyncio.sleep(connect_latency)
+        stats["requests"] += 1
+
+        # Recognize audio as it arrives, so that chunked (streaming) uploads finish sooner
+        sample_rate = int(request.query.get("sample_rate", 16000))
+        async for chunk in request.content.iter_any():
+            await asyncio.sleep(len(chunk)/2/sample_rate*real_time_factor)
+
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "results": {"channels": [{"alternatives": [{"transcript": transcript, "confidence": 1.0}]}]}
+        })
+
+    app = web.Application(client_max_size=64*1024**2)
+    app["stats"] = stats
+    app.add_routes([web.post("/v1/listen", listen)])
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--real_time_factor", type=float, default=0.1)
+    parser.add_argument("--connect_latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.latency, args.real_time_factor, args.connect_latency), port=args.port)
@@ -0,0 +1,67 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time to compute melspectrograms with NumPy (`openwakeword.melspectrogram`) and with the
+# melspectrogram model (ONNX runtime, and the tflite runtime when it is installed), for one streaming
+# frame (1280 samples plus the 480 samples of overlap) and for batches of clips, and the largest difference
+# between the NumPy and model melspectrograms (after the /10 + 2 transform of `AudioFeatures`).
+#
+# Usage (from the repository root): python -m benchmarks.melspectrogram_benchmark
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.utils import AudioFeatures
+
+
+def time_per_call(f, x: np.ndarray, n_calls: int):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        f(x)
+    return (time.perf_counter() - start)/n_calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=64)
+    parser.add_argument("--clip_length", type=float, default=2.0, help="The length of the clips, in seconds")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    frontends = [("numpy", dict(melspec_frontend="numpy")), ("onnx", dict(inference_framework="onnx"))]
+    try:
+        import tflite_runtime.interpreter  # noqa: F401
+        frontends.append(("tflite", dict(inference_framework="tflite")))
+    except ImportError:
+        pass
+
+    rng = np.random.default_rng(0)
+    frame = (rng.standard_normal(1760)*1000).astype(np.int16)
+    clips = (rng.standard_normal((args.clips, int(args.clip_length*16000)))*1000).astype(np.int16)
+
+    results = {}
+    print(f"{'':>8} {'frame (us)':>12} {f'{args.clips} clips (ms)':>16} {'max difference':>15}")
+    for name, kwargs in frontends:
+        model_paths = {} if name == "tflite" else dict(melspec_model_path=args.melspec_model_path,
+                                                       embedding_model_path=args.embedding_model_path)
+        features = AudioFeatures(**model_paths, **kwargs)
+        results[name] = features._get_melspectrogram_streams(clips)
+
+        frame_time = time_per_call(features._get_melspectrogram, frame, args.calls)
+        clips_time = time_per_call(features._get_melspectrogram_streams, clips, max(1, args.calls//100))
+        difference = np.abs(results[name] - results["numpy"]).max()
+        print(f"{name:>8} {frame_time*1e6:>12.1f} {clips_time*1e3:>16.2f} {difference:>15.2e}")
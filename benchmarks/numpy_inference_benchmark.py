@@ -0,0 +1,93 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time to predict with wakeword models using NumPy (`openwakeword.numpy_inference`), ONNX runtime,
+# and the tflite runtime (when it is installed, and a .tflite version of the model exists), for one frame
+# and for batches of frames.
+#
+# Usage (from the repository root): python -m benchmarks.numpy_inference_benchmark --models path/to/model.onnx
+
+# Imports
+import argparse
+import os
+import time
+import numpy as np
+import openwakeword
+from openwakeword.numpy_inference import NumpyModel
+from openwakeword.sessions import session_registry
+
+
+def time_per_call(f, x: np.ndarray, n_calls: int):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        f(x)
+    return (time.perf_counter() - start)/n_calls
+
+
+def get_tflite_function(model_path: str):
+    """Returns a function predicting with the tflite version of the model, or None if it's not available"""
+    try:
+        import tflite_runtime.interpreter as tflite
+    except ImportError:
+        return None
+    if not os.path.exists(model_path.replace(".onnx", ".tflite")):
+        return None
+
+    interpreter = tflite.Interpreter(model_path=model_path.replace(".onnx", ".tflite"), num_threads=1)
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+
+    def predict(x):
+        if tuple(interpreter.get_input_details()[0]["shape"]) != x.shape:
+            interpreter.resize_tensor_input(input_index, x.shape, strict=False)
+            interpreter.allocate_tensors()
+        interpreter.set_tensor(input_index, x)
+        interpreter.invoke()
+        return [interpreter.get_tensor(output_index)]
+
+    return predict
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=openwakeword.get_pretrained_model_paths("onnx"))
+    parser.add_argument("--batch_sizes", nargs="+", type=int, default=[1, 8, 64])
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for model_path in args.models:
+        numpy_model = NumpyModel(model_path)
+        session = session_registry.acquire(model_path, dynamic_batch=True)
+        input_name = session.get_inputs()[0].name
+        input_shape = session.get_inputs()[0].shape[1:]
+        predict_functions = [
+            ("numpy", lambda x: numpy_model.run(None, {input_name: x})),
+            ("onnxruntime", lambda x: session.run(None, {input_name: x}))
+        ]
+        if get_tflite_function(model_path) is not None:
+            predict_functions.append(("tflite", get_tflite_function(model_path)))
+
+        print(f"\n{os.path.basename(model_path)} ({len(numpy_model.steps)} NumPy operations)")
+        print(f"{'':>12} " + " ".join(f"{f'batch {i} (us)':>15}" for i in args.batch_sizes))
+        for name, f in predict_functions:
+            times = []
+            for batch_size in args.batch_sizes:
+                x = rng.standard_normal([batch_size] + input_shape).astype(np.float32)
+                error = np.abs(f(x)[0] - session.run(None, {input_name: x})[0]).max()
+                assert error < 1e-4, f"The {name} predictions differ from ONNX runtime by {error}"
+                times.append(time_per_call(f, x, max(1, args.calls//batch_size)))
+            print(f"{name:>12} " + " ".join(f"{t*1e6:>15.1f}" for t in times))
+
+        session_registry.release(session)
@@ -0,0 +1,62 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares the time to score a long clip with `Model.predict_clip` (simulated streaming, one
+# prediction per 80 ms frame) against the offline `Model.predict_clip_vectorized`, and reports
+# the largest difference between their scores.
+#
+# Usage (from the repository root): python -m benchmarks.predict_clip_benchmark --minutes 10 --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.model import Model
+
+
+def run(minutes: float, model_kwargs: dict, batch_size: int = 1024):
+    clip = (np.random.default_rng(0).standard_normal(int(minutes*60*16000))*1000).astype(np.int16)
+
+    model = Model(**model_kwargs)
+    start = time.perf_counter()
+    streaming = model.predict_clip(clip)
+    streaming_time = time.perf_counter() - start
+
+    model = Model(**model_kwargs)
+    start = time.perf_counter()
+    vectorized = model.predict_clip_vectorized(clip, batch_size=batch_size)
+    vectorized_time = time.perf_counter() - start
+
+    max_difference = max(np.abs(np.array([p[lbl] for p in streaming]) - scores).max()
+                         for lbl, scores in vectorized.items())
+
+    return streaming_time, vectorized_time, max_difference
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--inference_framework", type=str, default="onnx")
+    parser.add_argument("--batch_size", type=int, default=1024)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework=args.inference_framework,
+                        melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path)
+    streaming_time, vectorized_time, max_difference = run(args.minutes, model_kwargs, args.batch_size)
+    print(f"predict_clip:             {streaming_time:.2f} s")
+    print(f"predict_clip_vectorized:  {vectorized_time:.2f} s ({streaming_time/vectorized_time:.1f}x faster)")
+    print(f"max score difference:     {max_difference:.2e}")
@@ -0,0 +1,76 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time per 80 ms frame of `Model.predict` with several wakeword models and the `patience`
+# argument, and the overhead: the part of it spent outside of the feature extraction and the wakeword models
+# (mapping the scores to labels, the prediction buffer, and the patience check).
+#
+# Usage (from the repository root): python -m benchmarks.predict_overhead_benchmark --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from openwakeword.model import Model
+
+
+def run(model_paths: list, n_frames: int, **kwargs):
+    model = Model(wakeword_models=model_paths, **kwargs)
+    names = list(model.models.keys())
+    patience = {name: 3 for name in names}
+    threshold = {name: 0.5 for name in names}
+    audio = (np.random.default_rng(0).standard_normal(n_frames*1280)*1000).astype(np.int16)
+
+    total, preprocessor = 0.0, 0.0
+    for i in range(n_frames):
+        start = time.perf_counter()
+        _, timing = model.predict(audio[i*1280:(i+1)*1280], patience=patience, threshold=threshold, timing=True)
+        total += time.perf_counter() - start
+        preprocessor += timing["models"]["preprocessor"]
+
+    # The time of the wakeword models alone, on the same features
+    start = time.perf_counter()
+    for i in range(n_frames):
+        for name in names:
+            model.model_prediction_function[name](model.preprocessor.get_features(model.model_inputs[name]))
+    inference = time.perf_counter() - start
+
+    return total/n_frames, (total - preprocessor - inference)/n_frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--n_models", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    print(f"{'models':>6} {'ms/frame':>9} {'overhead ms/frame':>18}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_models in args.n_models:
+            # Load copies of the model under different names
+            model_paths = []
+            for i in range(n_models):
+                model_paths.append(os.path.join(tmp_dir, f"model_{i}.onnx"))
+                shutil.copy(args.model, model_paths[-1])
+
+            frame_time, overhead = run(model_paths, args.frames, inference_framework="onnx",
+                                       melspec_model_path=args.melspec_model_path,
+                                       embedding_model_path=args.embedding_model_path)
+            print(f"{n_models:>6} {frame_time*1000:>9.3f} {overhead*1000:>18.3f}")
@@ -0,0 +1,76 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Quantizes copies of the embedding model and a wakeword model, and compares the time per 80 ms frame of
+# the original and quantized models. If clips are provided, also runs the accuracy checks of
+# `openwakeword.quantize.evaluate_quantized_models`.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.quantization_benchmark --model "ALEKS!!.onnx" --positive_clips clips/positive --negative_clips clips/negative
+
+# Imports
+import argparse
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+import numpy as np
+from openwakeword.model import Model
+from openwakeword import quantize
+
+
+def frame_time(model_kwargs: dict, n_frames: int):
+    model = Model(**model_kwargs)
+    audio = (np.random.default_rng(0).standard_normal(n_frames*1280)*1000).astype(np.int16)
+    start = time.process_time()
+    for i in range(n_frames):
+        model.predict(audio[i*1280:(i+1)*1280])
+    return (time.process_time() - start)/n_frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--embedding_model_path", type=str,
+                        default=os.path.join("openwakeword", "resources", "models", "embedding_model.onnx"))
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--method", type=str, default="dynamic")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--positive_clips", type=str, default="")
+    parser.add_argument("--negative_clips", type=str, default="")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = shutil.copy(args.model, tmp_dir)
+        embedding_model_path = shutil.copy(args.embedding_model_path, tmp_dir)
+        positive_clips = sorted(str(i) for i in pathlib.Path(args.positive_clips).glob("*.wav")) if args.positive_clips else []
+        negative_clips = sorted(str(i) for i in pathlib.Path(args.negative_clips).glob("*.wav")) if args.negative_clips else []
+        quantize.quantize_models([model_path], embedding_model_path, method=args.method,
+                                 calibration_clips=positive_clips + negative_clips, melspec_model_path=args.melspec_model_path)
+
+        model_kwargs = dict(wakeword_models=[model_path], inference_framework="onnx",
+                            embedding_model_path=embedding_model_path, melspec_model_path=args.melspec_model_path)
+        original = frame_time(model_kwargs, args.frames)
+        quantized = frame_time(dict(model_kwargs, quantized=True), args.frames)
+        print(f"original:   {original*1000:.3f} ms/frame")
+        print(f"quantized:  {quantized*1000:.3f} ms/frame ({original/quantized:.2f}x)")
+
+        if positive_clips or negative_clips:
+            results = quantize.evaluate_quantized_models([model_path], positive_clips, negative_clips,
+                                                         embedding_model_path=embedding_model_path,
+                                                         melspec_model_path=args.melspec_model_path)
+            for label, result in results.items():
+                print(f"{label}: max score drift {result['max_score_drift']:.4f}, "
+                      f"mean score drift {result['mean_score_drift']:.5f}, passed: {result['passed']}")
@@ -0,0 +1,69 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Compares resampling a stream to 16 khz chunk by chunk with `resampy` (a new filter for every
+# chunk, as server.py used to do) against the stateful `StreamingResampler`, measuring the time per
+# 80 ms chunk and the error against resampling the whole signal at once.
+#
+# Usage (from the repository root): python -m benchmarks.resampling_benchmark --rates 44100 48000
+
+# Imports
+import argparse
+import time
+import numpy as np
+import resampy
+import scipy.signal
+from openwakeword.resample import StreamingResampler
+
+
+def test_signal(rate: int, seconds: float):
+    t = np.arange(int(rate*seconds))/rate
+    rng = np.random.default_rng(0)
+    x = 8000*np.sin(2*np.pi*440*t) + 3000*np.sin(2*np.pi*2500*t) + 500*rng.standard_normal(t.shape[0])
+    return x.astype(np.int16)
+
+
+def run(rate: int, seconds: float):
+    x = test_signal(rate, seconds)
+    chunk_size = int(0.08*rate)
+    chunks = [x[i:i+chunk_size] for i in range(0, x.shape[0], chunk_size)]
+    divisor = np.gcd(rate, 16000)
+    reference = scipy.signal.resample_poly(x.astype(np.float64), 16000//divisor, rate//divisor)
+
+    start = time.perf_counter()
+    per_chunk = np.concatenate([resampy.resample(c, rate, 16000).astype(np.int16) for c in chunks])
+    resampy_time = (time.perf_counter() - start)/len(chunks)
+
+    resampler = StreamingResampler(rate, 16000)
+    start = time.perf_counter()
+    streaming = np.concatenate([resampler(c) for c in chunks])
+    streaming_time = (time.perf_counter() - start)/len(chunks)
+
+    def rms_error(y):
+        n = min(y.shape[0], reference.shape[0])
+        return np.sqrt(np.mean((y[:n] - reference[:n])**2))
+
+    return resampy_time, rms_error(per_chunk), streaming_time, rms_error(streaming)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=int, nargs="+", default=[44100, 48000])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'rate':>6} {'resampy (ms/chunk)':>19} {'resampy rms err':>16} {'streaming (ms/chunk)':>21} {'streaming rms err':>18}")
+    for rate in args.rates:
+        resampy_time, resampy_err, streaming_time, streaming_err = run(rate, args.seconds)
+        print(f"{rate:>6} {resampy_time*1000:>19.3f} {resampy_err:>16.1f} {streaming_time*1000:>21.3f} {streaming_err:>18.1f}")
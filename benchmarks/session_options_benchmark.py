@@ -0,0 +1,81 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the cold start time (creating a `Model` in a new process) and the time per 80 ms frame
+# with different ONNX runtime session options, with and without the cache of optimized models.
+#
+# Usage (from the repository root): python -m benchmarks.session_options_benchmark --model "ALEKS!!.onnx"
+
+# Imports
+import argparse
+import multiprocessing
+import tempfile
+import time
+import numpy as np
+
+
+def cold_start(model_kwargs: dict, session_options: dict, n_frames: int):
+    from openwakeword.model import Model
+    from openwakeword.sessions import session_registry
+
+    session_registry.configure(**session_options)
+    start = time.perf_counter()
+    model = Model(**model_kwargs)
+    load_time = time.perf_counter() - start
+
+    audio = (np.random.default_rng(0).standard_normal(n_frames*1280)*1000).astype(np.int16)
+    start = time.perf_counter()
+    for i in range(n_frames):
+        model.predict(audio[i*1280:(i+1)*1280])
+    frame_time = (time.perf_counter() - start)/n_frames
+
+    return load_time, frame_time
+
+
+def run(model_kwargs: dict, session_options: dict, n_frames: int, repeats: int):
+    # Use a new process for each run, so that nothing is already loaded
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for _ in range(repeats):
+        with context.Pool(1) as pool:
+            results.append(pool.apply(cold_start, (model_kwargs, session_options, n_frames)))
+
+    return np.median(np.array(results), axis=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="ALEKS!!.onnx")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    model_kwargs = dict(wakeword_models=[args.model], inference_framework="onnx",
+                        melspec_model_path=args.melspec_model_path, embedding_model_path=args.embedding_model_path)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        configurations = {
+            "defaults": {},
+            "optimization level basic": dict(optimization_level="basic"),
+            "no memory arena": dict(enable_cpu_mem_arena=False),
+            "no spinning": dict(allow_spinning=False),
+            "cache (first start)": dict(cache_dir=cache_dir),
+            "cache (later starts)": dict(cache_dir=cache_dir),
+        }
+        print(f"{'configuration':>24} {'cold start (ms)':>16} {'ms/frame':>9}")
+        for name, session_options in configurations.items():
+            repeats = 1 if name == "cache (first start)" else args.repeats
+            load_time, frame_time = run(model_kwargs, session_options, args.frames, repeats)
+            print(f"{name:>24} {load_time*1000:>16.1f} {frame_time*1000:>9.3f}")
@@ -0,0 +1,70 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time and memory allocations per 80 ms frame of the streaming feature extraction
+# in `AudioFeatures` (raw audio buffering, melspectrogram, embeddings, and feature history).
+#
+# Usage (from the repository root): python -m benchmarks.streaming_features_benchmark --frames 2000
+
+# Imports
+import argparse
+import time
+import tracemalloc
+import numpy as np
+from openwakeword.utils import AudioFeatures
+
+
+def run(n_frames: int, chunk_size: int, **kwargs):
+    features = AudioFeatures(**kwargs)
+    audio = (np.random.default_rng(0).standard_normal(n_frames*chunk_size)*1000).astype(np.int16)
+    chunks = [audio[i:i+chunk_size] for i in range(0, audio.shape[0], chunk_size)]
+
+    # Fill all of the buffers before measuring
+    for chunk in chunks[:200]:
+        features(chunk)
+
+    start = time.perf_counter()
+    for chunk in chunks:
+        features(chunk)
+        features.get_features(16)
+    elapsed = (time.perf_counter() - start)/len(chunks)
+
+    # Peak memory allocated while processing each frame, above what was in use before it
+    tracemalloc.start()
+    transient = []
+    for chunk in chunks[:200]:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        features(chunk)
+        features.get_features(16)
+        transient.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return elapsed, np.mean(transient)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--chunk_size", type=int, default=1280)
+    parser.add_argument("--inference_framework", type=str, default="onnx")
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    elapsed, transient = run(args.frames, args.chunk_size, inference_framework=args.inference_framework,
+                             melspec_model_path=args.melspec_model_path,
+                             embedding_model_path=args.embedding_model_path)
+    print(f"time per frame:       {elapsed*1000:.3f} ms")
+    print(f"allocated per frame:  {transient/1024:.1f} KB")
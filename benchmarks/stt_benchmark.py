@@ -0,0 +1,102 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the latency (from the end of speech to the transcript) and throughput of transcription
+# requests against the local fake speech-to-text server, comparing a new HTTP session per utterance,
+# the persistent pooled session used by `server.DeepgramSTT`, and streaming the audio in real time
+# while the utterance is being spoken.
+#
+# Usage (from the repository root): python -m benchmarks.stt_benchmark --utterances 200 --concurrency 16
+
+# Imports
+import argparse
+import asyncio
+import time
+import aiohttp
+import numpy as np
+from aiohttp import web
+
+import server
+from benchmarks.fake_stt_server import create_app
+
+
+class PerRequestSessionSTT(server.DeepgramSTT):
+    """The previous behaviour: a new HTTP session (and connection) for every utterance"""
+    async def transcribe(self, audio_bytes: bytes) -> str:
+        async with aiohttp.ClientSession(headers=self.session.headers) as session:
+            async with session.post(self.url, params=self.params, data=audio_bytes) as resp:
+                result = await resp.json()
+        return result["results"]["channels"][0]["alternatives"][0]["transcript"]
+
+
+async def run(backend: server.STTBackend, n_utterances: int, concurrency: int, seconds: float, streaming: bool = False):
+    audio = np.zeros(int(seconds*server.SAMPLE_RATE), dtype=np.int16).tobytes()
+    chunk_size = server.CHUNK_SIZE*2
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def utterance():
+        async with limit:
+            if streaming:
+                stream = backend.open_stream()
+                for i in range(0, len(audio), chunk_size):
+                    stream.send(audio[i:i+chunk_size])
+                    await asyncio.sleep(server.CHUNK_SIZE/server.SAMPLE_RATE)
+                start = time.perf_counter()
+                await stream.finish()
+            else:
+                start = time.perf_counter()
+                await backend.transcribe(audio)
+            latencies.append(time.perf_counter() - start)
+
+    await backend.start()
+    start = time.perf_counter()
+    await asyncio.gather(*[utterance() for _ in range(n_utterances)])
+    elapsed = time.perf_counter() - start
+    await backend.close()
+
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), n_utterances/elapsed
+
+
+async def main(args):
+    runner = web.AppRunner(create_app(args.latency, args.real_time_factor, args.connect_latency))
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", args.port).start()
+    url = f"http://localhost:{args.port}/v1/listen"
+
+    # Note that streaming throughput is bounded by feeding the audio in real time
+    print(f"{'client':>12} {'p50 (ms)':>9} {'p95 (ms)':>9} {'utterances/s':>13}")
+    clients = [
+        ("per-request", PerRequestSessionSTT, False),
+        ("pooled", server.DeepgramSTT, False),
+        ("streaming", server.DeepgramSTT, True),
+    ]
+    for name, cls, streaming in clients:
+        backend = cls(url, "fake-key", timeout=30, max_concurrency=args.concurrency)
+        p50, p95, throughput = await run(backend, args.utterances, args.concurrency, args.seconds, streaming)
+        print(f"{name:>12} {p50*1000:>9.1f} {p95*1000:>9.1f} {throughput:>13.1f}")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration of each utterance")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--real_time_factor", type=float, default=0.1)
+    parser.add_argument("--connect_latency", type=float, default=0.15)
+    asyncio.run(main(parser.parse_args()))
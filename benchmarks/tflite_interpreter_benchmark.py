@@ -0,0 +1,101 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time to predict with the tflite melspectrogram and embedding models when the input shape changes
+# between calls (audio chunks of different lengths, and batches of different sizes), with one interpreter that is
+# resized (and reallocated) on each change, and with the shape-keyed interpreters of `interpreter_registry`.
+# Requires the tflite runtime (`pip install tflite-runtime`).
+#
+# Usage (from the repository root): python -m benchmarks.tflite_interpreter_benchmark
+
+# Imports
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+import openwakeword
+from openwakeword.sessions import interpreter_registry
+
+
+def time_per_call(f, inputs: list, n_calls: int):
+    """Times calls of `f` on the inputs in turn (so that the input shape changes on every call)"""
+    inputs = itertools.cycle(inputs)
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        f(next(inputs))
+    return (time.perf_counter() - start)/n_calls
+
+
+def get_resizing_function(model_path: str):
+    """Returns a function predicting with one interpreter, which is resized whenever the input shape changes"""
+    import tflite_runtime.interpreter as tflite
+
+    interpreter = tflite.Interpreter(model_path=model_path, num_threads=1)
+    interpreter.allocate_tensors()
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+
+    def predict(x):
+        if tuple(interpreter.get_input_details()[0]["shape"]) != x.shape:
+            interpreter.resize_tensor_input(input_index, list(x.shape), strict=False)
+            interpreter.allocate_tensors()
+        interpreter.set_tensor(input_index, x)
+        interpreter.invoke()
+        return interpreter.get_tensor(output_index)
+
+    return predict
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--melspec_sizes", type=int, nargs="+", default=[1760, 2240, 3200],
+                        help="The numbers of samples of the melspectrogram inputs")
+    parser.add_argument("--embedding_batch_sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--melspec_model_path", type=str, default="")
+    parser.add_argument("--embedding_model_path", type=str, default="")
+    args = parser.parse_args()
+
+    try:
+        import tflite_runtime.interpreter  # noqa: F401
+    except ImportError:
+        sys.exit("The tflite runtime was not found. Please install it using `pip install tflite-runtime`")
+
+    models_dir = os.path.join(os.path.dirname(openwakeword.__file__), "resources", "models")
+    melspec_model_path = args.melspec_model_path or os.path.join(models_dir, "melspectrogram.tflite")
+    embedding_model_path = args.embedding_model_path or os.path.join(models_dir, "embedding_model.tflite")
+
+    rng = np.random.default_rng(0)
+    benchmarks = [
+        ("melspectrogram", melspec_model_path,
+         [(rng.standard_normal((1, n))*1000).astype(np.float32) for n in args.melspec_sizes]),
+        ("embedding", embedding_model_path,
+         [rng.standard_normal((n, 76, 32, 1)).astype(np.float32) for n in args.embedding_batch_sizes])
+    ]
+
+    print(f"{'':>16} {'resized (us)':>13} {'registry (us)':>14} {'speedup':>8}")
+    for name, model_path, inputs in benchmarks:
+        resizing_predict = get_resizing_function(model_path)
+
+        def registry_predict(x):
+            return interpreter_registry.predict(model_path, x)
+
+        for x in inputs:
+            assert np.array_equal(resizing_predict(x), registry_predict(x))
+
+        resized_time = time_per_call(resizing_predict, inputs, args.calls)
+        registry_time = time_per_call(registry_predict, inputs, args.calls)
+        print(f"{name:>16} {resized_time*1e6:>13.1f} {registry_time*1e6:>14.1f} {resized_time/registry_time:>7.1f}x")
@@ -0,0 +1,53 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Measures the time to score custom verifier models with scikit-learn (`predict_proba` of the trained
+# pipeline) and with the converted `VerifierModel`, for single frames and for batches of frames.
+#
+# Usage (from the repository root): python -m benchmarks.verifier_benchmark
+
+# Imports
+import argparse
+import time
+import numpy as np
+from openwakeword.custom_verifier_model import VerifierModel, train_verifier_model
+
+
+def time_per_call(f, x: np.ndarray, n_calls: int):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        f(x)
+    return (time.perf_counter() - start)/n_calls
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n_frames", type=int, default=16)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Train a verifier on random features (the scoring time doesn't depend on the training data)
+    rng = np.random.default_rng(0)
+    features = rng.standard_normal((500, args.n_frames, 96)).astype(np.float32)
+    pipeline = train_verifier_model(features, (features[:, :, 0].mean(axis=1) > 0).astype(int))
+    verifier = VerifierModel.from_pipeline(pipeline)
+
+    x = rng.standard_normal((args.batch_size, args.n_frames, 96)).astype(np.float32)
+    print(f"max score difference: {np.abs(verifier.score(x) - pipeline.predict_proba(x)[:, -1]).max():.2e}")
+    print(f"{'':>14} {'1 frame (us)':>13} {f'{args.batch_size} frames (us)':>15}")
+    for name, f in [("scikit-learn", pipeline.predict_proba), ("VerifierModel", verifier.predict_proba)]:
+        single = time_per_call(f, x[0:1], args.calls)
+        batch = time_per_call(f, x, args.calls//10)
+        print(f"{name:>14} {single*1e6:>13.1f} {batch*1e6:>15.1f}")
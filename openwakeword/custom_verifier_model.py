@@ -19,7 +19,10 @@ import collections
 import openwakeword
 import numpy as np
 import scipy
+import scipy.special
 import pickle
+import logging
+import zipfile
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.pipeline import make_pipeline
@@ -76,7 +79,7 @@ def get_reference_clip_features(
             if predictions[model_name] >= threshold:
                 features = oww_model.preprocessor.get_features(  # type: ignore[has-type]
                     oww_model.model_inputs[model_name]           # type: ignore[has-type]
-                )
+                ).copy()
                 positive_data[model_name].append(features)
 
     if len(positive_data[model_name]) == 0:
@@ -111,6 +114,119 @@ def train_verifier_model(features: np.ndarray, labels: np.ndarray):
     return pipeline
 
 
+class VerifierModel():
+    """
+    A custom verifier model (a logistic regression on standardized, flattened audio features) in a compact
+    form that is scored with a single NumPy expression. The standardization is folded into the weights,
+    so the score of a batch of feature windows is `sigmoid(x @ weights + bias)`. The weights and the
+    product are float64, as the sum over the ~1500 features of a window loses too much precision in float32.
+
+    Verifier models are saved as `.npz` files (which, unlike pickled scikit-learn models, can be
+    loaded without executing code), and scikit-learn pipelines created by `train_verifier_model`
+    can be converted with `VerifierModel.from_pipeline`.
+    """
+    def __init__(self, weights: np.ndarray, bias: float):
+        """Initialize the verifier model.
+
+        Args:
+            weights (ndarray): The weights of each flattened feature, of shape (n_features, )
+            bias (float): The bias of the logistic regression
+        """
+        self.weights = np.asarray(weights, dtype=np.float64).reshape(-1)
+        self.bias = float(bias)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """
+        Converts a scikit-learn pipeline created by `train_verifier_model` (a FunctionTransformer of
+        `flatten_features`, an optional StandardScaler, and a binary LogisticRegression).
+
+        Args:
+            pipeline (sklearn.pipeline.Pipeline): The trained pipeline
+
+        Returns:
+            VerifierModel: The equivalent verifier model
+        """
+        steps = [step for _, step in pipeline.steps] if hasattr(pipeline, "steps") else [pipeline]
+        scalers = [i for i in steps if isinstance(i, StandardScaler)]
+        clf = steps[-1]
+        if not isinstance(clf, LogisticRegression) or clf.coef_.shape[0] != 1 or len(scalers) > 1 or \
+                any(not isinstance(i, (StandardScaler, FunctionTransformer)) for i in steps[:-1]):
+            raise ValueError("Only pipelines of a FunctionTransformer, StandardScaler, and a binary "
+                             "LogisticRegression (see `train_verifier_model`) can be converted!")
+
+        # The only feature transform that can be folded into the weights is the flattening of `train_verifier_model`
+        if any(isinstance(i, FunctionTransformer) and (i.func is not flatten_features or i.kw_args)
+               for i in steps[:-1]):
+            raise ValueError("Only pipelines whose FunctionTransformer is `flatten_features` (without keyword "
+                             "arguments) can be converted!")
+
+        # Fold the standardization, (x - mean)/scale, into the weights and bias
+        weights = clf.coef_[0].astype(np.float64)
+        bias = float(clf.intercept_[0])
+        if scalers != []:
+            mean = scalers[0].mean_ if scalers[0].mean_ is not None else np.zeros_like(weights)
+            scale = scalers[0].scale_ if scalers[0].scale_ is not None else np.ones_like(weights)
+            weights = weights/scale
+            bias -= float(np.dot(mean, weights))
+
+        return cls(weights, bias)
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads a verifier model saved with `VerifierModel.save`"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"])
+
+    def save(self, path: str):
+        """Saves the verifier model to an .npz file at exactly `path` (no extension is added)"""
+        with open(path, "wb") as f:
+            np.savez(f, weights=self.weights, bias=np.array(self.bias))
+
+    def score(self, x: np.ndarray):
+        """
+        Gets the verifier scores for a batch of feature windows.
+
+        Args:
+            x (ndarray): The features, of shape (N, n_frames, feature_dim)
+
+        Returns:
+            ndarray: The probability of the positive class for each window, of shape (N, )
+        """
+        return scipy.special.expit(np.asarray(x, dtype=np.float64).reshape(len(x), -1) @ self.weights + self.bias)
+
+    def predict_proba(self, x: np.ndarray):
+        """Gets the class probabilities for a batch of feature windows, like a scikit-learn classifier"""
+        p = self.score(x)
+        return np.stack((1 - p, p), axis=1)
+
+
+def load_verifier_model(path: str):
+    """
+    Loads a custom verifier model, either a `VerifierModel` saved as an .npz file or
+    a pickled scikit-learn pipeline (from older versions of openWakeWord), which is
+    converted to a `VerifierModel` when possible.
+
+    Note that pickled models can execute arbitrary code when loaded, so only load them from trusted sources.
+
+    Args:
+        path (str): The path of the verifier model
+
+    Returns:
+        VerifierModel: The verifier model (or the scikit-learn pipeline, if it can't be converted)
+    """
+    if zipfile.is_zipfile(path):
+        return VerifierModel.load(path)
+
+    with open(path, "rb") as f:
+        pipeline = pickle.load(f)
+    try:
+        return VerifierModel.from_pipeline(pipeline)
+    except (ValueError, AttributeError) as e:
+        logging.warning(f"Could not convert the custom verifier model '{path}', so it will be scored with scikit-learn: {e}")
+        return pipeline
+
+
 def train_custom_verifier(
         positive_reference_clips: str,
         negative_reference_clips: str,
@@ -127,7 +243,7 @@ def train_custom_verifier(
                                         of the target wake word/phrase.
         negative_reference_clips (str): The path to a directory containing single-channel 16khz, 16-bit WAV files
                                         of miscellaneous speech not containing the target wake word/phrase.
-        output_path (str): The location to save the trained verifier model (as a scikit-learn .joblib file)
+        output_path (str): The location to save the trained verifier model (as an .npz file, see `VerifierModel`)
         model_name (str): The name or path of the trained openWakeWord model that the verifier model will be
                           based on. If only a name, it must be one of the pre-trained models included in the
                           openWakeWord release.
@@ -170,5 +286,5 @@ def train_custom_verifier(
     )
 
     # Save logistic regression model to specified output location
+    VerifierModel.from_pipeline(lr_model).save(output_path)
     print("Done!")
-    pickle.dump(lr_model, open(output_path, "wb"))
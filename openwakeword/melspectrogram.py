@@ -0,0 +1,135 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import functools
+import numpy as np
+import scipy.fft
+
+# The parameters of the melspectrogram model (`resources/models/melspectrogram.onnx`), which was exported
+# from a torchlibrosa `Spectrogram` and `LogmelFilterBank`
+SAMPLE_RATE = 16000
+N_FFT = 512
+HOP_LENGTH = 160
+WIN_LENGTH = 400
+N_MELS = 32
+FMIN = 60
+FMAX = 3800
+AMIN = 1e-10
+
+
+def _hz_to_mel(f: np.ndarray) -> np.ndarray:
+    """Converts frequencies to the Slaney mel scale (linear below 1 kHz, and logarithmic above), like librosa"""
+    f = np.asarray(f, dtype=np.float64)
+    log_step = np.log(6.4)/27
+    return np.where(f >= 1000, 15 + np.log(np.maximum(f, 1e-10)/1000)/log_step, f/(200/3))
+
+
+def _mel_to_hz(m: np.ndarray) -> np.ndarray:
+    """The inverse of `_hz_to_mel`"""
+    m = np.asarray(m, dtype=np.float64)
+    log_step = np.log(6.4)/27
+    return np.where(m >= 15, 1000*np.exp(log_step*(m - 15)), m*(200/3))
+
+
+@functools.lru_cache(maxsize=8)
+def get_mel_filterbank(sr: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS,
+                       fmin: float = FMIN, fmax: float = FMAX):
+    """
+    Creates the triangular mel filters with Slaney normalization (the same as `librosa.filters.mel`
+    with its default arguments). Results are cached, so all objects share one filterbank.
+
+    Args:
+        sr (int): The sample rate of the audio
+        n_fft (int): The length of the FFT
+        n_mels (int): The number of mel bands
+        fmin (float): The lowest frequency of the filters, in Hz
+        fmax (float): The highest frequency of the filters, in Hz
+
+    Returns:
+        ndarray: The (read-only) filters, of shape (n_fft//2 + 1, n_mels)
+    """
+    fft_frequencies = np.linspace(0, sr/2, n_fft//2 + 1)
+    mel_frequencies = _mel_to_hz(np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2))
+
+    ramps = mel_frequencies[:, None] - fft_frequencies[None, :]
+    widths = np.diff(mel_frequencies)
+    lower = -ramps[:-2]/widths[:-1, None]
+    upper = ramps[2:]/widths[1:, None]
+    filters = np.maximum(0, np.minimum(lower, upper))
+    filters *= (2/(mel_frequencies[2:] - mel_frequencies[:-2]))[:, None]
+
+    filters = np.ascontiguousarray(filters.T, dtype=np.float32)
+    filters.flags.writeable = False
+    return filters
+
+
+@functools.lru_cache(maxsize=1)
+def _get_filterbank_bins():
+    """The range of FFT bins that the mel filters cover (from 60 Hz to 3800 Hz), and the filters over that range"""
+    bins = np.nonzero(get_mel_filterbank().any(axis=1))[0]
+    start, end = int(bins[0]), int(bins[-1]) + 1
+    return start, end, get_mel_filterbank()[start:end]
+
+
+@functools.lru_cache(maxsize=1)
+def _get_window():
+    """The periodic Hann window of the frames (the zero padding to `N_FFT` samples doesn't change the power spectrum)"""
+    window = (0.5 - 0.5*np.cos(2*np.pi*np.arange(WIN_LENGTH)/WIN_LENGTH)).astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+def melspectrogram(x: np.ndarray) -> np.ndarray:
+    """
+    Computes the log-mel spectrogram of 16 khz audio with NumPy, reproducing the output of the melspectrogram
+    model (before the transform in `AudioFeatures._get_melspectrogram`). Frames are 512 samples long and 160
+    samples apart, without padding, so `n` samples give `(n - 512)//160 + 1` frames.
+
+    Each frame is computed independently (with the same rounding for any number of frames), so streaming audio
+    gives exactly the same frames as the whole signal when each chunk is computed together with the samples of
+    the previous chunk that the next frames overlap. `AudioFeatures` does this with its raw audio buffer, computing
+    each chunk of 80 ms frames together with the 480 samples before it.
+
+    Args:
+        x (ndarray): The audio (with the values of 16-bit PCM samples, as integers or floats), of shape (..., samples)
+
+    Returns:
+        ndarray: The melspectrogram in dB, of shape (..., frames, 32)
+    """
+    x = np.asarray(x, dtype=np.float32)
+    n_frames = (x.shape[-1] - N_FFT)//HOP_LENGTH + 1
+    if n_frames < 1:
+        raise ValueError(f"The melspectrogram needs at least {N_FFT} samples, but {x.shape[-1]} were provided!")
+
+    # The window of 400 samples is centered in the FFT length of 512 samples. The power spectrum doesn't depend
+    # on where the window is in the FFT input (which only changes the phases), so the samples outside of the window
+    # can be left out and replaced with zero padding after the window.
+    offset = (N_FFT - WIN_LENGTH)//2
+    frames = np.lib.stride_tricks.as_strided(
+        x[..., offset:],
+        shape=x.shape[:-1] + (n_frames, WIN_LENGTH),
+        strides=x.strides[:-1] + (x.strides[-1]*HOP_LENGTH, x.strides[-1]),
+        writeable=False
+    )
+    spectrum = scipy.fft.rfft(frames*_get_window(), n=N_FFT, axis=-1)
+
+    # Only the bins covered by the filters are needed. The sum over bins uses einsum rather than a matrix product,
+    # as BLAS can round differently depending on the number of frames, and then streaming wouldn't be exact.
+    start, end, filters = _get_filterbank_bins()
+    spectrum = spectrum[..., start:end]
+    power = np.square(spectrum.real) + np.square(spectrum.imag)
+    mel = np.einsum("...f,fm->...m", power, filters)
+
+    return np.log10(np.maximum(mel, AMIN))*np.float32(10)
@@ -13,42 +13,75 @@
 # limitations under the License.
 
 # Imports
-import re
 from tqdm import tqdm
 import numpy as np
-from typing import List
+from typing import List, Optional
+from openwakeword.utils import ClipScores
 
 
 # Define metric utility functions specific to the wakeword detection use-case
 
-def get_false_positives(scores: List, threshold: float, grouping_window: int = 50):
+def get_score_array(scores, label: Optional[str] = None):
+    """
+    Gets the scores of a single label as a 1D array.
+
+    Args:
+        scores: A list or array of scores, a `ClipScores` object (e.g., from `Model.predict_clip` with
+                `return_type="columnar"`), or a list/iterable of `ClipScores` blocks (e.g., from `Model.iter_clip_scores`)
+        label (str): The label to get the scores of, when `scores` contains the scores of several labels
+
+    Returns:
+        ndarray: The scores
+    """
+    if not isinstance(scores, (ClipScores, np.ndarray, list)):
+        scores = list(scores)
+    if isinstance(scores, list) and len(scores) > 0 and isinstance(scores[0], ClipScores):
+        scores = ClipScores.concatenate(scores)
+
+    if isinstance(scores, ClipScores):
+        if label is None:
+            if len(scores.labels) != 1:
+                raise ValueError(f"The scores have several labels ({scores.labels}), so the `label` argument must be provided!")
+            label = scores.labels[0]
+        return scores[label]
+
+    return np.asarray(scores)
+
+
+def get_false_positives(scores: List, threshold: float, grouping_window: int = 50, label: Optional[str] = None):
     """
     Counts the number of false-positives based on a list of scores and a specified threshold.
 
     Args:
-        scores (List): A list of predicted scores, between 0 and 1
+        scores (List): A list of predicted scores, between 0 and 1 (or any input supported by `get_score_array`)
         threshold (float): The threshold to use to determine false-positive predictions
-        grouping_window (int: The size (in number of frames) for grouping scores above
-                                 the threshold into a single false positive for counting
+        grouping_window (int): The size (in number of frames) for grouping scores above
+                               the threshold into a single false positive for counting
+        label (str): The label to use, if `scores` contains the scores of several labels
 
     Returns:
         int: The number of false positive predictions in the list of scores
     """
-    bin_pred = np.array(scores) >= threshold
-    bin_pred_string = ''.join(["1" if i else "0" for i in bin_pred])
-    transitions = list(re.finditer("01", bin_pred_string))
-    n = grouping_window
-    for t in transitions:
-        if bin_pred[t.end()] != 0:
-            bin_pred[t.end():t.end() + min(len(transitions) - t.end(), n)] = [0]*min(len(transitions) - t.end(), n)
+    bin_pred = get_score_array(scores, label) >= threshold
+
+    # Count each rising edge (including a clip that starts above the threshold), except for those within
+    # `grouping_window` frames of the last counted false positive
+    rising_edges = np.flatnonzero(np.diff(bin_pred.astype(np.int8), prepend=0) == 1)
+    false_positives = 0
+    last_false_positive = -grouping_window
+    for edge in rising_edges:
+        if edge - last_false_positive >= grouping_window:
+            false_positives += 1
+            last_false_positive = edge
 
-    return sum(bin_pred)
+    return false_positives
 
 
 def generate_roc_curve_fprs(
                             scores: list,
                             n_points: int = 25,
                             time_per_prediction: float = .08,
+                            label: Optional[str] = None,
                             **kwargs
                             ):
     """
@@ -57,14 +90,16 @@ def generate_roc_curve_fprs(
     else the prediction is a false positive.
 
     Args:
-        scores (List): A list of predicted scores, between 0 and 1
+        scores (List): A list of predicted scores, between 0 and 1 (or any input supported by `get_score_array`)
         n_points (int): The number of points to use when calculating false positive rates
         time_per_prediction (float): The time (in seconds) that each prediction represents
+        label (str): The label to use, if `scores` contains the scores of several labels
         kwargs (dict): Any other keyword arguments to pass to the `get_false_positives` function
 
     Returns:
         list: A list of false positive rates per hour at different score threshold levels
     """
+    scores = get_score_array(scores, label)
 
     # Determine total time
     total_hours = time_per_prediction*len(scores)/3600  # convert to hours
@@ -80,18 +115,22 @@ def generate_roc_curve_fprs(
 
 def generate_roc_curve_tprs(
                             scores: list,
-                            n_points: int = 25
+                            n_points: int = 25,
+                            label: Optional[str] = None
                             ):
     """
     Generates the true positive rate (true accept rate) for the given predictions
     over a range score thresholds. Assumes that all predictions are supposed to be equal to 1.
 
     Args:
-        scores (list): A list of scores for each prediction
+        scores (list): A list of scores for each prediction (or any input supported by `get_score_array`)
+        n_points (int): The number of points to use when calculating true positive rates
+        label (str): The label to use, if `scores` contains the scores of several labels
 
     Returns:
         list: A list of true positive rates at different score threshold levels
     """
+    scores = get_score_array(scores, label)
 
     tprs = []
     for threshold in tqdm(np.linspace(0.01, 0.99, num=n_points)):
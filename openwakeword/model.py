@@ -15,17 +15,18 @@
 # Imports
 import numpy as np
 import openwakeword
-from openwakeword.utils import AudioFeatures, re_arg
+from openwakeword.utils import AudioFeatures, ClipScores, RingBuffer, re_arg, to_int16_pcm
+from openwakeword.sessions import session_registry, interpreter_registry
+from openwakeword.numpy_inference import NumpyModel, load_numpy_model
 
 import wave
 import os
 import logging
 import functools
-import pickle
-from collections import deque, defaultdict
-from functools import partial
+from collections import defaultdict
 import time
-from typing import List, Union, DefaultDict, Dict
+import weakref
+from typing import List, Union, Dict, Optional, Tuple
 
 
 # Define main model class
@@ -44,6 +45,13 @@ class Model():
             custom_verifier_models: dict = {},
             custom_verifier_threshold: float = 0.1,
             inference_framework: str = "tflite",
+            quantized: bool = False,
+            cascade: Optional[str] = None,
+            cascade_threshold: Optional[float] = None,
+            cascade_hangover: int = 25,
+            cascade_backfill: Optional[int] = None,
+            duty_cycle: int = 1,
+            duty_cycle_threshold: float = 0.1,
             **kwargs
             ):
         """Initialize the openWakeWord model object.
@@ -69,19 +77,51 @@ class Model():
             custom_verifier_models (dict): A dictionary of paths to custom verifier models, where
                                            the keys are the model names (corresponding to the openwakeword.models
                                            attribute) and the values are the filepaths of the
-                                           custom verifier models.
+                                           custom verifier models (.npz files, or pickled scikit-learn
+                                           pipelines from older versions, which are converted when loaded).
             custom_verifier_threshold (float): The score threshold to use a custom verifier model. If the score
                                                from a model for a given frame is greater than this value, the
                                                associated custom verifier model will also predict on that frame, and
                                                the verifier score will be returned.
             inference_framework (str): The inference framework to use when for model prediction. Options are
-                                       "tflite" or "onnx". The default is "tflite" as this results in better
+                                       "tflite", "onnx", or "numpy". The default is "tflite" as this results in better
                                        efficiency on common platforms (x86, ARM64), but in some deployment
-                                       scenarios ONNX models may be preferable.
+                                       scenarios ONNX models may be preferable. "numpy" is an opt-in alternative
+                                       to "onnx", not a faster one: the (ONNX) wakeword models are run with NumPy
+                                       when all of their operators are supported (see `openwakeword.numpy_inference`),
+                                       and with ONNX runtime otherwise, while the feature models always use ONNX
+                                       runtime. It is slower than "onnx" (several times slower for the included
+                                       wakeword models, see `benchmarks/numpy_inference_benchmark.py`), and is
+                                       mainly useful to check or debug the wakeword models outside of ONNX runtime.
+            quantized (bool): Whether to load the 8-bit quantized versions of the embedding model and wakeword models,
+                              which are faster but may be less accurate. Only supported for the "onnx" and "numpy"
+                              inference frameworks, and the quantized models must first be created with
+                              `openwakeword.quantize.quantize_models` (and checked with
+                              `openwakeword.quantize.evaluate_quantized_models`).
+            cascade (str): Whether to gate the embedding and wakeword models with a cheap detector of
+                           non-silent audio, and skip them (returning scores of 0) while the audio is silent.
+                           Options are "energy" (the RMS amplitude of the frame), "vad" (the Silero VAD model),
+                           or None (the default) to always run all of the models. When the gate opens, the
+                           features of the most recent skipped frames are computed in one batch, so that
+                           the wakeword models see the same audio context as without the cascade.
+            cascade_threshold (float): The threshold that opens the cascade gate. The default is an RMS amplitude
+                                       of 200 (for 16-bit audio) for "energy", and a score of 0.5 for "vad".
+            cascade_hangover (int): How many frames (of 1280 samples or 80 ms) the gate stays open after
+                                    the last frame above the threshold.
+            cascade_backfill (int): How many of the skipped frames to compute features for when the gate opens.
+                                    The default is the longest input window of the loaded wakeword models.
+            duty_cycle (int): A low-power mode for idle streams: while the recent scores of every label are below
+                              `duty_cycle_threshold`, the wakeword models only run on every `duty_cycle`-th frame
+                              (e.g., 2 or 3), and the skipped frames return the previous scores. The skipped frames
+                              are predicted on together with the next frame (returning the maximum score, as for
+                              inputs longer than 80 ms), so no scores are lost, but a rising score may be returned
+                              up to `duty_cycle - 1` frames later. Full rate resumes as soon as any score reaches
+                              `duty_cycle_threshold`. The default (1) disables duty cycling.
+            duty_cycle_threshold (float): The score below which a label is considered idle for duty cycling.
             kwargs (dict): Any other keyword arguments to pass the the preprocessor instance
         """
         # Get model paths for pre-trained models if user doesn't provide models to load
-        pretrained_model_paths = openwakeword.get_pretrained_model_paths(inference_framework)
+        pretrained_model_paths = openwakeword.get_pretrained_model_paths("onnx" if inference_framework == "numpy" else inference_framework)
         wakeword_model_names = []
         if wakeword_models == []:
             wakeword_models = pretrained_model_paths
@@ -99,24 +139,41 @@ class Model():
                         wakeword_models[ndx] = matching_model[0]
                         wakeword_model_names.append(i)
 
+        # Use the quantized versions of the models
+        if quantized:
+            from openwakeword.quantize import get_quantized_model_path
+            if inference_framework not in ("onnx", "numpy"):
+                raise ValueError("Quantized models are only supported with the onnx and numpy inference frameworks!")
+
+            embedding_model_path = kwargs.get("embedding_model_path") or os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "resources", "models", "embedding_model.onnx"
+            )
+            wakeword_models = [get_quantized_model_path(i) for i in wakeword_models]
+            kwargs["embedding_model_path"] = get_quantized_model_path(embedding_model_path)
+            for path in wakeword_models + [kwargs["embedding_model_path"]]:
+                if not os.path.exists(path):
+                    raise ValueError(f"The quantized model '{path}' was not found! "
+                                     "Create it with `openwakeword.quantize.quantize_models`.")
+
         # Create attributes to store models and metadata
         self.models = {}
         self.model_inputs = {}
         self.model_outputs = {}
         self.model_prediction_function = {}
+        self.model_batch_prediction_function = {}
         self.class_mapping = {}
         self.custom_verifier_models = {}
         self.custom_verifier_threshold = custom_verifier_threshold
+        self._sessions: List = []  # the shared ONNX sessions used by the model, released when it is deleted
+        weakref.finalize(self, session_registry.release_all, self._sessions)
 
         # Do imports for  inference framework
         if inference_framework == "tflite":
             try:
-                import tflite_runtime.interpreter as tflite
+                import tflite_runtime.interpreter  # noqa: F401
 
-                def tflite_predict(tflite_interpreter, input_index, output_index, x):
-                    tflite_interpreter.set_tensor(input_index, x)
-                    tflite_interpreter.invoke()
-                    return tflite_interpreter.get_tensor(output_index)[None, ]
+                def tflite_predict(mdl_path, x):
+                    return interpreter_registry.predict(mdl_path, x)[None, ]
 
             except ImportError:
                 logging.warning("Tried to import the tflite runtime, but it was not found. "
@@ -130,9 +187,9 @@ class Model():
                     raise ValueError("Tried to import the tflite runtime for provided tflite models, but it was not found. "
                                      "Please install it using `pip install tflite-runtime`")
 
-        if inference_framework == "onnx":
+        if inference_framework in ("onnx", "numpy"):
             try:
-                import onnxruntime as ort
+                import onnxruntime  # noqa: F401
 
                 def onnx_predict(onnx_model, x):
                     return onnx_model.run(None, {onnx_model.get_inputs()[0].name: x})
@@ -142,37 +199,42 @@ class Model():
 
         for mdl_path, mdl_name in zip(wakeword_models, wakeword_model_names):
             # Load openwakeword models
-            if inference_framework == "onnx":
+            if inference_framework in ("onnx", "numpy"):
                 if ".tflite" in mdl_path:
-                    raise ValueError("The onnx inference framework is selected, but tflite models were provided!")
+                    raise ValueError(f"The {inference_framework} inference framework is selected, but tflite models were provided!")
 
-                sessionOptions = ort.SessionOptions()
-                sessionOptions.inter_op_num_threads = 1
-                sessionOptions.intra_op_num_threads = 1
-
-                self.models[mdl_name] = ort.InferenceSession(mdl_path, sess_options=sessionOptions,
-                                                             providers=["CPUExecutionProvider"])
+                # Get the shared inference session, with a dynamic batch size (when possible)
+                # so that several frames can be predicted with one call
+                if inference_framework == "numpy":
+                    self.models[mdl_name] = load_numpy_model(mdl_path)
+                else:
+                    self.models[mdl_name] = session_registry.acquire(mdl_path, dynamic_batch=True)
+                if not isinstance(self.models[mdl_name], NumpyModel):
+                    self._sessions.append(self.models[mdl_name])
 
                 self.model_inputs[mdl_name] = self.models[mdl_name].get_inputs()[0].shape[1]
                 self.model_outputs[mdl_name] = self.models[mdl_name].get_outputs()[0].shape[1]
+
                 pred_function = functools.partial(onnx_predict, self.models[mdl_name])
                 self.model_prediction_function[mdl_name] = pred_function
+                if not isinstance(self.models[mdl_name].get_inputs()[0].shape[0], int):
+                    self.model_batch_prediction_function[mdl_name] = pred_function
 
             if inference_framework == "tflite":
                 if ".onnx" in mdl_path:
                     raise ValueError("The tflite inference framework is selected, but onnx models were provided!")
 
-                self.models[mdl_name] = tflite.Interpreter(model_path=mdl_path, num_threads=1)
-                self.models[mdl_name].allocate_tensors()
+                # The interpreters are shared through `interpreter_registry`, which keeps an interpreter for each
+                # input shape, so batches of frames are predicted with interpreters resized to each batch size
+                # (rounded up to a power of two)
+                self.models[mdl_name] = interpreter_registry.get(mdl_path).interpreter
 
                 self.model_inputs[mdl_name] = self.models[mdl_name].get_input_details()[0]['shape'][1]
                 self.model_outputs[mdl_name] = self.models[mdl_name].get_output_details()[0]['shape'][1]
 
-                tflite_input_index = self.models[mdl_name].get_input_details()[0]['index']
-                tflite_output_index = self.models[mdl_name].get_output_details()[0]['index']
-
-                pred_function = functools.partial(tflite_predict, self.models[mdl_name], tflite_input_index, tflite_output_index)
+                pred_function = functools.partial(tflite_predict, mdl_path)
                 self.model_prediction_function[mdl_name] = pred_function
+                self.model_batch_prediction_function[mdl_name] = pred_function
 
             if class_mapping_dicts and class_mapping_dicts[wakeword_models.index(mdl_path)].get(mdl_name, None):
                 self.class_mapping[mdl_name] = class_mapping_dicts[wakeword_models.index(mdl_path)]
@@ -184,7 +246,8 @@ class Model():
             # Load custom verifier models
             if isinstance(custom_verifier_models, dict):
                 if custom_verifier_models.get(mdl_name, False):
-                    self.custom_verifier_models[mdl_name] = pickle.load(open(custom_verifier_models[mdl_name], 'rb'))
+                    from openwakeword.custom_verifier_model import load_verifier_model
+                    self.custom_verifier_models[mdl_name] = load_verifier_model(custom_verifier_models[mdl_name])
 
             if len(self.custom_verifier_models.keys()) < len(custom_verifier_models.keys()):
                 raise ValueError(
@@ -194,8 +257,24 @@ class Model():
                     " that has the same base models but doesn't have custom verifier models."
                 )
 
-        # Create buffer to store frame predictions
-        self.prediction_buffer: DefaultDict[str, deque] = defaultdict(partial(deque, maxlen=30))
+        # Precompute the tables that map the outputs of each model to its labels, and each label to its parent model
+        self._labels = self._get_labels()
+        self._label_index = {label: ndx for ndx, label in enumerate(self._labels)}
+        self._model_columns: Dict[str, Tuple[slice, Union[slice, np.ndarray]]] = {}  # the score columns and outputs of each model
+        start = 0
+        for mdl in self.models.keys():
+            outputs = [0] if self.model_outputs[mdl] == 1 else [int(i) for i in self.class_mapping[mdl].keys()]
+            self._model_columns[mdl] = (slice(start, start + len(outputs)),
+                                        slice(0, len(outputs)) if outputs == list(range(len(outputs))) else np.array(outputs))
+            start += len(outputs)
+        self._parent_models: Dict[str, str] = {}
+        for mdl, mapping in self.class_mapping.items():
+            self._parent_models.update({label: mdl for label in mapping.values()})
+            self._parent_models[mdl] = mdl
+        self._patience_table: tuple = (None, )
+
+        # Create buffer to store frame predictions (the scores of the last 30 frames for each label)
+        self._score_ring = RingBuffer(30, (len(self._labels), ), dtype=np.float32)
 
         # Initialize SpeexDSP noise canceller
         if enable_speex_noise_suppression:
@@ -210,32 +289,61 @@ class Model():
             self.vad = openwakeword.VAD()
 
         # Create AudioFeatures object
-        self.preprocessor = AudioFeatures(inference_framework=inference_framework, **kwargs)
+        self.preprocessor = AudioFeatures(inference_framework="onnx" if inference_framework == "numpy" else inference_framework,
+                                          **kwargs)
+
+        # Setup the silence gate for the embedding and wakeword models
+        if cascade not in (None, "energy", "vad"):
+            raise ValueError("The `cascade` argument must be one of None, 'energy', or 'vad'!")
+        self.cascade = cascade
+        self.cascade_threshold = cascade_threshold if cascade_threshold is not None else {"energy": 200, "vad": 0.5}.get(cascade)
+        self.cascade_hangover = cascade_hangover
+        self.cascade_backfill = cascade_backfill if cascade_backfill is not None else max(self.model_inputs.values(), default=16)
+        self._cascade_frames_left = 0
+        self._cascade_active = False
+        if cascade == "vad":
+            self.cascade_vad = openwakeword.VAD()
+
+        # Setup duty cycling of the wakeword models
+        self.duty_cycle = duty_cycle
+        self.duty_cycle_threshold = duty_cycle_threshold
+        self._held_frames = 0  # the most recent frames that duty cycling skipped
+
+    @property
+    def prediction_buffer(self) -> Dict[str, np.ndarray]:
+        """The scores of the last 30 frames (oldest first) for each label, as read-only views into the score buffer"""
+        scores = self._score_ring.view()
+        return {label: scores[:, ndx] for label, ndx in self._label_index.items()}
 
     def get_parent_model_from_label(self, label):
         """Gets the parent model associated with a given prediction label"""
-        parent_model = ""
-        for mdl in self.class_mapping.keys():
-            if label in self.class_mapping[mdl].values():
-                parent_model = mdl
-            elif label in self.class_mapping.keys() and label == mdl:
-                parent_model = mdl
-
-        return parent_model
+        return self._parent_models.get(label, "")
 
     def reset(self):
-        """Reset the prediction buffer"""
-        self.prediction_buffer = defaultdict(partial(deque, maxlen=30))
-
-    def predict(self, x: np.ndarray, patience: dict = {}, threshold: dict = {}, timing: bool = False):
+        """Reset the prediction and audio feature buffers, so that the model object can be re-used
+        for a new, independent audio stream."""
+        self._score_ring.clear()
+        self.preprocessor.reset()
+        if self.vad_threshold > 0:
+            self.vad.reset_states()
+            self.vad.prediction_buffer.clear()
+        self._cascade_frames_left = 0
+        self._cascade_active = False
+        self._held_frames = 0
+        if self.cascade == "vad":
+            self.cascade_vad.reset_states()
+
+    def predict(self, x: Union[np.ndarray, bytes], patience: dict = {}, threshold: dict = {}, timing: bool = False,
+                dtype: str = "int16", scale: Optional[float] = None):
         """Predict with all of the wakeword models on the input audio frames
 
         Args:
-            x (ndarray): The input audio data to predict on with the models. Ideally should be multiples of 80 ms
-                                (1280 samples), with longer lengths reducing overall CPU usage
+            x (Union[ndarray, bytes]): The input audio data to predict on with the models. Ideally should be multiples
+                                of 80 ms (1280 samples), with longer lengths reducing overall CPU usage
                                 but decreasing detection latency. Input audio with durations greater than or less
                                 than 80 ms is also supported, though this will add a detection delay of up to 80 ms
-                                as the appropriate number of samples are accumulated.
+                                as the appropriate number of samples are accumulated. Can be a 16-bit integer
+                                array, a floating point array (see `scale`), or raw PCM bytes (see `dtype`).
             patience (dict): How many consecutive frames (of 1280 samples or 80 ms) above the threshold that must
                              be observed before the current frame will be returned as non-zero.
                              Must be provided as an a dictionary where the keys are the
@@ -247,15 +355,18 @@ class Model():
                               model names and the values are the thresholds.
             timing (bool): Whether to return timing information of the models. Can be useful to debug and
                            assess how efficiently models are running on the current hardware.
+            dtype (str): The sample format when `x` is raw PCM bytes, either "int16" (the default) or "float32".
+            scale (float): The factor that maps floating point audio to the 16-bit range, which must be given
+                           for floating point audio: 32767 for audio normalized to [-1, 1], or 1.0 for audio
+                           that already has the range of 16-bit PCM audio.
 
         Returns:
             dict: A dictionary of scores between 0 and 1 for each model, where 0 indicates no
                   wake-word/wake-phrase detected. If the `timing` argument is true, returns a
                   tuple of dicts containing model predictions and timing information, respectively.
         """
-        # Check input data type
-        if not isinstance(x, np.ndarray):
-            raise ValueError(f"The input audio data (x) must by a Numpy array, instead received an object of type {type(x)}.")
+        # Convert input audio to 16-bit PCM
+        x = to_int16_pcm(x, dtype=dtype, scale=scale)
 
         # Setup timing dict
         if timing:
@@ -263,95 +374,239 @@ class Model():
             timing_dict["models"] = {}
             feature_start = time.time()
 
+        # Skip the embedding and wakeword models while the audio is silent, or the wakeword models
+        # on some of the frames while all of the scores are near zero
+        if self.cascade is not None and not self._cascade_gate(x):
+            predictions = self._predict_skipped(x, patience, threshold, timing_dict if timing else None)
+        elif self._duty_cycle_skip():
+            predictions = self._predict_skipped(x, patience, threshold, timing_dict if timing else None, hold=True)
+        else:
+            predictions = self._predict_frames(x, patience, threshold, timing_dict if timing else None)
+
+        if timing:
+            timing_dict["models"].setdefault("preprocessor", time.time() - feature_start)
+            return predictions, timing_dict
+        else:
+            return predictions
+
+    def _predict_frames(self, x: np.ndarray, patience: dict = {}, threshold: dict = {},
+                        timing_dict: Union[dict, None] = None):
+        """
+        Computes the features of the input audio and predicts with all of the wakeword models
+        (see the `predict` method for details on the arguments). If the cascade or duty cycling skipped
+        any frames, their features are computed together with those of the new frames, and the frames
+        that duty cycling skipped are predicted on together with the new frames.
+        """
+        if timing_dict is not None:
+            feature_start = time.time()
+
         # Get audio features (optionally with Speex noise suppression)
         if self.speex_ns:
-            n_prepared_samples = self.preprocessor(self._suppress_noise_with_speex(x))
+            x = self._suppress_noise_with_speex(x)
+
+        if self.preprocessor.skipped_samples > 0:
+            skipped_samples = self.preprocessor.skipped_samples
+            self.preprocessor._streaming_features(x, compute=False)
+            n_new_frames = (self.preprocessor.skipped_samples - skipped_samples)//1280
+            n_backfilled = self.preprocessor._backfill(max(self.cascade_backfill, self._held_frames) + n_new_frames)
+            n_frames = min(n_new_frames + self._held_frames, n_backfilled)
         else:
-            n_prepared_samples = self.preprocessor(x)
+            n_frames = self.preprocessor(x)//1280
+        self._held_frames = 0
 
-        if timing:
+        if timing_dict is not None:
             timing_dict["models"]["preprocessor"] = time.time() - feature_start
 
-        # Get predictions from model(s)
-        predictions = {}
+        # Get predictions from model(s), sharing the feature windows between models with the same input length
+        model_predictions = {}
+        windows: Dict[int, np.ndarray] = {}
         for mdl in self.models.keys():
-            if timing:
+            if timing_dict is not None:
                 model_start = time.time()
 
             # Run model to get predictions
-            if n_prepared_samples > 1280:
-                group_predictions = []
-                for i in np.arange(n_prepared_samples//1280-1, -1, -1):
-                    group_predictions.extend(
-                        self.model_prediction_function[mdl](
-                            self.preprocessor.get_features(
-                                    self.model_inputs[mdl],
-                                    start_ndx=-self.model_inputs[mdl] - i
-                            )
-                        )
+            n_inputs = self.model_inputs[mdl]
+            if n_frames > 1:
+                # Predict on the windows ending at each of the new frames with one batch
+                if n_inputs not in windows:
+                    features = self.preprocessor.get_features(n_inputs + n_frames - 1)[0]
+                    windows[n_inputs] = np.ascontiguousarray(
+                        np.lib.stride_tricks.sliding_window_view(features, n_inputs, axis=0).transpose(0, 2, 1)
                     )
-                prediction = np.array(group_predictions).max(axis=0)[None, ]
-            elif n_prepared_samples == 1280:
-                prediction = self.model_prediction_function[mdl](
-                    self.preprocessor.get_features(self.model_inputs[mdl])
-                )
-            elif n_prepared_samples < 1280:  # get previous prediction if there aren't enough samples
-                if self.model_outputs[mdl] == 1:
-                    if len(self.prediction_buffer[mdl]) > 0:
-                        prediction = [[[self.prediction_buffer[mdl][-1]]]]
-                    else:
-                        prediction = [[[0]]]
-                elif self.model_outputs[mdl] != 1:
-                    n_classes = max([int(i) for i in self.class_mapping[mdl].keys()])
-                    prediction = [[[0]*(n_classes+1)]]
-
-            if self.model_outputs[mdl] == 1:
-                predictions[mdl] = prediction[0][0][0]
-            else:
-                for int_label, cls in self.class_mapping[mdl].items():
-                    predictions[cls] = prediction[0][0][int(int_label)]
-
-            # Update scores based on custom verifier model
-            if self.custom_verifier_models != {}:
-                for cls in predictions.keys():
-                    if predictions[cls] >= self.custom_verifier_threshold:
-                        parent_model = self.get_parent_model_from_label(cls)
-                        if self.custom_verifier_models.get(parent_model, False):
-                            verifier_prediction = self.custom_verifier_models[parent_model].predict_proba(
-                                self.preprocessor.get_features(self.model_inputs[mdl])
-                            )[0][-1]
-                            predictions[cls] = verifier_prediction
-
-            # Update prediction buffer, and zero predictions for first 5 frames during model initialization
-            for cls in predictions.keys():
-                if len(self.prediction_buffer[cls]) < 5:
-                    predictions[cls] = 0.0
-                self.prediction_buffer[cls].append(predictions[cls])
+                group_predictions = self._predict_batch(mdl, windows[n_inputs])
+                model_predictions[mdl] = self._verify_predictions(mdl, group_predictions, windows[n_inputs]).max(axis=0)
+            elif n_frames == 1:
+                if n_inputs not in windows:
+                    windows[n_inputs] = self.preprocessor.get_features(n_inputs)
+                prediction = self.model_prediction_function[mdl](windows[n_inputs])[0]
+                model_predictions[mdl] = self._verify_predictions(mdl, prediction.reshape(1, -1), windows[n_inputs])
+            else:  # get previous prediction if there aren't enough samples
+                model_predictions[mdl] = np.zeros(self.model_outputs[mdl], dtype=np.float32)
+                if self.model_outputs[mdl] == 1 and len(self._score_ring) > 0:
+                    model_predictions[mdl][0] = self._score_ring.view()[-1, self._model_columns[mdl][0].start]
 
             # Get timing information
-            if timing:
+            if timing_dict is not None:
                 timing_dict["models"][mdl] = time.time() - model_start
 
+        predictions = self._update_predictions(model_predictions)
+
+        # Update scores based on thresholds, patience, and VAD
+        return self._filter_predictions(predictions, x, patience, threshold, timing_dict)
+
+    def _cascade_gate(self, x: np.ndarray):
+        """
+        Checks whether the embedding and wakeword models should run on the input audio (see the `cascade` argument).
+
+        Args:
+            x (ndarray): The input audio, as 16-bit PCM
+
+        Returns:
+            bool: Whether the models should run on the input audio
+        """
+        if self.cascade == "energy":
+            active = x.shape[0] > 0 and np.sqrt(np.mean(x.astype(np.float32)**2)) >= self.cascade_threshold
+        else:
+            # The VAD model needs a multiple of its frame size, so reuse the last decision for shorter inputs
+            n = x.shape[0]//640*640
+            active = self._cascade_active if n == 0 else self.cascade_vad.predict(x[-n:], 640) >= self.cascade_threshold
+        self._cascade_active = active
+
+        if active:
+            self._cascade_frames_left = self.cascade_hangover + 1
+        elif self._cascade_frames_left > 0:
+            self._cascade_frames_left -= 1
+
+        return self._cascade_frames_left > 0
+
+    def _duty_cycle_skip(self):
+        """
+        Checks whether the wakeword models can skip the next frame (see the `duty_cycle` argument),
+        which is the case when the recent scores of every label are below `duty_cycle_threshold`
+        and fewer than `duty_cycle - 1` frames in a row have been skipped.
+        """
+        if self.duty_cycle <= 1 or self._held_frames >= self.duty_cycle - 1 or len(self._labels) == 0:
+            return False
+
+        return len(self._score_ring) >= 5 and self._score_ring.view()[-self.duty_cycle:].max() < self.duty_cycle_threshold
+
+    def _predict_skipped(self, x: np.ndarray, patience: dict = {}, threshold: dict = {},
+                         timing_dict: Union[dict, None] = None, hold: bool = False):
+        """
+        Buffers the input audio without running the embedding and wakeword models, and returns
+        scores of 0 for every label (see the `cascade` argument), or the previous score of
+        every label if `hold` is True (see the `duty_cycle` argument).
+        """
+        if self.speex_ns:
+            x = self._suppress_noise_with_speex(x)
+        skipped_samples = self.preprocessor.skipped_samples
+        self.preprocessor._streaming_features(x, compute=False)
+        self._held_frames = self._held_frames + (self.preprocessor.skipped_samples - skipped_samples)//1280 if hold else 0
+
+        if hold and len(self._score_ring) > 0:
+            scores = self._score_ring.view()[-1:].copy()
+        else:
+            scores = np.zeros((1, len(self._labels)), dtype=np.float32)
+        self._score_ring.append(scores)
+        predictions = dict(zip(self._labels, scores[0]))
+
+        return self._filter_predictions(predictions, x, patience, threshold, timing_dict)
+
+    def _update_predictions(self, model_predictions: dict):
+        """
+        Maps the outputs of the models for the current frame to their labels, and updates the prediction buffer.
+
+        Args:
+            model_predictions (dict): The output of each model for the frame (an array with `model_outputs[mdl]` elements)
+
+        Returns:
+            dict: The scores for each label
+        """
+        scores = np.zeros(len(self._labels), dtype=np.float32)
+        for mdl, prediction in model_predictions.items():
+            columns, outputs = self._model_columns[mdl]
+            scores[columns] = prediction.reshape(-1)[outputs]
+
+        # Update prediction buffer, and zero predictions for first 5 frames during model initialization
+        if len(self._score_ring) < 5:
+            scores[:] = 0
+        self._score_ring.append(scores[None, ])
+
+        return dict(zip(self._labels, scores))
+
+    def _verify_predictions(self, mdl: str, predictions: np.ndarray, windows: np.ndarray):
+        """
+        Replaces the scores of a model that are at least `custom_verifier_threshold` with the
+        scores of its custom verifier model (if any), scoring all of the frames in one batch.
+
+        Args:
+            mdl (str): The name of the model
+            predictions (ndarray): The model scores, of shape (N, model_outputs[mdl])
+            windows (ndarray): The features that each score was predicted from, of shape (N, model_inputs[mdl], feature_dim)
+
+        Returns:
+            ndarray: The updated scores, of shape (N, model_outputs[mdl])
+        """
+        verifier = self.custom_verifier_models.get(mdl)
+        if verifier is None:
+            return predictions
+
+        outputs = self._model_columns[mdl][1]
+        verify = np.zeros(predictions.shape, dtype=bool)
+        verify[:, outputs] = predictions[:, outputs] >= self.custom_verifier_threshold
+        frames = verify.any(axis=1)
+        if not frames.any():
+            return predictions
+
+        predictions = np.array(predictions, dtype=np.float32)
+        verifier_scores = verifier.predict_proba(windows[frames])[:, -1]
+        predictions[frames] = np.where(verify[frames], verifier_scores[:, None], predictions[frames])
+        return predictions
+
+    def _get_patience_table(self, patience: dict, threshold: dict):
+        """
+        Gets the `patience` and `threshold` values of each label (0 and infinity for labels without a
+        `patience` value), and a mask of the last `patience` rows of the (full) prediction buffer for each label.
+        The table for the most recent arguments is cached, as they are usually the same for every frame.
+        """
+        key = (tuple(patience.items()), tuple(threshold.items()))
+        if self._patience_table[0] != key:
+            parents = [self._parent_models.get(label, "") for label in self._labels]
+            n_frames = np.array([patience.get(i, 0) for i in parents], dtype=int)
+            thresholds = np.array([threshold[i] if i in patience else np.inf for i in parents], dtype=np.float32)
+            mask = np.arange(self._score_ring.capacity)[::-1, None] < n_frames[None, ]
+            self._patience_table = (key, n_frames, thresholds, mask)
+
+        return self._patience_table[1:]
+
+    def _filter_predictions(self, predictions: dict, x: np.ndarray, patience: dict = {},
+                            threshold: dict = {}, timing_dict: Union[dict, None] = None):
+        """
+        Zeros scores that don't satisfy the `patience` and `threshold` arguments, or
+        that were not preceded by voice activity (if VAD is enabled).
+        See the `predict` method for details on the arguments.
+        """
         # Update scores based on thresholds or patience arguments
         if patience != {}:
             if threshold == {}:
                 raise ValueError("Error! When using the `patience` argument, threshold "
                                  "values must be provided via the `threshold` argument!")
-            for mdl in predictions.keys():
-                parent_model = self.get_parent_model_from_label(mdl)
-                if parent_model in patience.keys():
-                    scores = np.array(self.prediction_buffer[mdl])[-patience[parent_model]:]
-                    if (scores >= threshold[parent_model]).sum() < patience[parent_model]:
-                        predictions[mdl] = 0.0
+            # Count the frames above the threshold in the last `patience` frames of each label
+            n_frames, thresholds, mask = self._get_patience_table(patience, threshold)
+            scores = self._score_ring.view()
+            counts = ((scores >= thresholds) & mask[mask.shape[0] - scores.shape[0]:]).sum(axis=0)
+            for label, zero in zip(self._labels, (counts < n_frames).tolist()):
+                if zero:
+                    predictions[label] = 0.0
 
         # (optionally) get voice activity detection scores and update model scores
         if self.vad_threshold > 0:
-            if timing:
+            if timing_dict is not None:
                 vad_start = time.time()
 
             self.vad(x)
 
-            if timing:
+            if timing_dict is not None:
                 timing_dict["models"]["vad"] = time.time() - vad_start
 
             # Get frames from last 0.4 to 0.56 seconds (3 frames) before the current
@@ -362,12 +617,28 @@ class Model():
                 if vad_max_score < self.vad_threshold:
                     predictions[mdl] = 0.0
 
-        if timing:
-            return predictions, timing_dict
-        else:
-            return predictions
+        return predictions
 
-    def predict_clip(self, clip: Union[str, np.ndarray], padding: int = 1, chunk_size=1280, **kwargs):
+    def _predict_batch(self, mdl: str, x: np.ndarray):
+        """
+        Predict with a single wakeword model on a batch of feature windows.
+
+        Args:
+            mdl (str): The name of the model
+            x (ndarray): The features, of shape (N, model_inputs[mdl], feature_dim)
+
+        Returns:
+            ndarray: The model scores, of shape (N, model_outputs[mdl])
+        """
+        if x.shape[0] == 1 or mdl not in self.model_batch_prediction_function:
+            # model has a fixed batch size, so predict on one window at a time
+            return np.vstack([np.asarray(self.model_prediction_function[mdl](x[i:i+1])[0]).reshape(1, -1)
+                              for i in range(x.shape[0])])
+
+        return np.asarray(self.model_batch_prediction_function[mdl](x)[0]).reshape(x.shape[0], -1)
+
+    def predict_clip(self, clip: Union[str, np.ndarray], padding: int = 1, chunk_size=1280, return_type: str = "list",
+                     **kwargs):
         """Predict on an full audio clip, simulating streaming prediction.
         The input clip must bit a 16-bit, 16 khz, single-channel WAV file.
 
@@ -377,11 +648,185 @@ class Model():
             padding (int): How many seconds of silence to pad the start/end of the clip with
                             to make sure that short clips can be processed correctly (default: 1)
             chunk_size (int): The size (in samples) of each chunk of audio to pass to the model
+            return_type (str): The format of the predictions, either "list" (the default) for a list of frame-level
+                               prediction dictionaries, or "columnar" for a `ClipScores` object, which stores the scores
+                               of every frame in a single float32 matrix and uses much less memory for long clips.
             kwargs: Any keyword arguments to pass to the class `predict` method
 
         Returns:
-            list: A list containing the frame-level prediction dictionaries for the audio clip
+            Union[list, ClipScores]: The frame-level predictions for the audio clip, in the format set by `return_type`
+        """
+        if return_type == "columnar":
+            return ClipScores.concatenate(self.iter_clip_scores(clip, padding, chunk_size, **kwargs), self._get_labels())
+        elif return_type != "list":
+            raise ValueError(f"The return type must be 'list' or 'columnar', not '{return_type}'")
+
+        data = self._load_clip(clip, padding)
+
+        # Iterate through clip, getting predictions
+        predictions = []
+        step_size = chunk_size
+        for i in range(0, data.shape[0]-step_size, step_size):
+            predictions.append(self.predict(data[i:i+step_size], **kwargs))
+
+        return predictions
+
+    def iter_clip_scores(self, clip: Union[str, np.ndarray], padding: int = 1, chunk_size: int = 1280,
+                         block_size: int = 1024, vectorized: bool = False, **kwargs):
+        """Predict on a full audio clip, yielding the frame-level scores in blocks of `block_size` frames
+        (as `ClipScores` objects), so that the memory used for the scores doesn't grow with the length of the clip.
+
+        Args:
+            clip (Union[str, np.ndarray]): The path to a 16-bit PCM, 16 khz, single-channel WAV file,
+                                           or an 1D array containing the same type of data
+            padding (int): How many seconds of silence to pad the start/end of the clip with
+                            to make sure that short clips can be processed correctly (default: 1)
+            chunk_size (int): The size (in samples) of each chunk of audio to pass to the model
+                              (ignored when `vectorized` is True)
+            block_size (int): The number of frames in each block of scores
+            vectorized (bool): Whether to compute the scores like `predict_clip_vectorized` (much faster, and
+                               as if the model was newly reset) instead of like `predict_clip`
+            kwargs: Any keyword arguments to pass to the class `predict` method (only `patience`, `threshold`
+                    and `scale` when `vectorized` is True)
+
+        Yields:
+            ClipScores: The scores of each consecutive block of frames
+        """
+        if vectorized:
+            yield from self._iter_clip_scores_vectorized(self._load_clip(clip, padding), batch_size=block_size, **kwargs)
+            return
+
+        data = self._load_clip(clip, padding)
+        labels = self._get_labels()
+        block = np.empty((block_size, len(labels)), dtype=np.float32)
+        n_frames = 0
+        for i in range(0, data.shape[0]-chunk_size, chunk_size):
+            predictions = self.predict(data[i:i+chunk_size], **kwargs)
+            block[n_frames] = [predictions[label] for label in labels]
+            n_frames += 1
+            if n_frames == block_size:
+                yield ClipScores(block.copy(), labels)
+                n_frames = 0
+
+        if n_frames > 0:
+            yield ClipScores(block[0:n_frames].copy(), labels)
+
+    def predict_clip_vectorized(self, clip: Union[str, np.ndarray], padding: int = 1, patience: dict = {},
+                                threshold: dict = {}, batch_size: int = 1024, scale: Optional[float] = None):
+        """Predict on a full audio clip offline, producing the same scores as `predict_clip` (with the default
+        `chunk_size` of 1280) on a newly reset model, but with a few large batches of inference instead of
+        several small model calls for every 80 ms frame. Much faster for long clips (e.g., when measuring
+        false-positive rates). Like a newly reset model, the scores start from the initial feature buffer
+        (the cached features of `AudioFeatures._get_initial_features`, which are the same for every model
+        with the same feature models), so they don't depend on the audio the model has streamed before.
+
+        The state of the model used for streaming prediction is not changed (except for the
+        Speex noise suppression, if enabled).
+
+        Args:
+            clip (Union[str, np.ndarray]): The path to a 16-bit PCM, 16 khz, single-channel WAV file,
+                                           or an 1D array containing 16 khz audio (16-bit integer, or floating
+                                           point with `scale`)
+            padding (int): How many seconds of silence to pad the start/end of the clip with
+                            to make sure that short clips can be processed correctly (default: 1)
+            patience (dict): See the `predict` method
+            threshold (dict): See the `predict` method
+            batch_size (int): The number of frames to compute at once. Larger values are faster,
+                              but use more memory.
+            scale (float): See the `predict` method. Required for floating point audio.
+
+        Returns:
+            ClipScores: The frame-level scores for the audio clip, which can be indexed by label
+                        like a dictionary to get the array of scores for each label
         """
+        return ClipScores.concatenate(
+            self._iter_clip_scores_vectorized(self._load_clip(clip, padding), patience, threshold, batch_size, scale),
+            self._get_labels()
+        )
+
+    def _iter_clip_scores_vectorized(self, data: np.ndarray, patience: dict = {}, threshold: dict = {},
+                                     batch_size: int = 1024, scale: Optional[float] = None):
+        """Yields the scores of `predict_clip_vectorized` in blocks of `batch_size` frames"""
+        if patience != {} and threshold == {}:
+            raise ValueError("Error! When using the `patience` argument, threshold "
+                             "values must be provided via the `threshold` argument!")
+
+        data = to_int16_pcm(data, scale=scale)
+        n_frames = max(0, int(np.ceil((data.shape[0] - 1280)/1280)))
+        data = data[0:n_frames*1280]
+        if self.speex_ns:
+            data = self._suppress_noise_with_speex(data)
+
+        # Start each model with the initial feature buffer, and carry the end of the features, the
+        # frames above the patience threshold, and the VAD scores (and state) over to the next block
+        labels = self._get_labels()
+        initial_features = self.preprocessor._get_initial_features()
+        context = {mdl: initial_features[initial_features.shape[0] - (self.model_inputs[mdl] - 1):]
+                   for mdl in self.models.keys()}
+        patience_context = {label: np.empty(0, dtype=bool) for label in labels}
+        vad_context = np.full(6, -np.inf)
+        if self.vad_threshold > 0:
+            h, c = self.vad._h, self.vad._c
+            self.vad.reset_states()
+            vad_state = (self.vad._h, self.vad._c)
+            self.vad._h, self.vad._c = h, c
+
+        for start in range(0, n_frames, batch_size):
+            end = min(start + batch_size, n_frames)
+            frame = np.arange(start, end)
+            scores = np.empty((end - start, len(labels)), dtype=np.float32)
+
+            embeddings = self.preprocessor._get_streaming_embeddings(data, start, end)
+            for mdl in self.models.keys():
+                features = np.vstack((context[mdl], embeddings)).astype(np.float32)
+                context[mdl] = features[features.shape[0] - (self.model_inputs[mdl] - 1):]
+                windows = np.lib.stride_tricks.sliding_window_view(features, self.model_inputs[mdl], axis=0)
+                windows = np.ascontiguousarray(windows.transpose(0, 2, 1))
+                predictions = self._verify_predictions(mdl, self._predict_batch(mdl, windows), windows)
+                columns, outputs = self._model_columns[mdl]
+                scores[:, columns] = predictions[:, outputs]
+
+            # Zero scores for the first 5 frames during model initialization
+            scores[frame < 5] = 0
+
+            # Update scores based on thresholds or patience arguments, counting the frames above the threshold
+            # in the last `patience` frames (which, like the prediction buffer, can't be more than 30)
+            if patience != {}:
+                for ndx, label in enumerate(labels):
+                    parent_model = self._parent_models.get(label, "")
+                    if parent_model in patience.keys():
+                        n = patience[parent_model]
+                        above = np.concatenate((patience_context[label], scores[:, ndx] >= threshold[parent_model]))
+                        patience_context[label] = above[max(0, above.shape[0] - 29):]
+                        count = np.concatenate(([0], np.cumsum(above)))
+                        last = np.arange(above.shape[0] - scores.shape[0], above.shape[0]) + 1
+                        count = count[last] - count[np.maximum(last - n, 0)]
+                        scores[(count < n) | (frame + 1 < n) | (n > 30), ndx] = 0
+
+            # (optionally) zero scores not preceded by voice activity, using the max VAD score of
+            # the 3 frames from 0.4 to 0.56 seconds before each frame
+            if self.vad_threshold > 0:
+                h, c = self.vad._h, self.vad._c
+                self.vad._h, self.vad._c = vad_state
+                vad_scores = np.array([self.vad.predict(data[i:i+1280], 640) for i in range(start*1280, end*1280, 1280)])
+                vad_state = (self.vad._h, self.vad._c)
+                self.vad._h, self.vad._c = h, c
+
+                vad_scores = np.concatenate((vad_context, vad_scores))
+                vad_context = vad_scores[-6:]
+                vad_max_scores = np.lib.stride_tricks.sliding_window_view(vad_scores, 3)[0:end - start].max(axis=1)
+                scores[vad_max_scores < self.vad_threshold] = 0
+
+            yield ClipScores(scores, labels)
+
+    def _get_labels(self):
+        """Gets the labels of all of the models, in the same order as the prediction dictionaries"""
+        return [label for mdl in self.models.keys()
+                for label in ([mdl] if self.model_outputs[mdl] == 1 else self.class_mapping[mdl].values())]
+
+    @staticmethod
+    def _load_clip(clip: Union[str, np.ndarray], padding: int = 1):
+        """Loads an audio clip (see `predict_clip`), padding the start and end with `padding` seconds of silence"""
         if isinstance(clip, str):
             # Load audio clip as 16-bit PCM data
             with wave.open(clip, mode='rb') as f:
@@ -399,13 +844,7 @@ class Model():
                 )
             )
 
-        # Iterate through clip, getting predictions
-        predictions = []
-        step_size = chunk_size
-        for i in range(0, data.shape[0]-step_size, step_size):
-            predictions.append(self.predict(data[i:i+step_size], **kwargs))
-
-        return predictions
+        return data
 
     def _get_positive_prediction_frames(
             self,
@@ -446,7 +885,7 @@ class Model():
             for lbl in predictions.keys():
                 if predictions[lbl] >= threshold:
                     mdl = self.get_parent_model_from_label(lbl)
-                    features = self.preprocessor.get_features(self.model_inputs[mdl])
+                    features = self.preprocessor.get_features(self.model_inputs[mdl]).copy()
                     if return_type == 'features':
                         positive_data[lbl].append(features)
                     if return_type == 'audio':
@@ -484,3 +923,91 @@ class Model():
         cleaned_bytestring = b''.join(cleaned)
         cleaned_array = np.frombuffer(cleaned_bytestring, np.int16)
         return cleaned_array
+
+
+def predict_streams(models: List[Model], frames: List[np.ndarray], patience: dict = {}, threshold: dict = {},
+                    dtype: str = "int16", scale: Optional[float] = None):
+    """
+    Predict on one frame of audio for each of several independent streams, running the melspectrogram,
+    embedding, and wakeword models once for all of the streams together instead of once per stream.
+    This amortizes the per-call overhead of the inference framework across streams, and produces
+    the same scores as calling `Model.predict` on each stream separately.
+
+    All of the models must have been created with the same arguments (only the inference sessions of
+    the first model are used), and each model holds the state of exactly one stream. Frames that are
+    not exactly 1280 samples (80 ms), or streams with partially accumulated audio, are predicted
+    individually with `Model.predict`.
+
+    Args:
+        models (List[Model]): The models holding the state of each stream
+        frames (List[ndarray]): One frame of 16 khz audio for each stream (in any format accepted by `Model.predict`)
+        patience (dict): See the `Model.predict` method
+        threshold (dict): See the `Model.predict` method
+        dtype (str): See the `Model.predict` method
+        scale (float): See the `Model.predict` method. Required for floating point audio.
+
+    Returns:
+        list: The prediction dictionary for each stream, in the same order as the input
+    """
+    if len(models) != len(frames):
+        raise ValueError("Exactly one frame must be provided for each model!")
+
+    frames = [to_int16_pcm(x, dtype=dtype, scale=scale) for x in frames]
+    results: List[dict] = [{} for _ in models]
+    batch = []
+    for ndx, (mdl, x) in enumerate(zip(models, frames)):
+        pre = mdl.preprocessor
+        if x.shape[0] != 1280 or pre.accumulated_samples != 0 or pre.raw_data_remainder.shape[0] != 0:
+            results[ndx] = mdl.predict(x, patience=patience, threshold=threshold)
+        elif mdl.cascade is not None and not mdl._cascade_gate(x):
+            results[ndx] = mdl._predict_skipped(x, patience, threshold)
+        elif mdl._duty_cycle_skip():
+            results[ndx] = mdl._predict_skipped(x, patience, threshold, hold=True)
+        elif pre.skipped_samples != 0:
+            results[ndx] = mdl._predict_frames(x, patience, threshold)
+        else:
+            batch.append(ndx)
+
+    if batch == []:
+        return results
+
+    # Buffer audio for each stream, and compute melspectrograms for all streams at once
+    owner = models[batch[0]]
+    windows = []
+    for ndx in batch:
+        x = frames[ndx]
+        if models[ndx].speex_ns:
+            x = models[ndx]._suppress_noise_with_speex(x)
+        models[ndx].preprocessor._buffer_raw_data(x)
+        windows.append(models[ndx].preprocessor.raw_data_buffer[-1280-160*3:])
+    melspecs = owner.preprocessor._get_melspectrogram_streams(np.stack(windows))
+
+    # Compute embeddings for all streams at once
+    embedding_windows = []
+    for ndx, melspec in zip(batch, melspecs):
+        pre = models[ndx].preprocessor
+        pre.melspectrogram_ring.append(melspec)
+        embedding_windows.append(pre.melspectrogram_buffer[-76:])
+    embeddings = owner.preprocessor.embedding_model_predict(
+        np.stack(embedding_windows)[:, :, :, None]
+    ).reshape(len(batch), -1)
+
+    for ndx, embedding in zip(batch, embeddings):
+        models[ndx].preprocessor.feature_ring.append(embedding[None, ])
+
+    # Predict with each wakeword model on all streams at once, sharing the features between models with the same input length
+    model_predictions: List[dict] = [{} for _ in batch]
+    features: Dict[int, np.ndarray] = {}
+    for mdl in owner.models.keys():
+        n_inputs = owner.model_inputs[mdl]
+        if n_inputs not in features:
+            features[n_inputs] = np.vstack([models[ndx].preprocessor.get_features(n_inputs) for ndx in batch])
+        scores = owner._verify_predictions(mdl, owner._predict_batch(mdl, features[n_inputs]), features[n_inputs])
+        for stream_predictions, score in zip(model_predictions, scores):
+            stream_predictions[mdl] = score
+
+    for ndx, stream_predictions in zip(batch, model_predictions):
+        results[ndx] = models[ndx]._filter_predictions(models[ndx]._update_predictions(stream_predictions),
+                                                       frames[ndx], patience, threshold)
+
+    return results
@@ -0,0 +1,388 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import math
+import logging
+import numpy as np
+import scipy.special
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+
+# The ONNX operators supported by `NumpyModel`. Each function takes the node (for its attributes) and returns
+# a function computing the outputs from the input arrays. Attributes are read once, when the model is loaded.
+def _attributes(node) -> dict:
+    import onnx
+    return {a.name: onnx.helper.get_attribute_value(a) for a in node.attribute}
+
+
+def _reduce_mean(node):
+    attributes = _attributes(node)
+    axes = tuple(attributes.get("axes", ()))
+    keepdims = bool(attributes.get("keepdims", 1))
+
+    # np.add.reduce has less overhead than np.mean, which matters for the small arrays of wakeword models
+    def reduce_mean(x, input_axes=None):
+        # The axes are an attribute before opset 18, and an input after
+        reduce_axes = tuple(int(i) for i in input_axes) if input_axes is not None else axes or tuple(range(x.ndim))
+        return np.add.reduce(x, axis=reduce_axes, keepdims=keepdims)*(1/math.prod([x.shape[i] for i in reduce_axes]))
+
+    return reduce_mean
+
+
+def _gemm(node):
+    attributes = _attributes(node)
+    alpha, beta = np.float32(attributes.get("alpha", 1.0)), np.float32(attributes.get("beta", 1.0))
+    trans_a, trans_b = attributes.get("transA", 0), attributes.get("transB", 0)
+
+    def gemm(a, b, c=None):
+        y = (a.T if trans_a else a) @ (b.T if trans_b else b)
+        if alpha != 1:
+            y *= alpha
+        if c is not None:
+            y += c*beta if beta != 1 else c
+        return y
+
+    return gemm
+
+
+def _dense_function(weights: np.ndarray, bias: np.ndarray = None):
+    """A dense layer (a Gemm without scaling or transposed inputs), for constant weights (of shape (outputs, inputs)) and bias"""
+    weights = np.ascontiguousarray(weights.T)
+
+    def dense(x):
+        y = x @ weights
+        if bias is not None:
+            y += bias
+        return y
+
+    return dense
+
+
+def _flatten(node):
+    axis = _attributes(node).get("axis", 1)
+    return lambda x: x.reshape(math.prod(x.shape[:axis]), -1)
+
+
+def _reshape(node):
+    allowzero = _attributes(node).get("allowzero", 0)
+
+    def reshape(x, shape):
+        shape = [x.shape[i] if (dim == 0 and not allowzero) else int(dim) for i, dim in enumerate(shape)]
+        # Keep the batch dimension of models exported with a batch size of 1
+        if len(shape) > 0 and shape[0] == 1 and x.shape[0] != 1 and -1 not in shape:
+            shape[0] = -1
+        return x.reshape(shape)
+
+    return reshape
+
+
+def _softmax(node):
+    axis = _attributes(node).get("axis", -1)
+
+    def softmax(x):
+        e = np.exp(x - x.max(axis=axis, keepdims=True))
+        return e/e.sum(axis=axis, keepdims=True)
+
+    return softmax
+
+
+def _layer_normalization(node):
+    epsilon = _attributes(node).get("epsilon", 1e-5)
+
+    def layer_normalization(x, scale, bias=None):
+        # Only used if the scale or bias aren't constant (see `NumpyModel._bind_constants`)
+        return _layer_normalization_function(epsilon, scale, bias)(x)
+
+    return layer_normalization
+
+
+def _layer_normalization_function(epsilon: float, scale: np.ndarray, bias: np.ndarray = None):
+    """Layer normalization over the last dimensions of the input (the dimensions of `scale`), for a constant scale and bias"""
+    epsilon = np.float32(epsilon)
+    axes = tuple(range(-scale.ndim, 0))
+    n = np.float32(1/scale.size)
+
+    def layer_normalization(x):
+        d = x - np.add.reduce(x, axis=axes, keepdims=True)*n
+        v = np.add.reduce(d*d, axis=axes, keepdims=True)
+        v *= n
+        v += epsilon
+        d /= np.sqrt(v, out=v)
+        d *= scale
+        if bias is not None:
+            d += bias
+        return d
+
+    return layer_normalization
+
+
+def _batch_normalization(node):
+    epsilon = np.float32(_attributes(node).get("epsilon", 1e-5))
+
+    def batch_normalization(x, scale, bias, mean, var):
+        shape = (1, -1) + (1, )*(x.ndim - 2)
+        return (x - mean.reshape(shape))/np.sqrt(var.reshape(shape) + epsilon)*scale.reshape(shape) + bias.reshape(shape)
+
+    return batch_normalization
+
+
+def _pow(node):
+    def power(x, y):
+        return x*x if y.size == 1 and y == 2 else np.power(x, y)
+    return power
+
+
+def _leaky_relu(node):
+    alpha = np.float32(_attributes(node).get("alpha", 0.01))
+    return lambda x: np.where(x > 0, x, x*alpha)
+
+
+def _transpose(node):
+    perm = _attributes(node).get("perm")
+    return lambda x: np.transpose(x, perm)
+
+
+def _concat(node):
+    axis = _attributes(node)["axis"]
+    return lambda *x: np.concatenate(x, axis=axis)
+
+
+def _squeeze(node):
+    # The axes are an attribute before opset 13, and an input after
+    axes = tuple(_attributes(node).get("axes", ())) or None
+    return lambda x, a=None: np.squeeze(x, tuple(int(i) for i in a) if a is not None else axes)
+
+
+def _unsqueeze(node):
+    axes = tuple(_attributes(node).get("axes", ()))
+    return lambda x, a=None: np.expand_dims(x, tuple(int(i) for i in a) if a is not None else axes)
+
+
+def _clip(node):
+    attributes = _attributes(node)
+    return lambda x, lo=None, hi=None: np.clip(x, lo if lo is not None else attributes.get("min"),
+                                               hi if hi is not None else attributes.get("max"))
+
+
+_OPERATORS: Dict[str, Callable] = {
+    "Add": lambda node: np.add,
+    "Sub": lambda node: np.subtract,
+    "Mul": lambda node: np.multiply,
+    "Div": lambda node: np.divide,
+    "Pow": _pow,
+    "Sqrt": lambda node: np.sqrt,
+    "Exp": lambda node: np.exp,
+    "Neg": lambda node: np.negative,
+    "Relu": lambda node: lambda x: np.maximum(x, 0),
+    "LeakyRelu": _leaky_relu,
+    "Sigmoid": lambda node: scipy.special.expit,
+    "Tanh": lambda node: np.tanh,
+    "Softmax": _softmax,
+    "Clip": _clip,
+    "Gemm": _gemm,
+    "MatMul": lambda node: np.matmul,
+    "Flatten": _flatten,
+    "Reshape": _reshape,
+    "Identity": lambda node: lambda x: x,
+    "Transpose": _transpose,
+    "Squeeze": _squeeze,
+    "Unsqueeze": _unsqueeze,
+    "Concat": _concat,
+    "ReduceMean": _reduce_mean,
+    "LayerNormalization": _layer_normalization,
+    "BatchNormalization": _batch_normalization,
+}
+
+# The input/output metadata, with the same attributes as those of ONNX runtime sessions
+NodeArg = namedtuple("NodeArg", ["name", "shape", "type"])
+
+
+class NumpyModel():
+    """
+    Runs a small ONNX model (like the openWakeWord wakeword models, a few dense layers over a window of
+    audio features) with NumPy instead of ONNX runtime, e.g. to run or inspect wakeword models where ONNX
+    runtime isn't available. It is not a faster alternative: each NumPy operation has a fixed overhead, and on
+    the hardware that it was measured on, ONNX runtime was several times faster for the included wakeword models
+    (see `benchmarks/numpy_inference_benchmark.py`).
+
+    The graph is loaded once: the weights (initializers) are read into arrays, every node that only depends on
+    constants is computed ahead of time, the weights of dense layers and layer normalizations are prepared, and
+    the rest of the nodes are turned into a list of NumPy operations. Inputs can have any batch size. The object
+    has the same `run`, `get_inputs`, and `get_outputs` methods as an ONNX runtime inference session, so that
+    it can be used in place of one.
+
+    Use `load_numpy_model` to fall back to ONNX runtime for models with operators that aren't supported.
+    """
+    def __init__(self, model_path: str):
+        """Load the model.
+
+        Args:
+            model_path (str): The path to the ONNX model
+
+        Raises:
+            NotImplementedError: If the model has operators that aren't supported
+        """
+        import onnx
+        from onnx import numpy_helper
+
+        model = onnx.load(model_path)
+        graph = model.graph
+        unsupported = sorted({node.op_type for node in graph.node if node.op_type not in _OPERATORS and node.op_type != "Constant"})
+        if unsupported != []:
+            raise NotImplementedError(f"Unsupported ONNX operators: {', '.join(unsupported)}")
+
+        def get_shape(value_info):
+            dims = value_info.type.tensor_type.shape.dim
+            return ["batch"] + [d.dim_value if d.HasField("dim_value") else d.dim_param for d in dims[1:]]
+
+        self._inputs = [NodeArg(i.name, get_shape(i), "tensor(float)") for i in graph.input
+                        if i.name not in {j.name for j in graph.initializer}]
+        self._outputs = [NodeArg(i.name, get_shape(i), "tensor(float)") for i in graph.output]
+
+        # Compute the constant part of the graph, and compile the rest
+        self.constants: Dict[str, np.ndarray] = {}
+        for initializer in graph.initializer:
+            array = numpy_helper.to_array(initializer)
+            self.constants[initializer.name] = array.astype(np.float32) if array.dtype == np.float64 else array
+
+        self.steps: List[tuple] = []
+        for node in graph.node:
+            if node.op_type == "Constant":
+                self.constants[node.output[0]] = numpy_helper.to_array(_attributes(node)["value"])
+                continue
+
+            function = _OPERATORS[node.op_type](node)
+            if all(i in self.constants or i == "" for i in node.input):
+                outputs = function(*[self.constants[i] if i != "" else None for i in node.input])
+                for name, output in zip(node.output, outputs if isinstance(outputs, tuple) else (outputs, )):
+                    self.constants[name] = np.asarray(output)
+            else:
+                self.steps.append((node.op_type, function, tuple(node.input), tuple(node.output), _attributes(node)))
+
+        self.steps = self._fuse_layer_normalization(self.steps, {i.name for i in graph.output})
+        self.steps = [self._bind_constants(*step) for step in self.steps]
+
+    # The operators of layer normalization in models exported from PyTorch with opsets before 17
+    _LAYER_NORMALIZATION_PATTERN = ("ReduceMean", "Sub", "Pow", "ReduceMean", "Add", "Sqrt", "Div", "Mul", "Add")
+
+    def _fuse_layer_normalization(self, steps: list, graph_outputs: set):
+        """Replace each layer normalization that was exported as separate operators with a single step"""
+        n = len(self._LAYER_NORMALIZATION_PATTERN)
+        fused: list = []
+        i = 0
+        while i < len(steps):
+            window = steps[i:i + n]
+            if tuple(step[0] for step in window) == self._LAYER_NORMALIZATION_PATTERN:
+                (_, _, (x, ), (mean, ), attributes), sub, power, variance, add, sqrt, div, mul, add_bias = window
+                intermediates = {output for step in window[:-1] for output in step[3]}
+                used_elsewhere = {j for step in steps[:i] + steps[i + n:] for j in step[2]} | graph_outputs
+                epsilon = self.constants.get(add[2][1])
+                if (sub[2] == (x, mean) and power[2][0] == sub[3][0]
+                        and np.array_equal(self.constants.get(power[2][1]), 2)
+                        and variance[2] == power[3] and variance[4] == attributes and add[2][0] == variance[3][0]
+                        and epsilon is not None and epsilon.size == 1 and sqrt[2] == add[3]
+                        and div[2] == (sub[3][0], sqrt[3][0]) and mul[2][0] == div[3][0] and mul[2][1] in self.constants
+                        and add_bias[2][0] == mul[3][0] and add_bias[2][1] in self.constants
+                        and attributes.get("keepdims", 1) == 1 and list(attributes.get("axes", ())) == [-1]
+                        and not intermediates & used_elsewhere):
+                    fused.append(("LayerNormalization", _layer_normalization_function(float(epsilon), self.constants[mul[2][1]]),
+                                  (x, mul[2][1], add_bias[2][1]), add_bias[3], {"axis": -1, "epsilon": float(epsilon)}))
+                    i += n
+                    continue
+            fused.append(steps[i])
+            i += 1
+
+        return fused
+
+    def _bind_constants(self, op_type: str, function: Callable, inputs: tuple, outputs: tuple, attributes: dict):
+        """
+        Binds the constant inputs (like weights) of a step to its function, so that each call only gets the computed
+        inputs. Dense layers and layer normalizations are replaced with functions that prepare their weights once.
+
+        Returns:
+            tuple: The function, the names of its (computed) inputs, and the names of its outputs
+        """
+        args = [self.constants[i] if i in self.constants else None if i == "" else i for i in inputs]
+        dynamic = [ndx for ndx, i in enumerate(inputs) if i != "" and i not in self.constants]
+        constant = [ndx for ndx in range(1, len(inputs)) if ndx not in dynamic]
+
+        if dynamic == [0] and op_type == "LayerNormalization" and constant == list(range(1, len(inputs))):
+            scale, bias = (args[1:] + [None])[:2]
+            return _layer_normalization_function(attributes.get("epsilon", 1e-5), scale, bias), inputs[0:1], outputs
+        gemm_attributes = tuple(attributes.get(i, default) for i, default in (("alpha", 1.0), ("beta", 1.0), ("transA", 0), ("transB", 0)))
+        if dynamic == [0] and op_type == "Gemm" and constant == list(range(1, len(inputs))) and gemm_attributes == (1, 1, 0, 1):
+            return _dense_function(*args[1:]), inputs[0:1], outputs
+
+        if len(dynamic) == len(inputs):
+            return function, inputs, outputs
+        if dynamic == [0]:
+            rest = args[1:]
+            return (lambda x: function(x, *rest)), inputs[0:1], outputs
+
+        def bound(*x):
+            values = list(args)
+            for ndx, value in zip(dynamic, x):
+                values[ndx] = value
+            return function(*values)
+
+        return bound, tuple(inputs[ndx] for ndx in dynamic), outputs
+
+    def get_inputs(self):
+        return self._inputs
+
+    def get_outputs(self):
+        return self._outputs
+
+    def run(self, output_names, input_feed: dict):
+        """
+        Predict on the inputs, like `onnxruntime.InferenceSession.run`.
+
+        Args:
+            output_names (list): The names of the outputs to return (or None for all of the outputs)
+            input_feed (dict): The input arrays, by name
+
+        Returns:
+            list: The output arrays
+        """
+        values = dict(input_feed)
+        for function, inputs, outputs in self.steps:
+            result = function(values[inputs[0]]) if len(inputs) == 1 else function(*[values[i] for i in inputs])
+            if len(outputs) == 1:
+                values[outputs[0]] = result
+            else:
+                values.update(zip(outputs, result))
+
+        return [values[i] if i in values else self.constants[i] for i in (output_names or [i.name for i in self._outputs])]
+
+
+def load_numpy_model(model_path: str):
+    """
+    Loads an ONNX model as a `NumpyModel` when possible, and otherwise (if the model has operators
+    that aren't supported, or the optional `onnx` package isn't installed) as a shared ONNX runtime
+    session with a dynamic batch size (see `openwakeword.sessions.session_registry`).
+
+    Args:
+        model_path (str): The path to the ONNX model
+
+    Returns:
+        The `NumpyModel`, or the ONNX runtime session (which must be released with `session_registry.release`)
+    """
+    try:
+        return NumpyModel(model_path)
+    except (ImportError, NotImplementedError) as e:
+        from openwakeword.sessions import session_registry
+        logging.info(f"Using ONNX runtime for the model '{model_path}', as it can't be run with NumPy: {e}")
+        return session_registry.acquire(model_path, dynamic_batch=True)
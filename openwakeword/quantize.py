@@ -0,0 +1,215 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# This file contains tools to quantize the ONNX embedding and wakeword models to 8-bit integers
+# (which can make them substantially faster on CPUs), and to check that the quantized models
+# are still accurate enough before using them (with `Model(..., quantized=True)`).
+
+# Imports
+import os
+import pathlib
+import numpy as np
+from typing import List, Optional, Union
+import openwakeword
+from openwakeword import metrics
+from openwakeword.utils import AudioFeatures
+
+
+def get_quantized_model_path(model_path: str):
+    """Gets the path of the quantized version of an ONNX model (e.g., `alexa_v0.1.onnx` -> `alexa_v0.1_int8.onnx`)"""
+    base, ext = os.path.splitext(model_path)
+    return base + "_int8" + ext
+
+
+def quantize_model(model_path: str, output_path: str = "", method: str = "dynamic",
+                   calibration_inputs: Optional[np.ndarray] = None):
+    """
+    Quantizes the weights (and, with static quantization, the activations) of an ONNX model to 8-bit integers.
+    Requires the `onnx` package.
+
+    Args:
+        model_path (str): The path to the ONNX model
+        output_path (str): Where to save the quantized model (by default, next to the original model, see
+                           `get_quantized_model_path`)
+        method (str): Either "dynamic" (only the weights are quantized ahead of time, and activations are
+                      quantized at run time) or "static" (activations are also quantized ahead of time,
+                      using the ranges observed on the `calibration_inputs`)
+        calibration_inputs (ndarray): Representative inputs for the model (including the batch dimension),
+                                      required for static quantization (see `get_calibration_inputs`)
+
+    Returns:
+        str: The path of the quantized model
+    """
+    try:
+        from onnxruntime.quantization import quantize_dynamic, quantize_static, CalibrationDataReader, QuantType
+    except ImportError:
+        raise ValueError("Quantizing models requires the `onnx` package, please install it using `pip install onnx`")
+
+    output_path = output_path or get_quantized_model_path(model_path)
+    if method == "dynamic":
+        quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    elif method == "static":
+        if calibration_inputs is None:
+            raise ValueError("Static quantization requires calibration inputs!")
+
+        class ArrayDataReader(CalibrationDataReader):
+            def __init__(self, input_name, x):
+                self.inputs = iter([{input_name: x[i:i+1].astype(np.float32)} for i in range(x.shape[0])])
+
+            def get_next(self):
+                return next(self.inputs, None)
+
+        import onnxruntime as ort
+        input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+        quantize_static(model_path, output_path, ArrayDataReader(input_name, calibration_inputs),
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    else:
+        raise ValueError(f"The quantization method must be 'dynamic' or 'static', not '{method}'")
+
+    return output_path
+
+
+def get_calibration_inputs(clips: List[Union[str, np.ndarray]], n_feature_frames: int = 16, max_examples: int = 1000,
+                           **kwargs):
+    """
+    Computes inputs for the static quantization of the embedding model (melspectrogram windows) and
+    of wakeword models (windows of embeddings) from representative audio clips.
+
+    Args:
+        clips (List[Union[str, np.ndarray]]): Paths to 16-bit PCM, 16 khz, single-channel WAV files or arrays of
+                                              the same type of data, at least 1 second long
+        n_feature_frames (int): The number of embedding frames in the input of the wakeword models
+        max_examples (int): The maximum number of examples of each type of input
+        kwargs: Any keyword arguments to pass to the `AudioFeatures` instance
+
+    Returns:
+        tuple: The inputs of the embedding model, of shape (N, 76, 32, 1), and of the wakeword models,
+               of shape (M, n_feature_frames, 96)
+    """
+    preprocessor = AudioFeatures(inference_framework="onnx", **kwargs)
+    rng = np.random.default_rng(0)
+    melspec_windows, feature_windows = [], []
+    for clip in clips:
+        data = openwakeword.Model._load_clip(clip, padding=0)
+        spec = preprocessor._get_melspectrogram(data).reshape(-1, 32)
+        melspec_windows.extend(spec[i:i+76] for i in range(0, spec.shape[0] - 75, 8))
+        embeddings = preprocessor._get_embeddings(data).reshape(-1, 96)
+        feature_windows.extend(embeddings[i:i+n_feature_frames] for i in range(0, embeddings.shape[0] - n_feature_frames + 1))
+
+    def sample(windows):
+        windows = np.array(windows, dtype=np.float32)
+        return windows[rng.permutation(windows.shape[0])[0:max_examples]]
+
+    return sample(melspec_windows)[:, :, :, None], sample(feature_windows)
+
+
+def quantize_models(wakeword_models: List[str], embedding_model_path: str = "", method: str = "dynamic",
+                    calibration_clips: List[Union[str, np.ndarray]] = [], **kwargs):
+    """
+    Quantizes the embedding model and wakeword models (see `quantize_model`), saving each quantized model
+    next to the original, so that they are loaded by `Model(..., quantized=True)`.
+
+    Args:
+        wakeword_models (List[str]): The paths of the ONNX wakeword models
+        embedding_model_path (str): The path of the ONNX embedding model (by default, the included model)
+        method (str): Either "dynamic" or "static" (see `quantize_model`)
+        calibration_clips (List[Union[str, np.ndarray]]): Representative audio clips to calibrate static
+                                                          quantization (see `get_calibration_inputs`)
+        kwargs: Any other keyword arguments to pass to the `AudioFeatures` instance used for calibration
+
+    Returns:
+        list: The paths of the quantized models
+    """
+    embedding_model_path = embedding_model_path or os.path.join(
+        pathlib.Path(__file__).parent.resolve(), "resources", "models", "embedding_model.onnx"
+    )
+    embedding_inputs, feature_inputs = None, None
+    if method == "static":
+        if not calibration_clips:
+            raise ValueError("Static quantization requires calibration clips!")
+        embedding_inputs, feature_inputs = get_calibration_inputs(
+            calibration_clips, embedding_model_path=embedding_model_path, **kwargs
+        )
+
+    paths = [quantize_model(embedding_model_path, method=method, calibration_inputs=embedding_inputs)]
+    for model_path in wakeword_models:
+        paths.append(quantize_model(model_path, method=method, calibration_inputs=feature_inputs))
+
+    return paths
+
+
+def evaluate_quantized_models(wakeword_models: List[str], positive_clips: List[Union[str, np.ndarray]],
+                              negative_clips: List[Union[str, np.ndarray]], max_score_drift: float = 0.1,
+                              max_tpr_decrease: float = 0.02, max_fpr_increase: float = 0.5, n_points: int = 25,
+                              **kwargs):
+    """
+    Compares the scores of the quantized models (created with `quantize_models`) with those of the original models,
+    to decide whether the quantized models are accurate enough to use. The first frames of each clip, whose scores
+    depend on the (synthetic) initial feature buffer rather than on the clip, are ignored.
+
+    Args:
+        wakeword_models (List[str]): The paths of the original ONNX wakeword models
+        positive_clips (List[Union[str, np.ndarray]]): Clips that each contain one example of the wake word/phrase
+                                                       (for every model), to compute true-positive rates
+        negative_clips (List[Union[str, np.ndarray]]): Clips without the wake word/phrase (e.g., long recordings of
+                                                       speech and noise), to compute false-positive rates per hour
+        max_score_drift (float): The maximum allowed difference between the scores of any frame
+        max_tpr_decrease (float): The maximum allowed decrease of the true-positive rate, at any threshold
+        max_fpr_increase (float): The maximum allowed increase of false-positives per hour, at any threshold
+        n_points (int): The number of thresholds (between 0.01 and 0.99) at which the rates are compared
+        kwargs: Any other keyword arguments to pass to the `Model` instances
+
+    Returns:
+        dict: For each label, the maximum and mean score drift, the true-positive and false-positive rates of the
+              original and quantized models at each threshold, and whether the quantized model passed
+    """
+    models = [openwakeword.Model(wakeword_models=wakeword_models, inference_framework="onnx", **kwargs),
+              openwakeword.Model(wakeword_models=wakeword_models, inference_framework="onnx", quantized=True, **kwargs)]
+    skip = max(models[0].model_inputs.values())
+
+    def score_clips(model, clips):
+        return [model.predict_clip_vectorized(clip) for clip in clips]
+
+    def get_fprs(clip_scores: List[np.ndarray]):
+        """False positives per hour at each threshold, counted separately in each clip (so none span two clips)"""
+        hours = sum(len(s) for s in clip_scores)*0.08/3600
+        return [sum(metrics.get_false_positives(s, threshold=threshold) for s in clip_scores)/hours
+                for threshold in np.linspace(0.01, 0.99, num=n_points)]
+
+    positive_scores = [score_clips(model, positive_clips) for model in models]
+    negative_scores = [score_clips(model, negative_clips) for model in models]
+
+    results = {}
+    for label in models[0]._get_labels():
+        drift = np.concatenate([np.abs(a[label][skip:] - b[label][skip:])
+                                for a, b in zip(positive_scores[0] + negative_scores[0], positive_scores[1] + negative_scores[1])])
+        tprs = [metrics.generate_roc_curve_tprs(np.array([s[label][skip:].max() for s in scores]), n_points=n_points)
+                if scores else [] for scores in positive_scores]
+        fprs = [get_fprs([s[label][skip:] for s in scores]) if scores else [] for scores in negative_scores]
+
+        results[label] = {
+            "max_score_drift": float(drift.max()) if drift.size else 0.0,
+            "mean_score_drift": float(drift.mean()) if drift.size else 0.0,
+            "tpr": tprs[0],
+            "tpr_quantized": tprs[1],
+            "fpr": fprs[0],
+            "fpr_quantized": fprs[1],
+        }
+        results[label]["passed"] = bool(
+            results[label]["max_score_drift"] <= max_score_drift
+            and all(a - b <= max_tpr_decrease for a, b in zip(tprs[0], tprs[1]))
+            and all(b - a <= max_fpr_increase for a, b in zip(fprs[0], fprs[1]))
+        )
+
+    return results
@@ -0,0 +1,112 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import functools
+from math import gcd
+import numpy as np
+import scipy.signal
+
+
+@functools.lru_cache(maxsize=32)
+def get_polyphase_filter(up: int, down: int, window: tuple = ("kaiser", 5.0)):
+    """
+    Designs the anti-aliasing filter for rational resampling by `up`/`down` (the same filter
+    as `scipy.signal.resample_poly`), and splits it into `up` phases. Results are cached,
+    so all streams with the same pair of sample rates share one filter.
+
+    Args:
+        up (int): The upsampling factor
+        down (int): The downsampling factor
+        window (tuple): The window used to design the FIR filter
+
+    Returns:
+        tuple: An array of shape (up, taps) with the time-reversed filter of each phase,
+               and the delay of the filter in output samples
+    """
+    max_rate = max(up, down)
+    half_len = 10*max_rate
+    h = scipy.signal.firwin(2*half_len + 1, 1.0/max_rate, window=window)*up
+
+    taps = int(np.ceil(h.shape[0]/up))
+    h = np.concatenate((h, np.zeros(taps*up - h.shape[0])))
+    phases = h.reshape(taps, up).T[:, ::-1].astype(np.float32)
+    phases.flags.writeable = False
+
+    return phases, half_len//down
+
+
+class StreamingResampler():
+    """
+    A polyphase resampler for streaming 16-bit PCM audio, which keeps the filter history across chunks
+    so that audio split into arbitrary chunks is resampled exactly as if it were a single signal
+    (with no artifacts at chunk boundaries).
+
+    The output is delayed by a few samples (the filter delay is removed from the start of the stream), so
+    that it lines up with `scipy.signal.resample_poly` applied to the whole signal.
+    """
+    def __init__(self, input_rate: int, output_rate: int = 16000):
+        """Initialize the resampler.
+
+        Args:
+            input_rate (int): The sample rate of the input audio
+            output_rate (int): The sample rate of the output audio (default: 16000)
+        """
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+
+        divisor = gcd(input_rate, output_rate)
+        self.up = output_rate//divisor
+        self.down = input_rate//divisor
+        self.phases, self.delay = get_polyphase_filter(self.up, self.down)
+        self.reset()
+
+    def reset(self):
+        """Reset the filter history, to start resampling a new stream"""
+        self.history = np.zeros(self.phases.shape[1] - 1, dtype=np.float32)
+        self.n_input = 0
+        self.n_output = 0
+
+    def __call__(self, x: np.ndarray) -> np.ndarray:
+        """
+        Resample the next chunk of the stream.
+
+        Args:
+            x (ndarray): The next chunk of 16-bit PCM audio, of any length
+
+        Returns:
+            ndarray: All of the 16-bit PCM output samples that can be computed from the audio received so far
+        """
+        if x.shape[0] == 0:
+            return np.empty(0, dtype=np.int16)
+
+        taps = self.phases.shape[1]
+        buffer = np.concatenate((self.history, x.astype(np.float32)))
+        start = self.n_input - (taps - 1)  # the stream index of the first sample in the buffer
+        self.n_input += x.shape[0]
+
+        # Every output sample whose last input sample has been received
+        n_end = (self.n_input*self.up - 1)//self.down + 1
+        n = np.arange(self.n_output, n_end)
+        self.n_output = n_end
+        self.history = buffer[buffer.shape[0] - (taps - 1):]
+
+        last_input = n*self.down//self.up
+        windows = np.lib.stride_tricks.sliding_window_view(buffer, taps)[last_input - start - (taps - 1)]
+        y = np.einsum("ij,ij->i", windows, self.phases[n*self.down % self.up])
+
+        # Drop the first samples, which only reflect the filter delay
+        y = y[max(0, self.delay - n[0]):] if n.shape[0] > 0 else y
+
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
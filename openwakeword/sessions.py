@@ -0,0 +1,408 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import os
+import hashlib
+import contextlib
+import logging
+import platform
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple, Union
+
+
+def get_dynamic_batch_model(model_path: str) -> Optional[bytes]:
+    """
+    Makes the batch (first) dimension of the inputs and outputs of an ONNX model dynamic, so that
+    models exported with a fixed batch size of 1 can predict on several inputs at once. Requires
+    the `onnx` package, which is optional.
+
+    Args:
+        model_path (str): The path to the ONNX model
+
+    Returns:
+        bytes: The serialized model with a dynamic batch dimension, or None if the `onnx` package isn't installed
+    """
+    try:
+        import onnx
+    except ImportError:
+        return None
+
+    model = onnx.load(model_path)
+    for tensor in list(model.graph.input) + list(model.graph.output):
+        dim = tensor.type.tensor_type.shape.dim[0]
+        dim.Clear()
+        dim.dim_param = "batch"
+
+    return model.SerializeToString()
+
+
+class SessionRegistry():
+    """
+    A registry of ONNX runtime inference sessions, which loads each model file once per process and
+    shares the session between all of the objects that use it (e.g., the melspectrogram, embedding, wakeword
+    and VAD models of every `Model` object). Inference sessions are thread-safe and hold no per-stream state,
+    so sharing them only saves load time and memory; the state of each stream (audio buffers, VAD state, etc.)
+    stays in the objects that use the sessions.
+
+    Sessions are reference counted: each call to `acquire` must be matched by a call to `release`, and the
+    registry drops a session once it is no longer used, so that the model is unloaded when the last
+    object using it is deleted.
+
+    Releases usually come from `weakref.finalize` callbacks, which the garbage collector can run in the
+    middle of any allocation, including one made by `acquire` on the same thread. So releases are queued,
+    and applied by whichever thread next holds the lock, rather than waiting for it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[tuple, object] = {}
+        self._refcounts: Dict[tuple, int] = {}
+        self._keys: Dict[int, tuple] = {}
+        self._released: deque = deque()
+        self.configure()
+
+    def configure(self, cache_dir: Optional[str] = None, optimization_level: str = "all",
+                  intra_op_num_threads: Optional[int] = None, inter_op_num_threads: Optional[int] = None,
+                  enable_cpu_mem_arena: bool = True, allow_spinning: bool = True):
+        """
+        Sets the options used to create sessions. Only sessions loaded after the call are affected, so
+        this should be called before any models are created. The defaults are those of ONNX runtime.
+
+        Args:
+            cache_dir (str): A directory in which to cache the optimized version of each model, so that graph
+                             optimizations are only done the first time a model is loaded (e.g., shortening the start
+                             up of new containers that share the cache). Optimized models are specific to the model
+                             file, ONNX runtime version, optimization level, device and CPU architecture. If None
+                             (the default), models are optimized every time they are loaded.
+            optimization_level (str): The graph optimization level, one of "disable", "basic", "extended" or "all"
+            intra_op_num_threads (int): The number of threads used within each operator. If None, the number of
+                                        threads requested by each model is used (usually 1).
+            inter_op_num_threads (int): The number of threads used to run independent operators in parallel. If None,
+                                        the number of threads requested by each model is used (usually 1).
+            enable_cpu_mem_arena (bool): Whether to use a memory arena for CPU allocations, which is faster but holds on
+                                         to the peak memory used by each model
+            allow_spinning (bool): Whether idle threads spin (busy-wait) for new work, which lowers latency at the cost of
+                                   CPU usage when using more than one thread
+        """
+        if optimization_level not in ("disable", "basic", "extended", "all"):
+            raise ValueError(f"The optimization level must be 'disable', 'basic', 'extended' or 'all', not '{optimization_level}'")
+
+        self.cache_dir = cache_dir
+        self.optimization_level = optimization_level
+        self.intra_op_num_threads = intra_op_num_threads
+        self.inter_op_num_threads = inter_op_num_threads
+        self.enable_cpu_mem_arena = enable_cpu_mem_arena
+        self.allow_spinning = allow_spinning
+
+    def acquire(self, model_path: str, ncpu: int = 1, device: str = "cpu", dynamic_batch: bool = False):
+        """
+        Gets the shared inference session for a model, loading it if needed.
+
+        Args:
+            model_path (str): The path to the ONNX model
+            ncpu (int): The number of threads used by the session
+            device (str): The device to use, either "cpu" or "gpu"
+            dynamic_batch (bool): Whether to make the batch dimension of the model dynamic, if it is fixed
+                                  (see `get_dynamic_batch_model`). If this isn't possible, the original model is used.
+
+        Returns:
+            onnxruntime.InferenceSession: The session
+        """
+        key = (os.path.abspath(model_path), ncpu, device, dynamic_batch)
+        with self._locked():
+            if key in self._sessions:
+                self._refcounts[key] += 1
+                return self._sessions[key]
+
+        # Load the model outside of the lock, so that other models can be acquired and released meanwhile
+        session = self._load(*key)
+
+        with self._locked():
+            if key not in self._sessions:  # otherwise, another thread loaded the model first
+                self._sessions[key] = session
+                self._refcounts[key] = 0
+                self._keys[id(session)] = key
+            self._refcounts[key] += 1
+            return self._sessions[key]
+
+    def release(self, *sessions):
+        """Releases sessions returned by `acquire`, unloading the models that are no longer used"""
+        self._released.extend(sessions)
+        self._apply_releases()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Holds the lock, and applies the releases queued meanwhile once it is released"""
+        try:
+            with self._lock:
+                yield
+        finally:
+            self._apply_releases()
+
+    def _apply_releases(self):
+        """Applies the queued releases, unless the lock is held (on this thread or another one)"""
+        # The holder of the lock applies the queue again once it releases the lock, so no release is left behind
+        while self._released:
+            if not self._lock.acquire(blocking=False):
+                return
+            try:
+                while self._released:
+                    session = self._released.popleft()
+                    key = self._keys[id(session)]
+                    self._refcounts[key] -= 1
+                    if self._refcounts[key] == 0:
+                        del self._sessions[key], self._refcounts[key], self._keys[id(session)]
+            finally:
+                self._lock.release()
+
+    def release_all(self, sessions: list):
+        """
+        Releases (and removes) all of the sessions in a list. An object can register this with `weakref.finalize`
+        before acquiring any sessions, and add each session to the list as it is acquired, so that the sessions
+        are released even if the object fails to initialize.
+        """
+        self.release(*sessions)
+        sessions.clear()
+
+    def loaded_models(self) -> List[str]:
+        """Gets the paths of the models that are currently loaded"""
+        with self._locked():
+            return sorted(set(key[0] for key in self._sessions.keys()))
+
+    def _get_session_options(self, ncpu: int, optimize: bool = True):
+        import onnxruntime as ort
+
+        optimization_levels = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }
+
+        sessionOptions = ort.SessionOptions()
+        sessionOptions.intra_op_num_threads = self.intra_op_num_threads or ncpu
+        sessionOptions.inter_op_num_threads = self.inter_op_num_threads or ncpu
+        sessionOptions.graph_optimization_level = optimization_levels[self.optimization_level if optimize else "disable"]
+        sessionOptions.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        sessionOptions.add_session_config_entry("session.intra_op.allow_spinning", "1" if self.allow_spinning else "0")
+        sessionOptions.add_session_config_entry("session.inter_op.allow_spinning", "1" if self.allow_spinning else "0")
+
+        return sessionOptions
+
+    def _get_cache_path(self, model_path: str, device: str, dynamic_batch: bool):
+        """Gets the path of the cached optimized version of a model, or None if caching is disabled"""
+        if self.cache_dir is None or self.optimization_level == "disable":
+            return None
+
+        import onnxruntime as ort
+
+        file_hash = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                file_hash.update(block)
+
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        return os.path.join(self.cache_dir, f"{name}-{file_hash.hexdigest()[0:16]}-{'dynamic' if dynamic_batch else 'fixed'}"
+                                            f"-{self.optimization_level}-{device}-{platform.machine()}-ort{ort.__version__}.onnx")
+
+    def _load(self, model_path: str, ncpu: int, device: str, dynamic_batch: bool):
+        import onnxruntime as ort
+
+        providers = ["CUDAExecutionProvider"] if device == "gpu" else ["CPUExecutionProvider"]
+
+        # Load the cached optimized model, if available
+        cache_path = self._get_cache_path(model_path, device, dynamic_batch)
+        if cache_path is not None and os.path.exists(cache_path):
+            try:
+                return ort.InferenceSession(cache_path, sess_options=self._get_session_options(ncpu, optimize=False),
+                                            providers=providers)
+            except Exception:
+                logging.warning(f"Could not load the cached optimized model '{cache_path}', optimizing '{model_path}' again")
+
+        model: Union[str, bytes] = model_path
+        session = ort.InferenceSession(model, sess_options=self._get_session_options(ncpu), providers=providers)
+
+        # Switch models exported with a fixed batch size to a dynamic batch size (when possible),
+        # so that several inputs can be predicted with one call
+        input_shape = session.get_inputs()[0].shape
+        if dynamic_batch and isinstance(input_shape[0], int):
+            dynamic_model = get_dynamic_batch_model(model_path)
+            if dynamic_model is not None:
+                try:
+                    batch_session = ort.InferenceSession(dynamic_model, sess_options=self._get_session_options(ncpu),
+                                                         providers=providers)
+                    test_input = np.zeros((2, *input_shape[1:]), dtype=np.float32)
+                    if batch_session.run(None, {batch_session.get_inputs()[0].name: test_input})[0].shape[0] == 2:
+                        model, session = dynamic_model, batch_session
+                except Exception:
+                    logging.info(f"Could not use a dynamic batch size for the model '{model_path}'")
+
+        # Save the optimized model to the cache (writing to a temporary file first, as other processes may be
+        # loading the same model)
+        if cache_path is not None:
+            temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)  # type: ignore[arg-type]
+                sessionOptions = self._get_session_options(ncpu)
+                sessionOptions.optimized_model_filepath = temp_path
+                sessionOptions.log_severity_level = 3  # the cache is specific to the hardware, so skip the warning about that
+                ort.InferenceSession(model, sess_options=sessionOptions, providers=providers)
+                os.replace(temp_path, cache_path)
+            except Exception as e:
+                logging.warning(f"Could not cache the optimized model '{model_path}': {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+
+        return session
+
+
+# The registry shared by all of the models in the process
+session_registry = SessionRegistry()
+
+
+class _Interpreter():
+    """A tflite interpreter of `InterpreterRegistry`, with its current input shape and the lock that must be held to use it"""
+    __slots__ = ("interpreter", "lock", "input_index", "output_index", "input_shape")
+
+    def __init__(self, interpreter, input_shape: Optional[Tuple[int, ...]]):
+        self.interpreter = interpreter
+        self.lock = threading.Lock()
+        self.input_index = interpreter.get_input_details()[0]["index"]
+        self.output_index = interpreter.get_output_details()[0]["index"]
+        self.resize(input_shape or tuple(int(i) for i in interpreter.get_input_details()[0]["shape"]))
+
+    def resize(self, input_shape: Tuple[int, ...]):
+        """Resizes the input of the interpreter, and (re)allocates its tensors"""
+        if tuple(self.interpreter.get_input_details()[0]["shape"]) != input_shape:
+            self.interpreter.resize_tensor_input(self.input_index, list(input_shape), strict=False)
+        self.interpreter.allocate_tensors()
+        self.input_shape = input_shape
+
+
+class InterpreterRegistry():
+    """
+    A registry of tflite interpreters, which shares the interpreters of each model file between all of the objects
+    in the process that use it (like `SessionRegistry` for ONNX models). A tflite interpreter has a fixed input
+    shape, and resizing it reallocates all of its tensors, so the registry keeps a separate interpreter (resized
+    and allocated once) for each input shape that a model is used with.
+
+    To keep the number of shapes small, `predict` rounds the batch size of the input up to a power of two (padding
+    it with zeros), which assumes that the model processes the rows of a batch independently (as the openWakeWord
+    models do). The interpreters of each model are kept in a least-recently-used cache of `max_shapes` input shapes,
+    and once it is full, the least recently used interpreter is resized for a new shape (rather than loading the
+    model again).
+
+    Interpreters aren't thread-safe, so calls of the same interpreter are serialized with a lock.
+    """
+    def __init__(self, max_shapes: int = 8):
+        """Initialize the registry.
+
+        Args:
+            max_shapes (int): The maximum number of input shapes (and interpreters) to keep for each model
+        """
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._interpreters: Dict[tuple, OrderedDict] = {}
+        self._default_shapes: Dict[tuple, tuple] = {}
+        self._keys: Dict[tuple, tuple] = {}
+
+    def get(self, model_path: str, input_shape: Optional[Tuple[int, ...]] = None, num_threads: int = 1):
+        """
+        Gets the shared interpreter of a model for an input shape, creating it if needed.
+
+        Args:
+            model_path (str): The path to the tflite model
+            input_shape (tuple): The shape of the (first) input, or None for the shape that the model was saved with
+            num_threads (int): The number of threads used by the interpreter
+
+        Returns:
+            _Interpreter: The interpreter (`.interpreter`), and the lock that must be held while using it (`.lock`).
+                          Once the lock is held, check that `.input_shape` is still the requested shape, as the
+                          interpreter may have been resized for another shape in the meantime.
+        """
+        key = self._keys.get((model_path, num_threads))
+        if key is None:
+            key = self._keys.setdefault((model_path, num_threads), (os.path.abspath(model_path), num_threads))
+
+        with self._lock:
+            interpreters = self._interpreters.setdefault(key, OrderedDict())
+            if input_shape is None:
+                if key not in self._default_shapes:
+                    entry = self._load(key[0], num_threads, None)
+                    self._default_shapes[key] = entry.input_shape
+                    if entry.input_shape not in interpreters:
+                        interpreters[entry.input_shape] = entry
+                        if len(interpreters) > self.max_shapes:
+                            interpreters.popitem(last=False)  # the least recently used shape
+                input_shape = self._default_shapes[key]
+
+            input_shape = tuple(input_shape)
+            entry = interpreters.get(input_shape)
+            if entry is None:
+                if len(interpreters) >= self.max_shapes:
+                    # Reuse the least recently used interpreter, instead of loading the model again
+                    _, entry = interpreters.popitem(last=False)
+                    with entry.lock:
+                        entry.resize(input_shape)
+                else:
+                    entry = self._load(key[0], num_threads, input_shape)
+                interpreters[input_shape] = entry
+            else:
+                interpreters.move_to_end(input_shape)
+
+            return entry
+
+    def predict(self, model_path: str, x: np.ndarray, num_threads: int = 1) -> np.ndarray:
+        """
+        Predicts on an input with the shared interpreter of a model for the shape of the input, with the batch
+        size rounded up to a power of two.
+
+        Args:
+            model_path (str): The path to the tflite model
+            x (ndarray): The input (of the first input tensor of the model), of shape (batch, ...)
+            num_threads (int): The number of threads used by the interpreter
+
+        Returns:
+            ndarray: The first output of the model
+        """
+        n = x.shape[0]
+        batch_size = 1 << (n - 1).bit_length() if n > 1 else n
+        if batch_size != n:
+            x = np.concatenate((x, np.zeros((batch_size - n, ) + x.shape[1:], dtype=x.dtype)))
+
+        while True:
+            entry = self.get(model_path, x.shape, num_threads)
+            with entry.lock:
+                if entry.input_shape == x.shape:  # unless it was resized for another shape in the meantime
+                    entry.interpreter.set_tensor(entry.input_index, x)
+                    entry.interpreter.invoke()
+                    y = entry.interpreter.get_tensor(entry.output_index)
+                    return y[0:n] if batch_size != n else y
+
+    def clear(self):
+        """Drops all of the interpreters (which are reloaded as needed)"""
+        with self._lock:
+            self._interpreters.clear()
+            self._default_shapes.clear()
+
+    def _load(self, model_path: str, num_threads: int, input_shape: Optional[Tuple[int, ...]]) -> _Interpreter:
+        import tflite_runtime.interpreter as tflite
+
+        return _Interpreter(tflite.Interpreter(model_path=model_path, num_threads=num_threads), input_shape)
+
+
+# The registry of tflite interpreters shared by all of the models in the process
+interpreter_registry = InterpreterRegistry()
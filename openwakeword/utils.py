@@ -16,13 +16,102 @@
 import os
 import numpy as np
 import pathlib
-from collections import deque
 from multiprocessing.pool import ThreadPool
 from multiprocessing import Process, Queue
 import time
+import threading
+import weakref
 import logging
 import openwakeword
-from typing import Union, List, Callable, Deque
+from openwakeword.sessions import session_registry, interpreter_registry
+from openwakeword.melspectrogram import melspectrogram, N_FFT, HOP_LENGTH
+from collections.abc import Mapping
+from typing import Union, List, Callable, Optional, Dict
+
+
+class RingBuffer():
+    """
+    A fixed-capacity buffer that keeps the most recent rows of an array, with O(1) appends (per row)
+    and without any allocations after creation. Every row is stored twice, `capacity` rows apart, so
+    that the most recent rows are always available as a single contiguous view, without copying.
+    """
+    def __init__(self, capacity: int, row_shape: tuple = (), dtype=np.float32):
+        """
+        Initialize the buffer.
+
+        Args:
+            capacity (int): The maximum number of rows to keep
+            row_shape (tuple): The shape of each row (an empty tuple for a buffer of scalars)
+            dtype: The data type of the buffer
+        """
+        self.capacity = capacity
+        self.data = np.zeros((2*capacity, ) + tuple(row_shape), dtype=dtype)
+        self.position = 0  # the index where the next row will be written
+        self.size = 0
+
+    def append(self, x: np.ndarray):
+        """Adds rows (an array of shape (n_rows, *row_shape)) to the end of the buffer"""
+        if x.shape[0] == 1:
+            self.data[self.position] = self.data[self.position + self.capacity] = x[0]
+            self.position = (self.position + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+            return
+
+        x = x[-self.capacity:]
+        n = x.shape[0]
+        first = min(n, self.capacity - self.position)
+        for offset in (0, self.capacity):
+            self.data[offset + self.position:offset + self.position + first] = x[:first]
+            self.data[offset:offset + n - first] = x[first:]
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def clear(self):
+        self.position = 0
+        self.size = 0
+
+    def view(self) -> np.ndarray:
+        """
+        Returns all of the rows in the buffer (oldest first) as a contiguous view. Note that the view
+        is only valid until the next rows are appended, so copy it if it needs to be kept.
+        """
+        end = self.position + self.capacity
+        return self.data[end - self.size:end]
+
+    def __len__(self):
+        return self.size
+
+
+def _get_embedding_windows(spec: np.ndarray, window_size: int = 76, step_size: int = 8) -> np.ndarray:
+    """
+    Gets the windows of melspectrogram frames that the embedding model predicts on, as a strided view
+    of the melspectrogram (consecutive windows overlap, so copying them would copy each frame ~9.5 times).
+    Windows that would extend past the end of the melspectrogram are truncated.
+
+    Args:
+        spec (ndarray): The melspectrogram(s), of shape (..., frames, melbins)
+        window_size (int): The number of frames in each window
+        step_size (int): The number of frames between the starts of consecutive windows
+
+    Returns:
+        ndarray: A read-only view of shape (..., windows, window_size, melbins)
+    """
+    n_windows = max(0, (spec.shape[-2] - window_size)//step_size + 1)
+    if n_windows == 1:
+        return spec[..., None, 0:window_size, :]  # the usual case when streaming, which basic indexing makes cheaper
+
+    return np.lib.stride_tricks.as_strided(
+        spec,
+        shape=spec.shape[:-2] + (n_windows, window_size, spec.shape[-1]),
+        strides=spec.strides[:-2] + (spec.strides[-2]*step_size, ) + spec.strides[-2:],
+        writeable=False
+    )
+
+
+# The initial feature buffer of each set of feature models, computed once per process (see `AudioFeatures._get_initial_features`)
+_initial_features: Dict[tuple, np.ndarray] = {}
+_initial_features_lock = threading.Lock()
 
 
 # Base class for computing audio features using Google's speech_embedding
@@ -38,7 +127,8 @@ class AudioFeatures():
                  sr: int = 16000,
                  ncpu: int = 1,
                  inference_framework: str = "onnx",
-                 device: str = 'cpu'
+                 device: str = 'cpu',
+                 melspec_frontend: str = "model"
                  ):
         """
         Initialize the AudioFeatures object.
@@ -56,11 +146,21 @@ class AudioFeatures():
                           Note that depending on the inference framework selected and system configuration,
                           this setting may not have an effect. For example, to use a GPU with the ONNX
                           framework the appropriate onnxruntime package must be installed.
+            melspec_frontend (str): How to compute the melspectrogram. Options are "model" (the default), to use
+                                    the melspectrogram model of the inference framework, or "numpy", to compute
+                                    the same melspectrogram with NumPy (see `openwakeword.melspectrogram`), which
+                                    supports batches with either framework and doesn't load the model.
         """
+        if melspec_frontend not in ("model", "numpy"):
+            raise ValueError(f"Unknown melspectrogram frontend '{melspec_frontend}', the options are 'model' and 'numpy'")
+
         # Initialize the models with the appropriate framework
+        self.inference_framework = inference_framework
+        self.melspec_frontend = melspec_frontend
+        self.melspec_model = None
         if inference_framework == "onnx":
             try:
-                import onnxruntime as ort
+                import onnxruntime  # noqa: F401
             except ImportError:
                 raise ValueError("Tried to import onnxruntime, but it was not found. Please install it using `pip install onnxruntime`")
 
@@ -72,26 +172,37 @@ class AudioFeatures():
             if ".tflite" in melspec_model_path or ".tflite" in embedding_model_path:
                 raise ValueError("The onnx inference framework is selected, but tflite models were provided!")
 
-            # Initialize ONNX options
-            sessionOptions = ort.SessionOptions()
-            sessionOptions.inter_op_num_threads = ncpu
-            sessionOptions.intra_op_num_threads = ncpu
+            # Release the shared sessions once this object is deleted (or if it fails to initialize).
+            # The prediction functions use the sessions rather than `self`, so that the object isn't part of a
+            # reference cycle, and is released as soon as it is deleted rather than by the garbage collector.
+            sessions: List = []
+            weakref.finalize(self, session_registry.release_all, sessions)
 
             # Melspectrogram model
-            self.melspec_model = ort.InferenceSession(melspec_model_path, sess_options=sessionOptions,
-                                                      providers=["CUDAExecutionProvider"] if device == "gpu" else ["CPUExecutionProvider"])
-            self.onnx_execution_provider = self.melspec_model.get_providers()[0]
-            self.melspec_model_predict = lambda x: self.melspec_model.run(None, {'input': x})
+            if melspec_frontend == "model":
+                melspec_model = session_registry.acquire(melspec_model_path, ncpu=ncpu, device=device)
+                sessions.append(melspec_model)
+                self.melspec_model = melspec_model
+
+                def onnx_melspec_predict(x):
+                    return melspec_model.run(None, {'input': x})
+
+                self.melspec_model_predict = onnx_melspec_predict
 
             # Audio embedding model
-            self.embedding_model = ort.InferenceSession(embedding_model_path, sess_options=sessionOptions,
-                                                        providers=["CUDAExecutionProvider"] if device == "gpu"
-                                                        else ["CPUExecutionProvider"])
-            self.embedding_model_predict = lambda x: self.embedding_model.run(None, {'input_1': x})[0].squeeze()
+            embedding_model = session_registry.acquire(embedding_model_path, ncpu=ncpu, device=device)
+            sessions.append(embedding_model)
+            self.embedding_model = embedding_model
+            self.onnx_execution_provider = embedding_model.get_providers()[0]
+
+            def onnx_embedding_predict(x):
+                return embedding_model.run(None, {'input_1': x})[0].squeeze()
+
+            self.embedding_model_predict = onnx_embedding_predict
 
         elif inference_framework == "tflite":
             try:
-                import tflite_runtime.interpreter as tflite
+                import tflite_runtime.interpreter  # noqa: F401
             except ImportError:
                 raise ValueError("Tried to import the TFLite runtime, but it was not found."
                                  "Please install it using `pip install tflite-runtime`")
@@ -106,65 +217,105 @@ class AudioFeatures():
             if ".onnx" in melspec_model_path or ".onnx" in embedding_model_path:
                 raise ValueError("The tflite inference framework is selected, but onnx models were provided!")
 
-            # Melspectrogram model
-            self.melspec_model = tflite.Interpreter(model_path=melspec_model_path, num_threads=ncpu)
-            self.melspec_model.resize_tensor_input(0, [1, 1280], strict=True)  # initialize with fixed input size
-            self.melspec_model.allocate_tensors()
-
-            melspec_input_index = self.melspec_model.get_input_details()[0]['index']
-            melspec_output_index = self.melspec_model.get_output_details()[0]['index']
-
-            self._tflite_current_melspec_input_size = 1280
+            # The interpreters are shared through `interpreter_registry`, which keeps an interpreter (allocated once)
+            # for each input size, so inputs of different sizes don't resize and reallocate the tensors
+            if melspec_frontend == "model":
+                self.melspec_model = interpreter_registry.get(melspec_model_path, (1, 1280), ncpu).interpreter
 
-            def tflite_melspec_predict(x):
-                if x.shape[1] != 1280:
-                    self.melspec_model.resize_tensor_input(0, [1, x.shape[1]], strict=True)  # initialize with fixed input size
-                    self.melspec_model.allocate_tensors()
-                    self._tflite_current_melspec_input_size = x.shape[1]
-                elif self._tflite_current_melspec_input_size != 1280:
-                    self.melspec_model.resize_tensor_input(0, [1, 1280], strict=True)  # initialize with fixed input size
-                    self.melspec_model.allocate_tensors()
-                    self._tflite_current_melspec_input_size = 1280
+                def tflite_melspec_predict(x):
+                    return interpreter_registry.predict(melspec_model_path, x, ncpu)
 
-                self.melspec_model.set_tensor(melspec_input_index, x)
-                self.melspec_model.invoke()
-                return self.melspec_model.get_tensor(melspec_output_index)
-
-            self.melspec_model_predict = tflite_melspec_predict
+                self.melspec_model_predict = tflite_melspec_predict
 
             # Audio embedding model
-            self.embedding_model = tflite.Interpreter(model_path=embedding_model_path, num_threads=ncpu)
-            self.embedding_model.allocate_tensors()
-
-            embedding_input_index = self.embedding_model.get_input_details()[0]['index']
-            embedding_output_index = self.embedding_model.get_output_details()[0]['index']
-
-            self._tflite_current_embedding_batch_size = 1
+            self.embedding_model = interpreter_registry.get(embedding_model_path, (1, 76, 32, 1), ncpu).interpreter
 
             def tflite_embedding_predict(x):
-                if x.shape[0] != 1:
-                    self.embedding_model.resize_tensor_input(0, [x.shape[0], 76, 32, 1], strict=True)  # initialize with fixed input size
-                    self.embedding_model.allocate_tensors()
-                    self._tflite_current_embedding_batch_size = x.shape[0]
-                elif self._tflite_current_embedding_batch_size != 1:
-                    self.embedding_model.resize_tensor_input(0, [1, 76, 32, 1], strict=True)  # initialize with fixed input size
-                    self.embedding_model.allocate_tensors()
-                    self._tflite_current_embedding_batch_size = x.shape[0]
-
-                self.embedding_model.set_tensor(embedding_input_index, x)
-                self.embedding_model.invoke()
-                return self.embedding_model.get_tensor(embedding_output_index).squeeze()
+                return interpreter_registry.predict(embedding_model_path, x, ncpu).squeeze()
 
             self.embedding_model_predict = tflite_embedding_predict
 
+        # The models that the features depend on
+        self._feature_models = (inference_framework, os.path.abspath(embedding_model_path),
+                                os.path.abspath(melspec_model_path) if melspec_frontend == "model" else melspec_frontend)
+
+        if melspec_frontend == "numpy":
+            # The same output as the ONNX model: a list with the melspectrograms, of shape (batch, 1, frames, 32)
+            self.melspec_model_predict = lambda x: [melspectrogram(x)[:, None]]
+
         # Create databuffers
-        self.raw_data_buffer: Deque = deque(maxlen=sr*10)
-        self.melspectrogram_buffer = np.ones((76, 32))  # n_frames x num_features
+        self.raw_data_max_len = sr*10
+        self.raw_data_ring = RingBuffer(self.raw_data_max_len, dtype=np.int16)
         self.melspectrogram_max_len = 10*97  # 97 is the number of frames in 1 second of 16hz audio
+        self.melspectrogram_ring = RingBuffer(self.melspectrogram_max_len, (32, ), dtype=np.float32)
+        self.melspectrogram_buffer = np.ones((76, 32))  # n_frames x num_features
         self.accumulated_samples = 0  # the samples added to the buffer since the audio preprocessor was last called
-        self.raw_data_remainder = np.empty(0)
-        self.feature_buffer = self._get_embeddings(np.random.randint(-1000, 1000, 16000*4).astype(np.int16))
+        self.skipped_samples = 0  # the samples of frames added to the buffer without computing features
+        self.raw_data_remainder = np.empty(0, dtype=np.int16)
         self.feature_buffer_max_len = 120  # ~10 seconds of feature buffer history
+        self._feature_ring = RingBuffer(self.feature_buffer_max_len, (96, ), dtype=np.float32)
+        self._initial_features_pending = True  # the initial features are added to the feature buffer on first use
+        self._pool = None  # the thread pool for `embed_clips`, created on first use
+
+    # The buffers are stored in ring buffers, and exposed as (read-only) arrays of their current contents.
+    # Assigning an array to one of the buffers replaces its contents.
+    @property
+    def raw_data_buffer(self):
+        return self.raw_data_ring.view()
+
+    @property
+    def melspectrogram_buffer(self):
+        return self.melspectrogram_ring.view()
+
+    @melspectrogram_buffer.setter
+    def melspectrogram_buffer(self, x):
+        self.melspectrogram_ring.clear()
+        self.melspectrogram_ring.append(x)
+
+    @property
+    def feature_ring(self):
+        if self._initial_features_pending:
+            self._initial_features_pending = False
+            self._feature_ring.clear()
+            self._feature_ring.append(self._get_initial_features())
+        return self._feature_ring
+
+    @property
+    def feature_buffer(self):
+        return self.feature_ring.view()
+
+    @feature_buffer.setter
+    def feature_buffer(self, x):
+        self._initial_features_pending = False
+        self._feature_ring.clear()
+        self._feature_ring.append(x)
+
+    def reset(self):
+        """Reset the internal buffers"""
+        self.raw_data_ring.clear()
+        self.melspectrogram_buffer = np.ones((76, 32))
+        self.accumulated_samples = 0
+        self.skipped_samples = 0
+        self.raw_data_remainder = np.empty(0, dtype=np.int16)
+        self._initial_features_pending = True
+
+    def _get_initial_features(self):
+        """
+        Gets the features that the feature buffer starts with: the embeddings of 4 seconds of low-level noise,
+        generated from a fixed seed so that every stream starts from the same state (and scores are reproducible).
+        They only depend on the feature models, so they are computed once per process for each set of models.
+
+        Returns:
+            ndarray: The (read-only) features, of shape (41, 96)
+        """
+        with _initial_features_lock:
+            if self._feature_models not in _initial_features:
+                noise = np.random.default_rng(0).integers(-1000, 1000, 16000*4).astype(np.int16)
+                features = self._get_embeddings(noise).reshape(-1, 96)
+                features.flags.writeable = False
+                _initial_features[self._feature_models] = features
+
+        return _initial_features[self._feature_models]
 
     def _get_melspectrogram(self, x: Union[np.ndarray, List], melspec_transform: Callable = lambda x: x/10 + 2):
         """
@@ -180,12 +331,12 @@ class AudioFeatures():
             np.ndarray: The computed melspectrogram of the input audio data
         """
         # Get input data and adjust type/shape as needed
-        x = np.array(x).astype(np.int16) if isinstance(x, list) else x
+        x = np.asarray(x, dtype=np.int16) if isinstance(x, list) else x
         if x.dtype != np.int16:
             raise ValueError("Input data must be 16-bit integers (i.e., 16-bit PCM audio)."
                              f"You provided {x.dtype} data.")
         x = x[None, ] if len(x.shape) < 2 else x
-        x = x.astype(np.float32) if x.dtype != np.float32 else x
+        x = x.astype(np.float32)
 
         # Get melspectrogram
         outputs = self.melspec_model_predict(x)
@@ -196,6 +347,27 @@ class AudioFeatures():
 
         return spec
 
+    def _get_melspectrogram_streams(self, x: np.ndarray, melspec_transform: Callable = lambda x: x/10 + 2):
+        """
+        Computes the melspectrograms for a batch of equal-length audio windows, one per stream.
+
+        Args:
+            x (ndarray): The 16-bit PCM audio data, of shape (N, samples)
+            melspec_transform (Callable): See the `_get_melspectrogram` method
+
+        Returns:
+            ndarray: The melspectrograms, of shape (N, frames, 32)
+        """
+        if self.inference_framework == "onnx" or self.melspec_frontend == "numpy":
+            spec = self.melspec_model_predict(x.astype(np.float32))[0]
+        else:
+            # Predict one window at a time, with the same (1, samples) input shape as streaming (`_get_melspectrogram`),
+            # so that the interpreter that `interpreter_registry` keeps for that shape is reused for any number of streams
+            spec = np.concatenate([self.melspec_model_predict(x[i:i+1].astype(np.float32)).reshape(1, -1, 32)
+                                   for i in range(x.shape[0])])
+
+        return melspec_transform(spec.reshape(x.shape[0], -1, 32))
+
     def _get_embeddings_from_melspec(self, melspec):
         """
         Computes the Google `speech_embedding` features from a melspectrogram input
@@ -214,20 +386,122 @@ class AudioFeatures():
     def _get_embeddings(self, x: np.ndarray, window_size: int = 76, step_size: int = 8, **kwargs):
         """Function to compute the embeddings of the provide audio samples."""
         spec = self._get_melspectrogram(x, **kwargs)
-        windows = []
-        for i in range(0, spec.shape[0], 8):
-            window = spec[i:i+window_size]
-            if window.shape[0] == window_size:  # truncate short windows
-                windows.append(window)
-
-        batch = np.expand_dims(np.array(windows), axis=-1).astype(np.float32)
-        embedding = self.embedding_model_predict(batch)
+        windows = _get_embedding_windows(spec, window_size, step_size)
+        embedding = self.embedding_model_predict(np.ascontiguousarray(windows, dtype=np.float32)[:, :, :, None])
         return embedding
 
+    def _get_embeddings_from_windows(self, windows: np.ndarray, max_batch_size: int = 1024):
+        """
+        Computes the embeddings of melspectrogram windows (see `_get_embedding_windows`), making the one contiguous
+        copy of the windows that the embedding model needs. Up to `max_batch_size` windows are copied and predicted
+        on at a time, which bounds the memory used for long clips (each window is ~10 KB).
+
+        Args:
+            windows (ndarray): The windows, of shape (..., windows, 76, 32)
+            max_batch_size (int): The maximum number of windows per call of the embedding model
+
+        Returns:
+            ndarray: The embeddings, of shape (..., windows, 96)
+        """
+        if windows.ndim == 3 and windows.shape[0] <= max_batch_size:
+            return self.embedding_model_predict(np.ascontiguousarray(windows, dtype=np.float32)[:, :, :, None]).reshape(-1, 96)
+
+        clips = windows.reshape((-1, ) + windows.shape[-3:])  # (clips, windows, 76, 32), still a view
+        n_clips, n_windows = clips.shape[0:2]
+        embeddings = np.empty(clips.shape[0:2] + (96, ), dtype=np.float32)
+        clips_per_batch = max(1, max_batch_size//max(1, n_windows))
+        for i in range(0, n_clips, clips_per_batch):
+            for j in range(0, n_windows, max_batch_size):
+                batch = np.ascontiguousarray(clips[i:i + clips_per_batch, j:j + max_batch_size], dtype=np.float32)
+                embeddings[i:i + clips_per_batch, j:j + max_batch_size] = self.embedding_model_predict(
+                    batch.reshape(-1, 76, 32, 1)).reshape(batch.shape[0:2] + (96, ))
+
+        return embeddings.reshape(windows.shape[:-2] + (96, ))
+
+    def _get_streaming_embeddings(self, x: np.ndarray, start: int, end: int):
+        """
+        Computes the embeddings that streaming the audio through a newly reset `AudioFeatures` object in
+        80 ms (1280 sample) chunks adds to the feature buffer, for the chunks in the range [start, end).
+        Like streaming, the melspectrogram of each chunk is computed from the chunk and the 480 samples before it
+        (so the frames are exactly the same, which isn't the case for the melspectrogram of the whole clip),
+        and each embedding window of 76 melspectrogram frames ends 5 frames after the start of its chunk, so
+        the windows of the first 9 chunks also include the initial (constant) melspectrogram buffer.
+
+        Args:
+            x (ndarray): The 16-bit PCM audio, which must include all of the samples up to the end of chunk `end - 1`
+            start (int): The first chunk
+            end (int): The chunk after the last chunk
+
+        Returns:
+            ndarray: The embeddings, of shape (end - start, 96)
+        """
+        if start >= end:
+            return np.empty((0, 96), dtype=np.float32)
+
+        # The melspectrogram frames of the windows, from the first chunk (or initial buffer) that they include.
+        # The buffer starts with 76 frames, the first chunk adds 5 frames, and every other chunk adds 8 frames.
+        spec = []
+        first = max(0, start - 9)
+        if start < 9:
+            spec.append(np.ones((76, 32), dtype=np.float32))
+        if first == 0:
+            spec.append(self._get_melspectrogram(x[0:1280]).reshape(-1, 32))
+            first = 1
+        if first < end:
+            chunks = np.lib.stride_tricks.sliding_window_view(x[1280*first - 480:1280*end], 1760)[::1280]
+            spec.append(self._get_melspectrogram_streams(chunks).reshape(-1, 32))
+        spec = np.vstack(spec)
+
+        # The frame of `spec` where the window of chunk `start` begins
+        offset = 8*start + 5 - (0 if start < 9 else 76 if start == 9 else 8*start + 1)
+        return self._get_embeddings_from_windows(_get_embedding_windows(spec[offset:offset + 8*(end - start - 1) + 76]))
+
     def get_embedding_shape(self, audio_length: float, sr: int = 16000):
         """Function that determines the size of the output embedding array for a given audio clip length (in seconds)"""
-        x = (np.random.uniform(-1, 1, int(audio_length*sr))*32767).astype(np.int16)
-        return self._get_embeddings(x).shape
+        # Melspectrogram frames are 512 samples long and 160 samples apart, and embedding windows are 76 frames
+        # long and 8 frames apart (see `_get_embeddings`)
+        n_melspec_frames = max(0, (int(audio_length*sr) - N_FFT)//HOP_LENGTH + 1)
+        return (max(0, (n_melspec_frames - 76)//8 + 1), 96)
+
+    def _get_pool(self, ncpu: int):
+        """
+        Gets the thread pool for computing features in batches, which is created on first use and kept between calls
+        (unless the number of threads changes). The tflite models can't be called from several threads at once,
+        so they always use a single thread.
+        """
+        n_threads = ncpu if self.inference_framework == "onnx" else 1
+        if self._pool is None or self._pool_threads != n_threads:
+            if self._pool is not None:
+                self._close_pool()
+            self._pool = ThreadPool(processes=n_threads)
+            self._pool_threads = n_threads
+            self._close_pool = weakref.finalize(self, self._pool.terminate)
+
+        return self._pool
+
+    def _split_batch(self, start: int, end: int, ncpu: int):
+        """
+        Splits the clips [start, end) of a batch into one part per thread (on CPU), so that each thread
+        computes its part with a single batched call of the model
+        """
+        if self.inference_framework == "onnx" and "CPU" in self.onnx_execution_provider:
+            n_parts = max(1, min(ncpu, end - start))
+        else:
+            n_parts = 1
+        bounds = np.linspace(start, end, n_parts + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def _get_embeddings_from_melspecs(self, melspecs: np.ndarray):
+        """
+        Computes the embeddings of a batch of melspectrograms with a single call of the embedding model.
+
+        Args:
+            melspecs (ndarray): The melspectrograms, of shape (N, frames, 32)
+
+        Returns:
+            ndarray: The embeddings, of shape (N, (frames - 76)//8 + 1, 96)
+        """
+        return self._get_embeddings_from_windows(_get_embedding_windows(melspecs))
 
     def _get_melspectrogram_batch(self, x, batch_size=128, ncpu=1):
         """
@@ -249,33 +523,13 @@ class AudioFeatures():
             ndarray: A numpy array of shape (N, frames, melbins) containing the melspectrogram of
                     all N input audio examples
         """
+        pool = self._get_pool(ncpu)
+        melspecs = []
+        for i in range(0, x.shape[0], batch_size):
+            parts = self._split_batch(i, min(i + batch_size, x.shape[0]), ncpu)
+            melspecs.extend(pool.map(self._get_melspectrogram_streams, [x[j:k] for j, k in parts]))
 
-        # Prepare ThreadPool object, if needed for multithreading
-        pool = None
-        if "CPU" in self.onnx_execution_provider:
-            pool = ThreadPool(processes=ncpu)
-
-        # Make batches
-        n_frames = int(np.ceil(x.shape[1]/160-3))
-        mel_bins = 32  # fixed by melspectrogram model
-        melspecs = np.empty((x.shape[0], n_frames, mel_bins), dtype=np.float32)
-        for i in range(0, max(batch_size, x.shape[0]), batch_size):
-            batch = x[i:i+batch_size]
-
-            if "CUDA" in self.onnx_execution_provider:
-                result = self._get_melspectrogram(batch)
-
-            elif pool:
-                result = np.array(pool.map(self._get_melspectrogram,
-                                           batch, chunksize=batch.shape[0]//ncpu))
-
-            melspecs[i:i+batch_size, :, :] = result.squeeze()
-
-        # Cleanup ThreadPool
-        if pool:
-            pool.close()
-
-        return melspecs
+        return np.concatenate(melspecs).astype(np.float32, copy=False)
 
     def _get_embeddings_batch(self, x, batch_size=128, ncpu=1):
         """
@@ -287,9 +541,9 @@ class AudioFeatures():
         which combination is best for their data, as often differences of 1-4x are seen.
 
         Args:
-            x (ndarray): A numpy array of melspectrograms of shape (N, frames, melbins).
+            x (ndarray): A numpy array of melspectrograms of shape (N, frames, melbins) (or (N, frames, melbins, 1)).
                         Assumes that all of the melspectrograms have the same shape.
-            batch_size (int): The batch size to use when computing the embeddings
+            batch_size (int): The batch size (number of melspectrograms) to use when computing the embeddings
             ncpu (int): The number of CPUs to use when computing the embeddings. This argument has
                         no effect if the underlying model is executing on a GPU.
 
@@ -300,52 +554,24 @@ class AudioFeatures():
         # Ensure input is the correct shape
         if x.shape[1] < 76:
             raise ValueError("Embedding model requires the input melspectrograms to have at least 76 frames")
+        x = x.reshape(x.shape[0], x.shape[1], -1)
 
-        # Prepare ThreadPool object, if needed for multithreading
-        pool = None
-        if "CPU" in self.onnx_execution_provider:
-            pool = ThreadPool(processes=ncpu)
-
-        # Calculate array sizes and make batches
-        n_frames = (x.shape[1] - 76)//8 + 1
-        embedding_dim = 96  # fixed by embedding model
-        embeddings = np.empty((x.shape[0], n_frames, embedding_dim), dtype=np.float32)
-
-        batch = []
-        ndcs = []
-        for ndx, melspec in enumerate(x):
-            window_size = 76
-            for i in range(0, melspec.shape[0], 8):
-                window = melspec[i:i+window_size]
-                if window.shape[0] == window_size:  # ignore windows that are too short (truncates end of clip)
-                    batch.append(window)
-            ndcs.append(ndx)
-
-            if len(batch) >= batch_size or ndx+1 == x.shape[0]:
-                batch = np.array(batch).astype(np.float32)
-                if "CUDA" in self.onnx_execution_provider:
-                    result = self.embedding_model_predict(batch)
+        pool = self._get_pool(ncpu)
+        embeddings = []
+        for i in range(0, x.shape[0], batch_size):
+            parts = self._split_batch(i, min(i + batch_size, x.shape[0]), ncpu)
+            embeddings.extend(pool.map(self._get_embeddings_from_melspecs, [x[j:k] for j, k in parts]))
 
-                elif pool:
-                    result = np.array(pool.map(self._get_embeddings_from_melspec,
-                                      batch, chunksize=batch.shape[0]//ncpu))
-
-                for j, ndx2 in zip(range(0, result.shape[0], n_frames), ndcs):
-                    embeddings[ndx2, :, :] = result[j:j+n_frames]
-
-                batch = []
-                ndcs = []
-
-        # Cleanup ThreadPool
-        if pool:
-            pool.close()
-
-        return embeddings
+        return np.concatenate(embeddings)
 
     def embed_clips(self, x, batch_size=128, ncpu=1):
         """
         Compute the embeddings of the input audio clips in batches.
 
+        The batches are pipelined: the melspectrograms of the next batch are computed while the
+        embeddings of the current batch are computed, and on CPU each batch is split between `ncpu`
+        threads that each call the models once.
+
         Note that the optimal performance will depend in the interaction between the device,
         batch size, and ncpu (if a CPU device is used). The user is encouraged
         to experiment with different values of these parameters to identify
@@ -362,14 +588,27 @@ class AudioFeatures():
             ndarray: A numpy array of shape (N, frames, embedding_dim) containing the embeddings of
                     all N input audio clips
         """
+        pool = self._get_pool(ncpu)
+        batches = [(i, min(i + batch_size, x.shape[0])) for i in range(0, x.shape[0], batch_size)]
 
-        # Compute melspectrograms
-        melspecs = self._get_melspectrogram_batch(x, batch_size=batch_size, ncpu=ncpu)
+        def get_melspectrograms(start, end):
+            return [pool.apply_async(self._get_melspectrogram_streams, (x[j:k], )) for j, k in self._split_batch(start, end, ncpu)]
 
-        # Compute embeddings from melspectrograms
-        embeddings = self._get_embeddings_batch(melspecs[:, :, :, None], batch_size=batch_size, ncpu=ncpu)
+        embeddings = []
+        melspec_results = get_melspectrograms(*batches[0]) if batches else []
+        for n, (start, end) in enumerate(batches):
+            melspecs = np.concatenate([result.get() for result in melspec_results]).astype(np.float32, copy=False)
+            if melspecs.shape[1] < 76:
+                raise ValueError("Embedding model requires the input melspectrograms to have at least 76 frames")
 
-        return embeddings
+            # Queue the embeddings of this batch, and then the melspectrograms of the next batch
+            embedding_results = [pool.apply_async(self._get_embeddings_from_melspecs, (melspecs[j - start:k - start], ))
+                                 for j, k in self._split_batch(start, end, ncpu)]
+            if n + 1 < len(batches):
+                melspec_results = get_melspectrograms(*batches[n + 1])
+            embeddings.extend(result.get() for result in embedding_results)
+
+        return np.concatenate(embeddings) if embeddings else np.empty((0, 0, 96), dtype=np.float32)
 
     def _streaming_melspectrogram(self, n_samples):
         """Note! There seem to be some slight numerical issues depending on the underlying audio data
@@ -377,29 +616,30 @@ class AudioFeatures():
         clip is calculated. It's unclear if this difference is significant and will impact model performance.
         In particular padding with 0 or very small values seems to demonstrate the differences well.
         """
-        if len(self.raw_data_buffer) < 400:
+        if self.raw_data_buffer.shape[0] < 400:
             raise ValueError("The number of input frames must be at least 400 samples @ 16khz (25 ms)!")
 
-        self.melspectrogram_buffer = np.vstack(
-            (self.melspectrogram_buffer, self._get_melspectrogram(list(self.raw_data_buffer)[-n_samples-160*3:]))
+        self.melspectrogram_ring.append(
+            self._get_melspectrogram(self.raw_data_buffer[-n_samples-160*3:]).reshape(-1, 32)
         )
 
-        if self.melspectrogram_buffer.shape[0] > self.melspectrogram_max_len:
-            self.melspectrogram_buffer = self.melspectrogram_buffer[-self.melspectrogram_max_len:, :]
-
     def _buffer_raw_data(self, x):
         """
         Adds raw audio data to the input buffer
         """
-        self.raw_data_buffer.extend(x.tolist() if isinstance(x, np.ndarray) else x)
+        self.raw_data_ring.append(x)
 
-    def _streaming_features(self, x):
+    def _streaming_features(self, x, compute: bool = True):
+        """
+        Adds audio to the buffers, and computes the features of every complete 80 ms frame. If `compute` is
+        False, the audio is only buffered, and the features of the skipped frames can be computed later (see `_backfill`).
+        """
         # Add raw audio data to buffer, temporarily storing extra frames if not an even number of 80 ms chunks
         processed_samples = 0
 
         if self.raw_data_remainder.shape[0] != 0:
             x = np.concatenate((self.raw_data_remainder, x))
-            self.raw_data_remainder = np.empty(0)
+            self.raw_data_remainder = np.empty(0, dtype=np.int16)
 
         if self.accumulated_samples + x.shape[0] >= 1280:
             remainder = (self.accumulated_samples + x.shape[0]) % 1280
@@ -411,45 +651,171 @@ class AudioFeatures():
             elif remainder == 0:
                 self._buffer_raw_data(x)
                 self.accumulated_samples += x.shape[0]
-                self.raw_data_remainder = np.empty(0)
+                self.raw_data_remainder = np.empty(0, dtype=np.int16)
         else:
             self.accumulated_samples += x.shape[0]
             self._buffer_raw_data(x)
 
+        # Skip complete frames without computing features
+        if not compute and self.accumulated_samples >= 1280 and self.accumulated_samples % 1280 == 0:
+            self.skipped_samples += self.accumulated_samples
+            self.accumulated_samples = 0
+
         # Only calculate melspectrogram once minimum samples are accumulated
         if self.accumulated_samples >= 1280 and self.accumulated_samples % 1280 == 0:
             self._streaming_melspectrogram(self.accumulated_samples)
 
-            # Calculate new audio embeddings/features based on update melspectrograms
-            for i in np.arange(self.accumulated_samples//1280-1, -1, -1):
-                ndx = -8*i
-                ndx = ndx if ndx != 0 else len(self.melspectrogram_buffer)
-                x = self.melspectrogram_buffer[-76 + ndx:ndx].astype(np.float32)[None, :, :, None]
-                if x.shape[1] == 76:
-                    self.feature_buffer = np.vstack((self.feature_buffer,
-                                                    self.embedding_model_predict(x)))
+            # Calculate new audio embeddings/features based on update melspectrograms, with the windows ending at each new frame
+            spec = self.melspectrogram_buffer
+            n_frames = min(self.accumulated_samples//1280, (spec.shape[0] - 76)//8 + 1)
+            if n_frames > 0:
+                self.feature_ring.append(self._get_embeddings_from_windows(_get_embedding_windows(spec[spec.shape[0] - 8*n_frames - 68:])))
 
             # Reset raw data buffer counter
             processed_samples = self.accumulated_samples
             self.accumulated_samples = 0
 
-        if self.feature_buffer.shape[0] > self.feature_buffer_max_len:
-            self.feature_buffer = self.feature_buffer[-self.feature_buffer_max_len:, :]
-
         return processed_samples if processed_samples != 0 else self.accumulated_samples
 
+    def _backfill(self, n_frames: int):
+        """
+        Computes the features of the last (up to) `n_frames` frames that were skipped (see `_streaming_features`),
+        so that the feature buffer holds the correct recent history again. The melspectrogram of up to 10 more
+        skipped frames is also computed, as the embedding window of each frame spans the melspectrogram of ~10 frames.
+
+        Args:
+            n_frames (int): The maximum number of frames to compute features for
+
+        Returns:
+            int: The number of frames that features were computed for
+        """
+        n_skipped = self.skipped_samples//1280
+        self.skipped_samples = 0
+        end = self.raw_data_buffer.shape[0] - self.accumulated_samples  # the end of the last complete frame
+        n_spec_frames = min(n_frames + 10, n_skipped)
+        n_frames = min(n_frames, n_spec_frames)
+        if n_frames <= 0:
+            return 0
+
+        self.melspectrogram_ring.append(
+            self._get_melspectrogram(self.raw_data_buffer[max(0, end - n_spec_frames*1280 - 160*3):end]).reshape(-1, 32)
+        )
+
+        # Compute the embeddings of all of the frames in one batch
+        spec = self.melspectrogram_buffer
+        self.feature_ring.append(self._get_embeddings_from_windows(_get_embedding_windows(spec[spec.shape[0] - 8*n_frames - 68:])))
+
+        return n_frames
+
     def get_features(self, n_feature_frames: int = 16, start_ndx: int = -1):
+        """
+        Gets a window of audio features from the feature buffer, as a (1, n_feature_frames, 96) view
+        into the buffer. The view is only valid until the next audio is processed; copy it to keep it.
+        """
+        feature_buffer = self.feature_buffer
         if start_ndx != -1:
             end_ndx = start_ndx + int(n_feature_frames) \
-                if start_ndx + n_feature_frames != 0 else len(self.feature_buffer)
-            return self.feature_buffer[start_ndx:end_ndx, :][None, ].astype(np.float32)
+                if start_ndx + n_feature_frames != 0 else len(feature_buffer)
+            return feature_buffer[start_ndx:end_ndx, :][None, ]
         else:
-            return self.feature_buffer[int(-1*n_feature_frames):, :][None, ].astype(np.float32)
+            return feature_buffer[int(-1*n_feature_frames):, :][None, ]
 
     def __call__(self, x):
         return self._streaming_features(x)
 
 
+class ClipScores(Mapping):
+    """
+    The frame-level scores of an audio clip (or of a block of its frames), stored as a single float32 matrix
+    of shape (frames, labels) instead of one dictionary per frame. Can be used like a read-only dictionary
+    of the scores of each label (e.g., `clip_scores["alexa"]` is a 1D array of the scores of every frame),
+    and is accepted directly by the functions in `openwakeword.metrics`.
+    """
+    def __init__(self, scores: np.ndarray, labels: List[str]):
+        """
+        Initialize the scores.
+
+        Args:
+            scores (ndarray): The scores, of shape (frames, labels)
+            labels (List[str]): The label of each column of `scores`
+        """
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1, len(labels))
+        self.labels = list(labels)
+        self.label_index = {label: ndx for ndx, label in enumerate(self.labels)}
+
+    @classmethod
+    def concatenate(cls, blocks, labels: Optional[List[str]] = None):
+        """
+        Combines consecutive blocks of scores (e.g., from `Model.iter_clip_scores`) into a single object.
+
+        Args:
+            blocks (Iterable[ClipScores]): The blocks of scores, which must all have the same labels
+            labels (List[str]): The labels to use if there are no blocks
+
+        Returns:
+            ClipScores: The combined scores
+        """
+        blocks = list(blocks)
+        labels = blocks[0].labels if blocks else (labels or [])
+        return cls(np.concatenate([block.scores for block in blocks]) if blocks else
+                   np.empty((0, len(labels)), dtype=np.float32), labels)
+
+    def to_list(self):
+        """Converts the scores to the format of `Model.predict_clip`, a list of per-frame prediction dictionaries"""
+        return [dict(zip(self.labels, row)) for row in self.scores.tolist()]
+
+    def __getitem__(self, label: str):
+        return self.scores[:, self.label_index[label]]
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return f"ClipScores(frames={self.scores.shape[0]}, labels={self.labels})"
+
+
+def to_int16_pcm(x: Union[np.ndarray, bytes, bytearray, memoryview], dtype: str = "int16",
+                 scale: Optional[float] = None):
+    """
+    Converts input audio to the 16-bit PCM format used internally by openWakeWord, with at most
+    a single conversion (and no copy at all for 16-bit PCM input).
+
+    Args:
+        x (Union[np.ndarray, bytes, bytearray, memoryview]): The input audio, either as a 1D array or as
+                                                           raw (little-endian) PCM bytes.
+        dtype (str): The sample format of raw bytes input, either "int16" or "float32". Ignored for arrays,
+                     which declare their own data type.
+        scale (float): The factor that maps floating point samples to the 16-bit range, which must be given for
+                       floating point audio: 32767 for audio normalized to [-1, 1], or 1.0 for audio that
+                       already has the range of 16-bit PCM audio. Ignored for integer audio.
+
+    Returns:
+        ndarray: The audio as a 1D array of 16-bit integers
+    """
+    if isinstance(x, (bytes, bytearray, memoryview)):
+        if dtype not in ("int16", "float32"):
+            raise ValueError(f"Raw PCM audio must be 'int16' or 'float32', instead received '{dtype}'.")
+        x = np.frombuffer(x, dtype="<i2" if dtype == "int16" else "<f4")
+    elif not isinstance(x, np.ndarray):
+        raise ValueError(f"The input audio data (x) must by a Numpy array or PCM bytes, instead received an object of type {type(x)}.")
+
+    if x.dtype == np.int16:
+        return x
+    elif np.issubdtype(x.dtype, np.floating):
+        if scale is None:
+            raise ValueError("The scale of floating point audio must be provided, either 32767 for audio normalized "
+                             "to [-1, 1] or 1.0 for audio with the range of 16-bit PCM audio.")
+        x = x*scale
+        return np.clip(x, -32768, 32767, out=x).astype(np.int16)
+    elif np.issubdtype(x.dtype, np.integer):
+        return x.astype(np.int16)
+
+    raise ValueError(f"The input audio data (x) must contain integer or floating point samples, not {x.dtype}.")
+
+
 # Bulk prediction function
 def bulk_predict(
                  file_paths: List[str],
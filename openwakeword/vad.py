@@ -45,9 +45,10 @@
 # It can be used as with the openWakeWord library, or independently.
 
 # Imports
-import onnxruntime as ort
 import numpy as np
 import os
+import weakref
+from openwakeword.sessions import session_registry
 from collections import deque
 
 
@@ -71,12 +72,9 @@ class VAD():
                 model_path (str): The path to the Silero VAD ONNX model.
         """
 
-        # Initialize the ONNX model
-        sessionOptions = ort.SessionOptions()
-        sessionOptions.inter_op_num_threads = 1
-        sessionOptions.intra_op_num_threads = 1
-        self.model = ort.InferenceSession(model_path, sess_options=sessionOptions,
-                                          providers=["CPUExecutionProvider"])
+        # Get the ONNX model (shared by all VAD objects), and release it once this object is deleted
+        self.model = session_registry.acquire(model_path)
+        weakref.finalize(self, session_registry.release, self.model)
 
         # Create buffer
         self.prediction_buffer: deque = deque(maxlen=125)  # buffer lenght of 10 seconds
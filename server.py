@@ -1,11 +1,18 @@
 import aiohttp
 from aiohttp import web
+import asyncio
 import numpy as np
-import resampy
 import json
 import os
 import time
+import mmap
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from openwakeword import Model
+from openwakeword.model import predict_streams
+from openwakeword.resample import StreamingResampler
+from openwakeword.sessions import session_registry
 
 # ==========================================================
 # CONFIG
@@ -17,18 +24,53 @@ SILENCE_MAX = 1.0          # seconds before stopping recording
 SILENCE_THRESHOLD = 300    # amplitude threshold for silence
 WAKEWORD_THRESHOLD = 0.5
 MAX_RECORD_SECONDS = 20
+RECORD_SPILL_BYTES = int(os.getenv("RECORD_SPILL_BYTES", 0))      # move longer recordings to a temp file (0 = never)
+
+BATCH_MAX_DELAY_MS = float(os.getenv("BATCH_MAX_DELAY_MS", 5))   # max time a frame waits for others
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 64))             # max frames per batched inference
+
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")    # "thread" or "process"
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", os.cpu_count() or 1))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 8))        # audio chunks buffered per stream
+LOOP_LAG_INTERVAL = 0.5    # seconds between event loop lag measurements
+
+STT_BACKEND = os.getenv("STT_BACKEND", "deepgram")                # "deepgram" or "fake"
+STT_TIMEOUT = float(os.getenv("STT_TIMEOUT", 15))                 # seconds per transcription request
+STT_MAX_CONCURRENCY = int(os.getenv("STT_MAX_CONCURRENCY", 32))   # max transcription requests in flight
+STT_KEEPALIVE = 60         # seconds to keep idle STT connections open
+STT_STREAMING = os.getenv("STT_STREAMING", "1") == "1"            # upload audio while the user is speaking
 
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+DEEPGRAM_URL = os.getenv("DEEPGRAM_URL", "https://api.deepgram.com/v1/listen")
 DG_MODEL = "nova-3"
 DG_LANG = "en"
 
+ORT_CACHE_DIR = os.getenv("ORT_CACHE_DIR") or None                # cache of optimized models (shared by containers)
+ORT_OPTIMIZATION_LEVEL = os.getenv("ORT_OPTIMIZATION_LEVEL", "all")  # "disable", "basic", "extended" or "all"
+ORT_MEM_ARENA = os.getenv("ORT_MEM_ARENA", "1") == "1"
+ORT_ALLOW_SPINNING = os.getenv("ORT_ALLOW_SPINNING", "1") == "1"
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ALEKS!!.onnx")
+
 # ==========================================================
 # STATE
 # ==========================================================
-recording = False
-audio_buffer = []
-last_non_silent_time = 0
-recording_start_time = 0
+MAX_STREAMS = int(os.getenv("MAX_STREAMS", 200))   # max concurrent websocket streams per process
+
+model_pool = None
+engine = None
+scheduler = None
+stt = None
+loop_lag_task = None
+
+metrics = {
+    "streams": 0,
+    "frames": 0,
+    "batches": 0,
+    "queue_full": 0,
+    "loop_lag_ms": 0.0,
+    "loop_lag_max_ms": 0.0,
+}
 
 WAKEWORD_MAP = {
     "Alex": "Alex",
@@ -42,134 +84,709 @@ def is_silence(int16_array: np.ndarray) -> bool:
     return np.max(np.abs(int16_array)) < SILENCE_THRESHOLD
 
 
-async def send_to_deepgram(audio_bytes: bytes) -> str:
-    url = (
-        "https://api.deepgram.com/v1/listen"
-        f"?model={DG_MODEL}"
-        f"&language={DG_LANG}"
-        "&encoding=linear16"
-        f"&sample_rate={SAMPLE_RATE}"
-        "&punctuate=true"
-    )
+async def monitor_loop_lag():
+    """Measures how late the event loop wakes up from a sleep, i.e. how long it was blocked"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag_ms = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)*1000
+        metrics["loop_lag_ms"] = round(lag_ms, 2)
+        metrics["loop_lag_max_ms"] = round(max(metrics["loop_lag_max_ms"], lag_ms), 2)
 
-    headers = {
-        "Authorization": f"Token {DEEPGRAM_API_KEY}",
-        "Content-Type": "application/octet-stream",
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, data=audio_bytes) as resp:
-            if resp.status != 200:
-                print("[Deepgram Error]", resp.status)
-                return ""
-
-            result = await resp.json()
-            transcript = (
-                result.get("results", {})
-                .get("channels", [{}])[0]
-                .get("alternatives", [{}])[0]
-                .get("transcript", "")
-            )
+# ==========================================================
+# SPEECH TO TEXT
+# ==========================================================
+class STTBackend:
+    """
+    Interface for speech-to-text backends. `start` and `close` are called once for the lifetime
+    of the app, and `transcribe` may be called concurrently for many streams.
+    """
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def transcribe(self, audio_bytes) -> str:
+        """Transcribes 16-bit, 16 khz, single-channel PCM audio (bytes or a bytes-like memoryview)"""
+        raise NotImplementedError
+
+    def open_stream(self):
+        """
+        Starts transcribing an utterance while it is still being recorded. Returns an object with
+        `send(audio_bytes)`, `finish()` (a coroutine returning the transcript, or None if the
+        stream failed) and `abort()` methods, or None if the backend only supports whole utterances.
+        """
+        return None
+
+
+class DeepgramSTT(STTBackend):
+    """
+    Deepgram pre-recorded audio transcription. A single HTTP session is kept for the lifetime of the
+    app, so connections (and their DNS, TCP and TLS setup) are pooled and reused across utterances.
+    """
+    def __init__(self, url: str, api_key: str, timeout: float, max_concurrency: int):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.params = {
+            "model": DG_MODEL,
+            "language": DG_LANG,
+            "encoding": "linear16",
+            "sample_rate": str(SAMPLE_RATE),
+            "punctuate": "true",
+        }
+        self.session = None
+        self.semaphore = None
+
+    async def start(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=STT_KEEPALIVE,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={
+                "Authorization": f"Token {self.api_key}",
+                "Content-Type": "application/octet-stream",
+            },
+        )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def post(self, data, timeout: float):
+        """Posts audio (bytes, or an async iterator of bytes for a chunked upload), returning None on failure"""
+        async with self.semaphore:
+            try:
+                async with self.session.post(self.url, params=self.params, data=data,
+                                             timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                    if resp.status != 200:
+                        print("[Deepgram Error]", resp.status)
+                        return None
+
+                    result = await resp.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print("[Deepgram Error]", repr(e))
+                return None
+
+        transcript = (
+            result.get("results", {})
+            .get("channels", [{}])[0]
+            .get("alternatives", [{}])[0]
+            .get("transcript", "")
+        )
 
-            print("[Deepgram Transcript]", transcript)
-            return transcript
+        print("[Deepgram Transcript]", transcript)
+        return transcript
+
+    async def transcribe(self, audio_bytes) -> str:
+        transcript = await self.post(audio_bytes, self.timeout)
+        return transcript if transcript is not None else ""
+
+    def open_stream(self):
+        return DeepgramStream(self)
+
+
+class DeepgramStream:
+    """
+    An utterance uploaded to Deepgram as a chunked request while it is being recorded, so that
+    only the final chunk and the recognition itself remain once the user stops speaking.
+    """
+    def __init__(self, backend: DeepgramSTT):
+        self.chunks = asyncio.Queue()
+        self.request = asyncio.ensure_future(backend.post(self.body(), MAX_RECORD_SECONDS + backend.timeout))
+
+    async def body(self):
+        while True:
+            chunk = await self.chunks.get()
+            if chunk is None:
+                return
+            yield chunk
+
+    def send(self, audio_bytes: bytes):
+        if not self.request.done():
+            self.chunks.put_nowait(audio_bytes)
+
+    async def finish(self):
+        self.chunks.put_nowait(None)
+        return await self.request
+
+    def abort(self):
+        self.request.cancel()
+
+
+class FakeSTT(STTBackend):
+    """
+    A local stand-in for a speech-to-text service, which answers with a fixed transcript after
+    a fixed latency plus a processing time proportional to the audio duration. Useful for load
+    testing the server without network access (see also `benchmarks/fake_stt_server.py`).
+    """
+    def __init__(self, latency: float = 0.1, real_time_factor: float = 0.02, transcript: str = "hello world"):
+        self.latency = latency
+        self.real_time_factor = real_time_factor
+        self.transcript = transcript
+
+    async def transcribe(self, audio_bytes) -> str:
+        duration = len(audio_bytes)/2/SAMPLE_RATE
+        await asyncio.sleep(self.latency + duration*self.real_time_factor)
+        return self.transcript
+
+
+def create_stt_backend(name: str) -> STTBackend:
+    if name == "deepgram":
+        return DeepgramSTT(DEEPGRAM_URL, DEEPGRAM_API_KEY, STT_TIMEOUT, STT_MAX_CONCURRENCY)
+    elif name == "fake":
+        return FakeSTT()
+    raise ValueError(f"Unknown speech-to-text backend '{name}', must be 'deepgram' or 'fake'")
 
 # ==========================================================
-# WEBSOCKET HANDLER
+# MODELS
 # ==========================================================
-async def websocket_handler(request):
-    global recording, audio_buffer
-    global last_non_silent_time, recording_start_time
+def configure_sessions():
+    session_registry.configure(
+        cache_dir=ORT_CACHE_DIR,
+        optimization_level=ORT_OPTIMIZATION_LEVEL,
+        enable_cpu_mem_arena=ORT_MEM_ARENA,
+        allow_spinning=ORT_ALLOW_SPINNING,
+    )
 
-    ws = web.WebSocketResponse()
-    await ws.prepare(request)
 
-    # Send loaded wakewords to client
-    await ws.send_str(json.dumps({
-        "loaded_models": owwModel.wakeword_names
-    }))
+def load_model():
+    return Model(
+        wakeword_models=[MODEL_PATH],
+        inference_framework="onnx"
+    )
 
-    client_sample_rate = SAMPLE_RATE
 
-    async for msg in ws:
+class ModelPool:
+    """
+    A bounded pool of openWakeWord models. Every model carries its own streaming state
+    (raw audio, melspectrogram and feature buffers, prediction history), so each active
+    stream must hold exactly one model. Models are created lazily up to `max_size`,
+    reset and kept when a stream ends, and handed to the next stream that connects.
+
+    Approximate memory cost per pooled model (the buffers are ring buffers that store every row twice):
+        - raw audio buffer (2 x 10 s of int16):                 ~0.64 MB
+        - melspectrogram buffer (2 x 970 x 32 float32):         ~0.25 MB
+        - feature buffer (2 x 120 x 96 float32):                ~0.09 MB
+    plus ~0.64 MB per stream for the buffer of a 20 s recording, once the stream has recorded.
+    The ONNX sessions (~5-10 MB, depending on the models) are loaded once per process and
+    shared by all of the models (see `openwakeword.sessions`).
+    """
+    def __init__(self, factory, max_size: int):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle = []
+        self.in_use = 0
+
+    def acquire(self):
+        """Returns a clean model, or None if `max_size` streams are already active"""
+        if self.in_use >= self.max_size:
+            return None
+
+        self.in_use += 1
+        if self.idle:
+            return self.idle.pop()
+        return self.factory()
+
+    def release(self, model):
+        model.reset()
+        self.idle.append(model)
+        self.in_use -= 1
+
+
+# Functions run inside worker processes, which each own a model pool for the streams pinned to them
+worker_models = {}
+
+
+def init_worker():
+    global model_pool
+    configure_sessions()
+    model_pool = ModelPool(load_model, MAX_STREAMS)
+
+
+def worker_predict(stream_ids: list, frames: list) -> list:
+    for stream_id in stream_ids:
+        if stream_id not in worker_models:
+            worker_models[stream_id] = model_pool.acquire()
+    return predict_streams([worker_models[i] for i in stream_ids], frames)
+
+
+def worker_release(stream_id: int):
+    if stream_id in worker_models:
+        model_pool.release(worker_models.pop(stream_id))
+
+
+class InferenceEngine:
+    """
+    Runs the wakeword models off the event loop, so that a CPU-bound batch never stalls other sockets.
+
+    With the "thread" executor, all models live in this process and batches run on a thread pool
+    (onnxruntime and numpy release the GIL while computing). With the "process" executor, each worker
+    process owns the models of the streams pinned to it, and a batch is split by worker. Either way,
+    every stream has at most one frame in flight, so its frames are processed in order.
+    """
+    def __init__(self, kind: str, workers: int):
+        self.kind = kind
+        self.streams = 0
+        self.next_stream_id = 0
+        if kind == "process":
+            self.executors = [ProcessPoolExecutor(1, initializer=init_worker) for _ in range(workers)]
+        elif kind == "thread":
+            self.executors = [ThreadPoolExecutor(workers, thread_name_prefix="inference")]
+        else:
+            raise ValueError(f"Unknown inference executor '{kind}', must be 'thread' or 'process'")
+
+    def open_stream(self):
+        """Returns a handle to the model state of a new stream, or None if the server is full"""
+        if self.streams >= MAX_STREAMS:
+            return None
+
+        if self.kind == "thread":
+            model = model_pool.acquire()
+            if model is None:
+                return None
+        else:
+            model = (self.next_stream_id % len(self.executors), self.next_stream_id)
+            self.next_stream_id += 1
+
+        self.streams += 1
+        return model
+
+    async def close_stream(self, model):
+        self.streams -= 1
+        if self.kind == "thread":
+            model_pool.release(model)
+        else:
+            await asyncio.get_running_loop().run_in_executor(self.executors[model[0]], worker_release, model[1])
+
+    async def predict(self, models: list, frames: list) -> list:
+        loop = asyncio.get_running_loop()
+        if self.kind == "thread":
+            return await loop.run_in_executor(self.executors[0], predict_streams, models, frames)
+
+        groups = defaultdict(list)
+        for ndx, (worker, _) in enumerate(models):
+            groups[worker].append(ndx)
+
+        futures = {
+            worker: loop.run_in_executor(
+                self.executors[worker], worker_predict,
+                [models[i][1] for i in ndcs], [frames[i] for i in ndcs]
+            )
+            for worker, ndcs in groups.items()
+        }
 
-        # Client sends sample rate
-        if msg.type == aiohttp.WSMsgType.TEXT:
-            try:
-                client_sample_rate = int(msg.data)
-            except ValueError:
-                pass
+        results = [None]*len(models)
+        for worker, ndcs in groups.items():
+            for ndx, result in zip(ndcs, await futures[worker]):
+                results[ndx] = result
+        return results
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# ==========================================================
+# RECORDING
+# ==========================================================
+class PCMBuffer:
+    """
+    A contiguous, growable buffer of 16-bit PCM audio for recording utterances. Samples are stored
+    at 2 bytes each (instead of as Python ints), the capacity doubles as needed and is kept between
+    recordings, and the recorded audio can be read as a memoryview without copying it.
+
+    If `spill_bytes` is set, a recording that grows beyond it is moved to a temporary file, and is
+    then read through a memory map of that file. Writing to the file blocks, so the methods that
+    do it (see `spills`) should be run off the event loop.
+    """
+    def __init__(self, initial_samples: int = SAMPLE_RATE*5, spill_bytes: int = 0):
+        self.initial_samples = initial_samples
+        self.spill_bytes = spill_bytes
+        self.data = None
+        self.size = 0
+        self.spill_file = None
+        self.spill_map = None
+        self.spill_view = None
+
+    def spills(self, n_samples: int = 0) -> bool:
+        """Whether appending `n_samples` more samples (or reading the buffer) writes to the spill file"""
+        return self.spill_file is not None or bool(self.spill_bytes and (self.size + n_samples)*2 > self.spill_bytes)
+
+    def append(self, x: np.ndarray):
+        if self.spill_file is not None:
+            self.spill_file.write(x.astype(np.int16, copy=False).tobytes())
+            self.size += x.shape[0]
+            return
+
+        if self.data is None:
+            self.data = np.empty(max(self.initial_samples, x.shape[0]), dtype=np.int16)
+        elif self.size + x.shape[0] > self.data.shape[0]:
+            grown = np.empty(max(2*self.data.shape[0], self.size + x.shape[0]), dtype=np.int16)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+
+        self.data[self.size:self.size + x.shape[0]] = x
+        self.size += x.shape[0]
+
+        if self.spill_bytes and self.size*2 > self.spill_bytes:
+            self.spill_file = tempfile.TemporaryFile(prefix="recording_")
+            self.spill_file.write(self.data[:self.size].tobytes())
+            self.data = None
+
+    def view(self) -> memoryview:
+        """The recorded audio as bytes. Only valid until the buffer is cleared (or viewed again)."""
+        if self.spill_file is not None:
+            self.close_map()
+            self.spill_file.flush()
+            self.spill_map = mmap.mmap(self.spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.spill_view = memoryview(self.spill_map)
+            return self.spill_view
+        if self.data is None:
+            return memoryview(b"")
+        return memoryview(self.data[:self.size]).cast("B")
+
+    def close_map(self):
+        """Unmaps the spill file, once no views of it are left in use"""
+        if self.spill_map is None:
+            return
+        try:
+            self.spill_view.release()
+            self.spill_map.close()
+        except BufferError:
+            pass  # still exported by the caller of `view`, so it is unmapped when that is collected
+        self.spill_map = self.spill_view = None
+
+    def clear(self):
+        self.size = 0
+        self.close_map()
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+# ==========================================================
+# SESSIONS
+# ==========================================================
+class BatchScheduler:
+    """
+    Gathers 80 ms frames from all active streams and runs them through the models in a single
+    batch (one melspectrogram, one embedding and one call per wakeword model), then hands the
+    scores back to each stream. A frame waits at most `max_delay` seconds for other frames
+    to arrive, and a batch is started immediately once `max_size` frames are pending, so the
+    latency added to any frame is bounded by `max_delay` plus the time of one batch.
+    """
+    def __init__(self, max_delay: float, max_size: int):
+        self.max_delay = max_delay
+        self.max_size = max_size
+        self.pending = []
+        self.flush_handle = None
+        self.running = set()
+
+    async def predict(self, model, frame: np.ndarray) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((model, frame, future))
+
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_delay, self.flush)
+
+        return await future
+
+    def flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.ensure_future(self.run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def run_batch(self, batch: list):
+        try:
+            results = await engine.predict([b[0] for b in batch], [b[1] for b in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        metrics["batches"] += 1
+        metrics["frames"] += len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class StreamSession:
+    """The state of a single websocket connection: its model, sample rate, audio queue and recording."""
+    def __init__(self, model):
+        self.model = model
+        self.sample_rate = SAMPLE_RATE
+        self.queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.closed = False
+        self.recording = False
+        self.audio_buffer = PCMBuffer(spill_bytes=RECORD_SPILL_BYTES)
+        self.last_non_silent_time = 0
+        self.recording_start_time = 0
+        self.frame_remainder = np.empty(0, dtype=np.int16)
+        self.resampler = None
+        self.stt_stream = None
+
+    def resample(self, data: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Resamples audio to 16 khz, carrying the resampler state across the chunks of the stream"""
+        if self.resampler is None or self.resampler.input_rate != sample_rate:
+            self.resampler = StreamingResampler(sample_rate, SAMPLE_RATE)
+        return self.resampler(data)
+
+    def split_frames(self, data: np.ndarray) -> list:
+        """Splits incoming audio into 80 ms frames, keeping any leftover samples for the next chunk"""
+        data = np.concatenate((self.frame_remainder, data))
+        n_frames = data.shape[0] // CHUNK_SIZE
+        self.frame_remainder = data[n_frames*CHUNK_SIZE:]
+        return [data[i*CHUNK_SIZE:(i+1)*CHUNK_SIZE] for i in range(n_frames)]
+
+    def start_recording(self):
+        self.recording = True
+        self.audio_buffer.clear()
+        self.frame_remainder = np.empty(0, dtype=np.int16)
+        self.recording_start_time = time.time()
+        self.last_non_silent_time = time.time()
+        if STT_STREAMING:
+            self.stt_stream = stt.open_stream()
+
+    async def add_audio(self, data: np.ndarray):
+        if self.audio_buffer.spills(data.shape[0]):
+            await asyncio.get_running_loop().run_in_executor(None, self.audio_buffer.append, data)
+        else:
+            self.audio_buffer.append(data)
+        if self.stt_stream is not None:
+            self.stt_stream.send(data.tobytes())
+        if not is_silence(data):
+            self.last_non_silent_time = time.time()
+
+    def recording_finished(self) -> bool:
+        now = time.time()
+        return (
+            now - self.last_non_silent_time >= SILENCE_MAX
+            or now - self.recording_start_time >= MAX_RECORD_SECONDS
+        )
+
+    async def stop_recording(self) -> memoryview:
+        """Returns the recorded audio, which stays valid until the next recording starts"""
+        self.recording = False
+        if self.audio_buffer.spills():
+            return await asyncio.get_running_loop().run_in_executor(None, self.audio_buffer.view)
+        return self.audio_buffer.view()
+
+# ==========================================================
+# WEBSOCKET HANDLER
+# ==========================================================
+async def process_stream(ws, session: StreamSession):
+    """Consumes the audio chunks of one stream in order, off the websocket receive loop"""
+    loop = asyncio.get_running_loop()
 
-        # Audio chunk
-        elif msg.type == aiohttp.WSMsgType.BINARY:
+    while True:
+        item = await session.queue.get()
+        if item is None or session.closed:
+            break
 
-            audio_bytes = msg.data
-            if len(audio_bytes) % 2:
-                audio_bytes += b"\x00"
+        sample_rate, audio_bytes = item
+        if len(audio_bytes) % 2:
+            audio_bytes += b"\x00"
 
-            data = np.frombuffer(audio_bytes, dtype=np.int16)
+        data = np.frombuffer(audio_bytes, dtype=np.int16)
 
-            if client_sample_rate != SAMPLE_RATE:
-                data = resampy.resample(
-                    data, client_sample_rate, SAMPLE_RATE
-                ).astype(np.int16)
+        if sample_rate != SAMPLE_RATE:
+            data = await loop.run_in_executor(None, session.resample, data, sample_rate)
 
-            # ---------------- WAKEWORD DETECTION ----------------
-            if not recording:
-                predictions = owwModel.predict(
-                    data.astype(np.float32) / 32768.0
-                )
+        # ---------------- WAKEWORD DETECTION ----------------
+        if not session.recording:
+            activated = []
+            for frame in session.split_frames(data):
+                predictions = await scheduler.predict(session.model, frame)
 
                 activated = [
                     WAKEWORD_MAP.get(k, k)
                     for k, v in predictions.items()
                     if v >= WAKEWORD_THRESHOLD
                 ]
-
                 if "Alex" in activated:
-                    print("[Wakeword] Alex detected")
+                    break
+
+            if "Alex" in activated:
+                print("[Wakeword] Alex detected")
+
+                session.start_recording()
+
+                await ws.send_str(json.dumps({
+                    "activations": ["Alex"]
+                }))
+
+        # ---------------- RECORDING ----------------
+        if session.recording:
+            await session.add_audio(data)
+
+            if session.recording_finished():
+                print("[Recording stopped]")
+
+                stt_stream, session.stt_stream = session.stt_stream, None
+                wav_bytes = await session.stop_recording()
+
+                # Finish the streaming upload, falling back to uploading the whole recording
+                transcript = await stt_stream.finish() if stt_stream is not None else None
+                if transcript is None:
+                    transcript = await stt.transcribe(wav_bytes)
+
+                await ws.send_str(json.dumps({
+                    "transcript": transcript
+                }))
+
+
+async def enqueue_audio(session: StreamSession, worker: asyncio.Future, item: tuple) -> bool:
+    """
+    Queues an audio chunk for the stream worker, waiting while the queue is full. Returns False,
+    without queueing the chunk, if the worker stopped (e.g., on an error) before there was room.
+    """
+    if not session.queue.full():
+        session.queue.put_nowait(item)
+        return True
+
+    metrics["queue_full"] += 1
+    put = asyncio.ensure_future(session.queue.put(item))
+    try:
+        await asyncio.wait({put, worker}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        put.cancel()
+    return put.done() and not put.cancelled()
+
+
+async def close_session(session: StreamSession, worker: asyncio.Future):
+    """Stops the worker of a stream, waiting for its in-flight work, and returns the model to the pool"""
+    try:
+        # Drop any queued audio, and wait for in-flight work before the model is reused
+        session.closed = True
+        while not session.queue.empty():
+            session.queue.get_nowait()
+        session.queue.put_nowait(None)
+        error = (await asyncio.gather(worker, return_exceptions=True))[0]
+        if isinstance(error, Exception):
+            print(f"[Server] Stream stopped on an error: {error!r}")
+
+        if session.stt_stream is not None:
+            session.stt_stream.abort()
+        session.audio_buffer.clear()
+    finally:
+        try:
+            await engine.close_stream(session.model)
+        finally:
+            metrics["streams"] -= 1
+
 
-                    recording = True
-                    audio_buffer = []
-                    recording_start_time = time.time()
-                    last_non_silent_time = time.time()
+async def websocket_handler(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
 
-                    await ws.send_str(json.dumps({
-                        "activations": ["Alex"]
-                    }))
+    model = engine.open_stream()
+    if model is None:
+        print("[Server] Stream rejected, all models in use")
+        await ws.send_str(json.dumps({"error": "server busy"}))
+        await ws.close()
+        return ws
+
+    metrics["streams"] += 1
+    session = StreamSession(model)
+    worker = asyncio.ensure_future(process_stream(ws, session))
+
+    try:
+        # Send loaded wakewords to client
+        await ws.send_str(json.dumps({
+            "loaded_models": [os.path.splitext(os.path.basename(MODEL_PATH))[0]]
+        }))
+
+        async for msg in ws:
+
+            # Client sends sample rate
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                try:
+                    session.sample_rate = int(msg.data)
+                except ValueError:
+                    pass
+
+            # Audio chunk (waits here, slowing down only this socket, if the stream falls behind)
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                if not await enqueue_audio(session, worker, (session.sample_rate, msg.data)):
+                    break
+
+            if worker.done():
+                break
+
+    finally:
+        # Clean up in a separate task, so that the model is returned to the pool even if the handler
+        # is cancelled (e.g., on shutdown) while it waits for the in-flight work of the stream
+        await asyncio.shield(asyncio.ensure_future(close_session(session, worker)))
 
-            # ---------------- RECORDING ----------------
-            if recording:
-                audio_buffer.extend(data.tolist())
+    return ws
+
+# ==========================================================
+# STATIC FILE / METRICS
+# ==========================================================
+async def static_file_handler(request):
+    return web.FileResponse("./streaming_client.html")
 
-                if not is_silence(data):
-                    last_non_silent_time = time.time()
 
-                now = time.time()
-                if (
-                    now - last_non_silent_time >= SILENCE_MAX
-                    or now - recording_start_time >= MAX_RECORD_SECONDS
-                ):
-                    print("[Recording stopped]")
+async def metrics_handler(request):
+    return web.json_response(metrics)
 
-                    wav_bytes = np.array(audio_buffer, dtype=np.int16).tobytes()
+# ==========================================================
+# APP
+# ==========================================================
+async def on_startup(app):
+    global loop_lag_task
+    loop_lag_task = asyncio.ensure_future(monitor_loop_lag())
+    await stt.start()
 
-                    transcript = await send_to_deepgram(wav_bytes)
 
-                    await ws.send_str(json.dumps({
-                        "transcript": transcript
-                    }))
+async def on_cleanup(app):
+    loop_lag_task.cancel()
+    await stt.close()
+    engine.shutdown()
 
-                    recording = False
-                    audio_buffer = []
 
-    return ws
+def create_app():
+    global model_pool, engine, scheduler, stt
 
-# ==========================================================
-# STATIC FILE
-# ==========================================================
-async def static_file_handler(request):
-    return web.FileResponse("./streaming_client.html")
+    configure_sessions()
+    if INFERENCE_EXECUTOR == "thread":
+        model_pool = ModelPool(load_model, MAX_STREAMS)
+        model_pool.idle.append(model_pool.factory())   # load one model up front to fail fast
+        print("[Loaded wakewords]", list(model_pool.idle[0].models.keys()))
+
+    engine = InferenceEngine(INFERENCE_EXECUTOR, INFERENCE_WORKERS)
+    scheduler = BatchScheduler(BATCH_MAX_DELAY_MS / 1000, BATCH_MAX_SIZE)
+    stt = create_stt_backend(STT_BACKEND)
+    print(f"[Server] Up to {MAX_STREAMS} concurrent streams, "
+          f"{INFERENCE_WORKERS} inference {INFERENCE_EXECUTOR} worker(s)")
+
+    app = web.Application()
+    app.add_routes([
+        web.get("/ws", websocket_handler),
+        web.get("/metrics", metrics_handler),
+        web.get("/", static_file_handler),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+
+    return app
 
 # ==========================================================
 # MAIN
@@ -180,31 +797,15 @@ if __name__ == "__main__":
     os.environ["CUDA_VISIBLE_DEVICES"] = ""
     os.environ["ORT_DISABLE_CUDA"] = "1"
 
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    custom_model_path = os.path.join(base_path, "ALEKS!!.onnx")
-
     # -------- VERIFY MODEL EXISTS --------
-    if not os.path.exists(custom_model_path):
+    if not os.path.exists(MODEL_PATH):
         raise FileNotFoundError(
-            f"Custom wake word ONNX file not found: {custom_model_path}\n"
+            f"Custom wake word ONNX file not found: {MODEL_PATH}\n"
             "Make sure Aleks!!.onnx is committed to your repo and deployed."
         )
 
-    # -------- LOAD OPENWAKEWORD MODEL --------
-    owwModel = Model(
-        custom_wakeword_models=[custom_model_path],
-        use_builtin_models=False,     
-        inference_framework="onnx"
-    )
-
-    print("[Loaded wakewords]", owwModel.wakeword_names)
-
     # -------- START SERVER --------
-    app = web.Application()
-    app.add_routes([
-        web.get("/ws", websocket_handler),
-        web.get("/", static_file_handler),
-    ])
+    app = create_app()
 
     port = int(os.getenv("PORT", 10000))
     print(f"[Server] Listening on port {port}")
@@ -0,0 +1,98 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import os
+import numpy as np
+import pytest
+import openwakeword
+
+wakeword_model_path = os.path.join(os.path.dirname(openwakeword.__file__), "resources", "models", "alexa_v0.1.onnx")
+other_wakeword_model_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ALEKS!!.onnx")
+
+
+@pytest.fixture(scope="session")
+def feature_models(tmp_path_factory):
+    """
+    Small stand-ins for the melspectrogram and embedding models, with the same inputs and outputs (and
+    the same frame counts) as the real ones, so that the streaming and batched code paths can be compared
+    """
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import helper, numpy_helper, TensorProto
+
+    directory = tmp_path_factory.mktemp("models")
+    rng = np.random.default_rng(0)
+
+    # Melspectrogram: (batch, samples) -> (batch, 1, frames, 32), with frames = 1 + (samples - 512)//160
+    nodes = [
+        helper.make_node("Unsqueeze", ["input", "axis"], ["x"]),
+        helper.make_node("Conv", ["x", "weights"], ["conv"], kernel_shape=[512], strides=[160]),
+        helper.make_node("Abs", ["conv"], ["abs"]),
+        helper.make_node("Add", ["abs", "one"], ["positive"]),
+        helper.make_node("Log", ["positive"], ["log"]),
+        helper.make_node("Transpose", ["log"], ["frames"], perm=[0, 2, 1]),
+        helper.make_node("Unsqueeze", ["frames", "axis"], ["output"]),
+    ]
+    initializers = [
+        numpy_helper.from_array((rng.standard_normal((32, 1, 512))*1e-3).astype(np.float32), "weights"),
+        numpy_helper.from_array(np.array([1], np.int64), "axis"),
+        numpy_helper.from_array(np.array(1.0, np.float32), "one"),
+    ]
+    graph = helper.make_graph(nodes, "melspectrogram",
+                              [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", "samples"])],
+                              [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch", 1, "frames", 32])],
+                              initializers)
+    melspec_model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    melspec_model.ir_version = 8
+    onnx.save(melspec_model, str(directory/"melspectrogram.onnx"))
+
+    # Embedding: (batch, 76, 32, 1) -> (batch, 1, 1, 96)
+    nodes = [
+        helper.make_node("Reshape", ["input_1", "flat_shape"], ["flat"]),
+        helper.make_node("MatMul", ["flat", "weights"], ["dense"]),
+        helper.make_node("Tanh", ["dense"], ["tanh"]),
+        helper.make_node("Reshape", ["tanh", "output_shape"], ["output"]),
+    ]
+    initializers = [
+        numpy_helper.from_array((rng.standard_normal((76*32, 96))*0.02).astype(np.float32), "weights"),
+        numpy_helper.from_array(np.array([-1, 76*32], np.int64), "flat_shape"),
+        numpy_helper.from_array(np.array([-1, 1, 1, 96], np.int64), "output_shape"),
+    ]
+    graph = helper.make_graph(nodes, "embedding",
+                              [helper.make_tensor_value_info("input_1", TensorProto.FLOAT, ["batch", 76, 32, 1])],
+                              [helper.make_tensor_value_info("output", TensorProto.FLOAT, ["batch", 1, 1, 96])],
+                              initializers)
+    embedding_model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    embedding_model.ir_version = 8
+    onnx.save(embedding_model, str(directory/"embedding_model.onnx"))
+
+    return dict(melspec_model_path=str(directory/"melspectrogram.onnx"),
+                embedding_model_path=str(directory/"embedding_model.onnx"))
+
+
+@pytest.fixture
+def make_model(feature_models):
+    """Creates `Model` objects with the stand-in feature models, and the bundled alexa model by default"""
+    def make_model(wakeword_models: list = [wakeword_model_path], **kwargs):
+        return openwakeword.Model(wakeword_models=wakeword_models, inference_framework="onnx",
+                                  **feature_models, **kwargs)
+
+    return make_model
+
+
+@pytest.fixture
+def speech():
+    """A few seconds of noise-like audio, loud enough to get varied scores"""
+    return (np.random.default_rng(0).standard_normal(16000*4)*3000).astype(np.int16)
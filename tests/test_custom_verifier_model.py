@@ -0,0 +1,89 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import pickle
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.pipeline import make_pipeline  # noqa: E402
+from sklearn.preprocessing import FunctionTransformer, StandardScaler  # noqa: E402
+from openwakeword.custom_verifier_model import VerifierModel, load_verifier_model, train_verifier_model  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def data():
+    """Feature windows of two classes, of shape (N, 16, 96), and their labels"""
+    rng = np.random.default_rng(0)
+    labels = np.repeat([0, 1], 100)
+    features = (rng.standard_normal((200, 16, 96)) + labels[:, None, None]*rng.standard_normal((16, 96))*0.5)
+    return features.astype(np.float32), labels
+
+
+@pytest.fixture(scope="module")
+def pipeline(data):
+    return train_verifier_model(*data)
+
+
+def test_same_scores_as_pipeline(data, pipeline):
+    features, _ = data
+    verifier = VerifierModel.from_pipeline(pipeline)
+    expected = pipeline.predict_proba(features)
+    probabilities = verifier.predict_proba(features)
+    assert probabilities.shape == expected.shape == (200, 2)
+    assert np.abs(probabilities - expected).max() <= 1.3e-7
+    assert 0 < (expected[:, 1] >= 0.5).sum() < 200  # the scores aren't all saturated
+
+
+def test_unsupported_pipelines(data):
+    features, labels = data
+    identity = make_pipeline(FunctionTransformer(), StandardScaler(), LogisticRegression())
+    identity.fit(features.reshape(200, -1), labels)
+    with pytest.raises(ValueError):
+        VerifierModel.from_pipeline(identity)
+
+    multiclass = make_pipeline(StandardScaler(), LogisticRegression())
+    multiclass.fit(features.reshape(200, -1), np.arange(200) % 3)
+    with pytest.raises(ValueError):
+        VerifierModel.from_pipeline(multiclass)
+
+
+class TestLoadVerifierModel:
+    def test_npz(self, data, pipeline, tmp_path):
+        verifier = VerifierModel.from_pipeline(pipeline)
+        path = str(tmp_path/"verifier.npz")
+        verifier.save(path)
+        loaded = load_verifier_model(path)
+        assert isinstance(loaded, VerifierModel)
+        assert np.array_equal(loaded.weights, verifier.weights) and loaded.bias == verifier.bias
+
+    def test_pickled_pipeline(self, data, pipeline, tmp_path):
+        path = tmp_path/"verifier.pkl"
+        path.write_bytes(pickle.dumps(pipeline))
+        loaded = load_verifier_model(str(path))
+        assert isinstance(loaded, VerifierModel)
+        assert np.abs(loaded.predict_proba(data[0]) - pipeline.predict_proba(data[0])).max() <= 1.3e-7
+
+    def test_pickled_pipeline_fallback(self, data, tmp_path):
+        # A pipeline that can't be converted is scored with scikit-learn
+        features, labels = data
+        identity = make_pipeline(FunctionTransformer(), LogisticRegression())
+        identity.fit(features.reshape(200, -1), labels)
+        path = tmp_path/"verifier.pkl"
+        path.write_bytes(pickle.dumps(identity))
+        loaded = load_verifier_model(str(path))
+        assert not isinstance(loaded, VerifierModel)
+        assert np.array_equal(loaded.predict_proba(features.reshape(200, -1)), identity.predict_proba(features.reshape(200, -1)))
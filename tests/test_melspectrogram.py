@@ -0,0 +1,57 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import numpy as np
+import pytest
+from openwakeword.melspectrogram import melspectrogram
+from openwakeword.utils import AudioFeatures
+
+
+@pytest.fixture
+def audio():
+    return (np.random.default_rng(0).standard_normal(1280*20)*3000).astype(np.int16)
+
+
+def test_frame_count(audio):
+    for n in [512, 513, 671, 672, 1280, 1760, 16000]:
+        assert melspectrogram(audio[0:n]).shape == ((n - 512)//160 + 1, 32)
+
+
+def test_too_short():
+    for n in [0, 1, 400, 511]:
+        with pytest.raises(ValueError):
+            melspectrogram(np.zeros(n, dtype=np.int16))
+
+
+def test_chunked_same_as_whole_clip(audio):
+    # Like streaming: the first 80 ms chunk on its own, then every chunk with the 480 samples before it
+    whole = melspectrogram(audio)
+    chunks = [melspectrogram(audio[0:1280])] + [melspectrogram(audio[i - 480:i + 1280]) for i in range(1280, audio.shape[0], 1280)]
+    assert [chunk.shape[0] for chunk in chunks] == [5] + [8]*19
+    assert np.array_equal(np.concatenate(chunks), whole)
+
+
+def test_batch(audio):
+    clips = audio.reshape(4, -1)
+    assert np.array_equal(melspectrogram(clips), np.stack([melspectrogram(clip) for clip in clips]))
+
+
+def test_streaming_frontend(audio, feature_models):
+    # The numpy frontend of `AudioFeatures` buffers the same frames as the melspectrogram of the whole clip
+    features = AudioFeatures(melspec_frontend="numpy", embedding_model_path=feature_models["embedding_model_path"],
+                             inference_framework="onnx")
+    for i in range(0, audio.shape[0], 1280):
+        features(audio[i:i + 1280])
+    assert np.array_equal(features.melspectrogram_buffer[-(5 + 8*19):], melspectrogram(audio)/10 + 2)
@@ -0,0 +1,69 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import numpy as np
+import pytest
+from openwakeword.metrics import get_false_positives, get_score_array
+from openwakeword.utils import ClipScores
+
+
+class TestGetFalsePositives:
+    def test_edge_at_the_end(self):
+        assert get_false_positives([0, 0, 0, 1], 0.5) == 1
+
+    def test_edge_at_the_start(self):
+        assert get_false_positives([1, 1, 0, 0], 0.5) == 1
+        assert get_false_positives([1], 0.5) == 1
+
+    def test_one_per_activation(self):
+        assert get_false_positives([0, 0, 1, 1, 0], 0.5) == 1
+        assert get_false_positives([0] + [1]*200 + [0], 0.5) == 1
+
+    def test_grouping_window(self):
+        scores = [0, 1, 0, 1, 0, 0, 0, 1, 0]  # rising edges at frames 1, 3 and 7
+        assert get_false_positives(scores, 0.5, grouping_window=1) == 3
+        assert get_false_positives(scores, 0.5, grouping_window=3) == 2
+        assert get_false_positives(scores, 0.5, grouping_window=6) == 2
+        assert get_false_positives(scores, 0.5, grouping_window=7) == 1
+
+    def test_no_false_positives(self):
+        assert get_false_positives([], 0.5) == 0
+        assert get_false_positives([0.1, 0.4, 0.2], 0.5) == 0
+
+
+class TestGetScoreArray:
+    scores = ClipScores(np.array([[0.1, 0.9], [0.2, 0.8], [0.3, 0.7]]), ["a", "b"])
+
+    def test_labels(self):
+        assert np.array_equal(get_score_array(self.scores, "a"), np.float32([0.1, 0.2, 0.3]))
+        assert np.array_equal(get_score_array(self.scores, "b"), np.float32([0.9, 0.8, 0.7]))
+        with pytest.raises(ValueError):
+            get_score_array(self.scores)  # several labels
+        assert np.array_equal(get_score_array(ClipScores([0.5, 0.6], ["a"])), np.float32([0.5, 0.6]))
+
+    def test_blocks(self):
+        blocks = [ClipScores(self.scores.scores[0:2], ["a", "b"]), ClipScores(self.scores.scores[2:], ["a", "b"])]
+        assert np.array_equal(get_score_array(blocks, "b"), self.scores["b"])
+        assert np.array_equal(get_score_array(iter(blocks), "b"), self.scores["b"])
+
+    def test_plain_scores(self):
+        assert np.array_equal(get_score_array([0.1, 0.2]), [0.1, 0.2])
+        assert get_score_array(np.zeros(4)).shape == (4, )
+
+    def test_same_false_positives(self):
+        scores = np.random.default_rng(0).random((500, 2)).astype(np.float32)
+        clip_scores = ClipScores(scores, ["a", "b"])
+        for ndx, label in enumerate(["a", "b"]):
+            assert get_false_positives(clip_scores, 0.9, label=label) == get_false_positives(scores[:, ndx], 0.9)
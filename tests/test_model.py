@@ -0,0 +1,137 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import numpy as np
+import pytest
+from conftest import wakeword_model_path, other_wakeword_model_path
+from openwakeword.utils import ClipScores
+
+
+def frame_scores(predictions: list, label: str = "alexa_v0.1"):
+    return np.array([p[label] for p in predictions], dtype=np.float32)
+
+
+class TestPredictClipVectorized:
+    @pytest.mark.parametrize("n_samples", [16000*3, 16000*3 + 17, 1280*7 + 1, 1279, 1000, 0])
+    @pytest.mark.parametrize("padding", [0, 1])
+    def test_same_as_streaming(self, make_model, speech, n_samples, padding):
+        clip = speech[0:n_samples]
+        expected = frame_scores(make_model().predict_clip(clip, padding=padding))
+        scores = make_model().predict_clip_vectorized(clip, padding=padding)["alexa_v0.1"]
+        assert scores.shape == expected.shape
+        assert np.abs(scores - expected).max(initial=0) == 0
+
+    def test_patience(self, make_model, speech):
+        kwargs = dict(patience={"alexa_v0.1": 2}, threshold={"alexa_v0.1": 0.001})
+        expected = frame_scores(make_model().predict_clip(speech, **kwargs))
+        assert np.count_nonzero(expected) > 0
+        scores = make_model().predict_clip_vectorized(speech, batch_size=7, **kwargs)["alexa_v0.1"]
+        assert np.abs(scores - expected).max() == 0
+
+    def test_small_batches(self, make_model, speech):
+        model = make_model()
+        expected = model.predict_clip_vectorized(speech)["alexa_v0.1"]
+        for batch_size in [1, 3, 16]:
+            assert np.array_equal(model.predict_clip_vectorized(speech, batch_size=batch_size)["alexa_v0.1"], expected)
+
+    def test_streaming_state_unchanged(self, make_model, speech):
+        model = make_model()
+        model.predict(speech[0:1280*5])
+        buffer = model.preprocessor.feature_buffer.copy()
+        model.predict_clip_vectorized(speech)
+        assert np.array_equal(model.preprocessor.feature_buffer, buffer)
+
+
+class TestClipScores:
+    def test_columnar_predict_clip(self, make_model, speech):
+        models = [wakeword_model_path, other_wakeword_model_path]
+        predictions = make_model(models).predict_clip(speech)
+        scores = make_model(models).predict_clip(speech, return_type="columnar")
+        assert isinstance(scores, ClipScores)
+        assert scores.labels == list(predictions[0].keys()) == ["alexa_v0.1", "ALEKS!!"]
+        assert scores.scores.shape == (len(predictions), 2) and scores.scores.dtype == np.float32
+        assert scores.to_list() == [{label: np.float32(p[label]).item() for label in p} for p in predictions]
+        for label in scores.labels:
+            assert np.array_equal(scores[label], frame_scores(predictions, label))
+
+    def test_return_type(self, make_model, speech):
+        model = make_model()
+        assert isinstance(model.predict_clip(speech[0:16000]), list)
+        with pytest.raises(ValueError):
+            model.predict_clip(speech, return_type="dataframe")
+
+    def test_blocks(self, make_model, speech):
+        scores = make_model().predict_clip(speech, return_type="columnar")
+        blocks = list(make_model().iter_clip_scores(speech, block_size=16))
+        assert [block.scores.shape[0] for block in blocks] == [16, 16, 16, 16, scores.scores.shape[0] - 64]
+        assert np.array_equal(ClipScores.concatenate(blocks).scores, scores.scores)
+
+    def test_empty_clip(self, make_model):
+        scores = make_model().predict_clip(np.zeros(0, dtype=np.int16), padding=0, return_type="columnar")
+        assert scores.scores.shape == (0, 1) and scores.labels == ["alexa_v0.1"]
+
+
+def stream(model, clip: np.ndarray, label: str = "alexa_v0.1"):
+    """Predicts on a clip in 80 ms frames, returning the scores, and whether the features of each frame were computed"""
+    scores, computed = [], []
+    for i in range(0, clip.shape[0] - 1279, 1280):
+        scores.append(model.predict(clip[i:i+1280])[label])
+        computed.append(model.preprocessor.skipped_samples == 0)
+    return np.array(scores, dtype=np.float32), np.array(computed)
+
+
+class TestCascade:
+    def test_open_frames_match_ungated_scores(self, make_model, speech):
+        # Speech, silence that outlasts the hangover of the gate, and speech again
+        clip = np.concatenate((speech[0:16000*2], np.zeros(16000*4, dtype=np.int16), speech[16000*2:]))
+        expected, _ = stream(make_model(), clip)
+        scores, computed = stream(make_model(cascade="energy", cascade_hangover=5), clip)
+
+        assert 0 < computed.sum() < computed.shape[0]
+        assert np.all(scores[~computed] == 0)
+        assert np.allclose(scores[computed], expected[computed], rtol=1e-4, atol=1e-7)
+        assert expected[computed].max() > 0
+
+    def test_open_gate(self, make_model, speech):
+        expected, _ = stream(make_model(), speech)
+        scores, computed = stream(make_model(cascade="energy"), speech)
+        assert computed.all()
+        assert np.array_equal(scores, expected)
+
+
+class TestDutyCycle:
+    @pytest.mark.parametrize("duty_cycle", [2, 3])
+    def test_peaks_match_full_rate(self, make_model, speech, duty_cycle):
+        expected, _ = stream(make_model(), speech)
+        scores, computed = stream(make_model(duty_cycle=duty_cycle, duty_cycle_threshold=0.5), speech)
+        assert (~computed).sum() > 0
+
+        # Every full-rate score is returned at most `duty_cycle - 1` frames later (as the maximum of the frames
+        # predicted on together), and no score is higher than the full-rate scores of the frames it can cover
+        # (a skipped frame holds the previous score, which covers up to `duty_cycle - 1` frames before it)
+        tolerance = dict(rtol=1e-4, atol=1e-7)
+        for t in range(expected.shape[0]):
+            returned = scores[t:t + duty_cycle].max()
+            assert returned >= expected[t] or np.isclose(returned, expected[t], **tolerance)
+            covered = expected[max(0, t - 2*(duty_cycle - 1)):t + 1].max()
+            assert scores[t] <= covered or np.isclose(scores[t], covered, **tolerance)
+        assert np.isclose(scores.max(), expected.max(), **tolerance)
+
+    def test_full_rate_above_threshold(self, make_model, speech):
+        # Only the frames right after the 5 warm-up frames (with scores of 0) are skipped
+        expected, _ = stream(make_model(), speech)
+        scores, computed = stream(make_model(duty_cycle=3, duty_cycle_threshold=1e-9), speech)
+        assert computed[8:].all()
+        assert np.allclose(scores[8:], expected[8:], rtol=1e-4, atol=1e-7)
@@ -0,0 +1,61 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import os
+import numpy as np
+import pytest
+import openwakeword
+from openwakeword.numpy_inference import NumpyModel, load_numpy_model
+from openwakeword.sessions import session_registry
+
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+
+model_path = os.path.join(os.path.dirname(openwakeword.__file__), "resources", "models", "alexa_v0.1.onnx")
+
+
+def test_same_scores_as_onnxruntime():
+    numpy_model = NumpyModel(model_path)
+    session = ort.InferenceSession(model_path)
+    x = np.random.default_rng(0).standard_normal((1, 16, 96)).astype(np.float32)
+    assert np.allclose(numpy_model.run(None, {numpy_model.get_inputs()[0].name: x})[0],
+                       session.run(None, {session.get_inputs()[0].name: x})[0], atol=1e-6)
+
+    # Any batch size
+    x = np.random.default_rng(1).standard_normal((7, 16, 96)).astype(np.float32)
+    scores = numpy_model.run(None, {numpy_model.get_inputs()[0].name: x})[0]
+    assert scores.shape == (7, 1)
+    for i in range(7):
+        assert np.allclose(scores[i], session.run(None, {session.get_inputs()[0].name: x[i:i+1]})[0][0], atol=1e-6)
+
+
+def test_fallback_to_onnxruntime(tmp_path):
+    # A model with an operator that isn't supported
+    graph = onnx.helper.make_graph([onnx.helper.make_node("Sin", ["x"], ["y"])], "sin",
+                                   [onnx.helper.make_tensor_value_info("x", onnx.TensorProto.FLOAT, [1, 4])],
+                                   [onnx.helper.make_tensor_value_info("y", onnx.TensorProto.FLOAT, [1, 4])])
+    model = onnx.helper.make_model(graph, opset_imports=[onnx.helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = str(tmp_path/"sin.onnx")
+    onnx.save(model, path)
+
+    with pytest.raises(NotImplementedError):
+        NumpyModel(path)
+
+    session = load_numpy_model(path)
+    assert not isinstance(session, NumpyModel)
+    assert np.allclose(session.run(None, {"x": np.ones((3, 4), dtype=np.float32)})[0], np.sin(1))
+    session_registry.release(session)
+    assert path not in session_registry.loaded_models()
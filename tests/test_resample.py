@@ -0,0 +1,67 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import numpy as np
+import pytest
+import scipy.signal
+from openwakeword.resample import StreamingResampler
+
+
+def get_audio(input_rate: int, seconds: float = 2):
+    """A chirp plus noise, at 16-bit PCM levels"""
+    rng = np.random.default_rng(input_rate)
+    t = np.arange(int(input_rate*seconds))/input_rate
+    x = 8000*scipy.signal.chirp(t, 50, seconds, input_rate/2) + rng.standard_normal(t.shape[0])*1000
+    return np.clip(np.rint(x), -32768, 32767).astype(np.int16)
+
+
+def stream(resampler: StreamingResampler, x: np.ndarray, chunk_sizes: list):
+    outputs, start = [], 0
+    for size in chunk_sizes:
+        outputs.append(resampler(x[start:start + size]))
+        assert outputs[-1].dtype == np.int16
+        start += size
+    outputs.append(resampler(x[start:]))
+    return np.concatenate(outputs)
+
+
+@pytest.mark.parametrize("input_rate", [44100, 48000, 8000, 22050])
+def test_same_as_resample_poly(input_rate):
+    x = get_audio(input_rate)
+    resampler = StreamingResampler(input_rate)
+    expected = scipy.signal.resample_poly(x.astype(np.float64), resampler.up, resampler.down)
+    expected = np.clip(np.rint(expected), -32768, 32767).astype(np.int16)
+
+    chunk_sizes = np.random.default_rng(0).integers(1, input_rate//10, 100)
+    y = stream(resampler, x, chunk_sizes)
+
+    # The stream lags the whole signal by the delay of the filter, so it ends a few samples earlier
+    assert expected.shape[0] - 2*resampler.delay - 1 <= y.shape[0] <= expected.shape[0]
+    assert np.abs(y.astype(int) - expected[0:y.shape[0]]).max() <= 1
+
+    # The chunk boundaries don't change the output
+    resampler.reset()
+    assert np.array_equal(stream(resampler, x, [input_rate//50]*40), y)
+
+
+def test_zero_length_chunks():
+    x = get_audio(44100)
+    resampler = StreamingResampler(44100)
+    expected = stream(resampler, x, [441]*50)
+
+    resampler.reset()
+    assert resampler(np.zeros(0, dtype=np.int16)).shape == (0, )
+    y = stream(resampler, x, [0, 441, 0, 0] + [441]*49 + [0])
+    assert np.array_equal(y, expected)
@@ -0,0 +1,111 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import asyncio
+import os
+import sys
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server  # noqa: E402
+
+
+class FakeModel:
+    def reset(self):
+        pass
+
+
+# The tasks of the websocket handlers of the test app
+handler_tasks = []
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """The websocket route of the server, with a pool of fake models and no inference"""
+    monkeypatch.setattr(server, "model_pool", server.ModelPool(FakeModel, 2))
+    monkeypatch.setattr(server, "engine", server.InferenceEngine("thread", 1))
+    monkeypatch.setattr(server, "STREAM_QUEUE_SIZE", 2)
+    monkeypatch.setitem(server.metrics, "streams", 0)
+
+    handler_tasks.clear()
+
+    async def websocket_handler(request):
+        handler_tasks.append(asyncio.current_task())
+        return await server.websocket_handler(request)
+
+    app = web.Application()
+    app.add_routes([web.get("/ws", websocket_handler)])
+    yield app
+    server.engine.shutdown()
+
+
+def assert_released():
+    assert server.model_pool.in_use == 0
+    assert server.engine.streams == 0
+    assert server.metrics["streams"] == 0
+
+
+def test_worker_error_with_full_queue(app, monkeypatch):
+    # The worker stops on an error once the queue is full, while the handler is waiting for room in the queue
+    async def failing_process_stream(ws, session):
+        while not session.queue.full():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        raise ConnectionResetError("Cannot write to closing transport")
+
+    monkeypatch.setattr(server, "process_stream", failing_process_stream)
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            ws = await client.ws_connect("/ws")
+            await ws.receive()  # the loaded models
+            for _ in range(server.STREAM_QUEUE_SIZE + 4):
+                await ws.send_bytes(b"\x00\x00"*1280)
+            await asyncio.wait_for(ws.receive(), timeout=5)  # the server closes the socket
+            await ws.close()
+            assert_released()
+
+    asyncio.run(run())
+
+
+def test_cancelled_handler_releases_model(app, monkeypatch):
+    # The handler is cancelled while it waits for the in-flight work of the stream
+    work_done = asyncio.Event()
+
+    async def busy_process_stream(ws, session):
+        await session.queue.get()
+        await work_done.wait()
+
+    monkeypatch.setattr(server, "process_stream", busy_process_stream)
+
+    async def run():
+        async with TestClient(TestServer(app)) as client:
+            ws = await client.ws_connect("/ws")
+            await ws.receive()
+            await ws.send_bytes(b"\x00\x00"*1280)
+            await ws.close()
+            await asyncio.sleep(0.1)
+
+            handler_tasks[0].cancel()
+            await asyncio.sleep(0.1)
+            assert server.model_pool.in_use == 1  # the model isn't reused while the work is in flight
+
+            work_done.set()
+            await asyncio.sleep(0.1)
+            assert_released()
+
+    asyncio.run(run())
@@ -0,0 +1,142 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import gc
+import os
+import sys
+import threading
+import types
+import weakref
+import numpy as np
+import pytest
+from openwakeword.sessions import InterpreterRegistry, SessionRegistry
+
+
+class FakeInterpreter:
+    """A stand-in for `tflite_runtime.interpreter.Interpreter`, for a model that sums each row of its input"""
+    loads = 0
+
+    def __init__(self, model_path, num_threads=1):
+        FakeInterpreter.loads += 1
+        self.shape = [1, 16]
+        self.allocated = False
+
+    def get_input_details(self):
+        return [{"index": 0, "shape": np.array(self.shape)}]
+
+    def get_output_details(self):
+        return [{"index": 1, "shape": np.array([self.shape[0], 1])}]
+
+    def resize_tensor_input(self, index, shape, strict=False):
+        self.shape = list(shape)
+        self.allocated = False
+
+    def allocate_tensors(self):
+        self.allocated = True
+
+    def set_tensor(self, index, x):
+        assert self.allocated and list(x.shape) == self.shape
+        self.x = x
+
+    def invoke(self):
+        self.y = self.x.sum(axis=1, keepdims=True)
+
+    def get_tensor(self, index):
+        return self.y.copy()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    module = types.ModuleType("tflite_runtime.interpreter")
+    module.Interpreter = FakeInterpreter
+    monkeypatch.setitem(sys.modules, "tflite_runtime", types.ModuleType("tflite_runtime"))
+    monkeypatch.setitem(sys.modules, "tflite_runtime.interpreter", module)
+    FakeInterpreter.loads = 0
+    return InterpreterRegistry(max_shapes=4)
+
+
+class TestInterpreterRegistry:
+    def test_mixed_batch_sizes(self, registry):
+        rng = np.random.default_rng(0)
+        for batch_size in rng.integers(1, 200, 500):
+            x = rng.standard_normal((batch_size, 16)).astype(np.float32)
+            y = registry.predict("model.tflite", x)
+            assert y.shape == (batch_size, 1)
+            assert np.allclose(y, x.sum(axis=1, keepdims=True))
+
+        # The model is only loaded once per cached shape, and resized after that
+        assert FakeInterpreter.loads <= registry.max_shapes
+
+    def test_default_shape(self, registry):
+        interpreter = registry.get("model.tflite").interpreter
+        assert registry.get("model.tflite", (1, 16)).interpreter is interpreter
+        registry.predict("model.tflite", np.ones((1, 16), dtype=np.float32))
+        assert FakeInterpreter.loads == 1
+
+
+class FakeSession:
+    pass
+
+
+@pytest.fixture
+def session_registry(monkeypatch):
+    registry = SessionRegistry()
+    monkeypatch.setattr(registry, "_load", lambda *key: FakeSession())
+    return registry
+
+
+class Holder:
+    """An object in a reference cycle, which releases its session when the garbage collector deletes it"""
+    def __init__(self, registry, model_path):
+        self.session = registry.acquire(model_path)
+        self.cycle = self
+        weakref.finalize(self, registry.release, self.session)
+
+
+class TestSessionRegistry:
+    def test_shared_sessions(self, session_registry):
+        session = session_registry.acquire("a.onnx")
+        assert session_registry.acquire("a.onnx") is session
+        session_registry.release(session)
+        assert session_registry.loaded_models() != []
+        session_registry.release(session)
+        assert session_registry.loaded_models() == []
+
+    def test_release_during_acquire(self, session_registry, monkeypatch):
+        # The garbage collector runs the finalizer of an unreachable holder while a model is loaded
+        gc.disable()
+        try:
+            Holder(session_registry, "a.onnx")
+        finally:
+            gc.enable()
+
+        def load(*key):
+            gc.collect()
+            return FakeSession()
+
+        monkeypatch.setattr(session_registry, "_load", load)
+        acquire = threading.Thread(target=session_registry.acquire, args=("b.onnx", ), daemon=True)
+        acquire.start()
+        acquire.join(timeout=5)
+        assert not acquire.is_alive()
+        assert session_registry.loaded_models() == [os.path.abspath("b.onnx")]
+
+    def test_release_while_locked(self, session_registry):
+        # A release on the thread that holds the lock (from a finalizer) is applied once the lock is released
+        session = session_registry.acquire("a.onnx")
+        with session_registry._locked():
+            session_registry.release(session)
+            assert session_registry._sessions != {}
+        assert session_registry.loaded_models() == []
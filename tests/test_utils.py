@@ -0,0 +1,118 @@
+# Copyright 2022 David Scripka. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Imports
+import numpy as np
+import pytest
+from openwakeword.model import predict_streams
+from openwakeword.utils import RingBuffer, _get_embedding_windows, to_int16_pcm
+
+
+class TestToInt16PCM:
+    def test_int16_passes_through(self):
+        x = np.arange(-1000, 1000, dtype=np.int16)
+        assert to_int16_pcm(x) is x
+
+    def test_float_in_int16_range(self):
+        x = np.array([-32768.0, -1000.0, 0.0, 1.0, 1000.0, 32767.0], dtype=np.float32)
+        with pytest.raises(ValueError):
+            to_int16_pcm(x)
+        assert np.array_equal(to_int16_pcm(x, scale=1.0), x.astype(np.int16))
+
+    def test_normalized_float(self):
+        x = np.array([-1.0, -0.5, 0.0, 0.5, 1.0, 2.0])
+        assert np.array_equal(to_int16_pcm(x, scale=32767), [-32767, -16383, 0, 16383, 32767, 32767])
+
+    def test_raw_bytes(self):
+        x = np.arange(-1000, 1000, dtype=np.int16)
+        assert np.array_equal(to_int16_pcm(x.tobytes()), x)
+        assert np.array_equal(to_int16_pcm((x/32767).astype("<f4").tobytes(), dtype="float32", scale=32767), x)
+
+
+class TestFloatInput:
+    """Floating point audio (with its scale) gives the same scores as the same 16-bit audio, on every prediction path"""
+    def test_predict_streams(self, make_model, speech):
+        frames = speech[0:1280*12].reshape(12, 1280)
+        int_models, float_models = [make_model(), make_model()], [make_model(), make_model()]
+        for i in range(0, 12, 2):
+            expected = predict_streams(int_models, list(frames[i:i+2]))
+            with pytest.raises(ValueError):
+                predict_streams(float_models, list(frames[i:i+2].astype(np.float32)))
+            assert predict_streams(float_models, list(frames[i:i+2].astype(np.float32)), scale=1.0) == expected
+
+    def test_predict_streams_raw_bytes(self, make_model, speech):
+        frames = speech[0:1280*4].reshape(4, 1280)
+        int_models, float_models = [make_model()], [make_model()]
+        for frame in frames:
+            assert predict_streams(float_models, [(frame/32767).astype("<f4").tobytes()], dtype="float32", scale=32767) == \
+                predict_streams(int_models, [frame])
+
+    def test_predict_clip_vectorized(self, make_model, speech):
+        model = make_model()
+        expected = model.predict_clip_vectorized(speech)
+        with pytest.raises(ValueError):
+            model.predict_clip_vectorized(speech.astype(np.float32))
+        scores = model.predict_clip_vectorized(speech.astype(np.float32), scale=1.0)
+        assert np.array_equal(scores["alexa_v0.1"], expected["alexa_v0.1"])
+
+        blocks = model.iter_clip_scores(speech.astype(np.float32), vectorized=True, scale=1.0)
+        assert np.array_equal(np.concatenate([block["alexa_v0.1"] for block in blocks]), expected["alexa_v0.1"])
+
+
+class TestRingBuffer:
+    def test_wraparound(self):
+        rng = np.random.default_rng(0)
+        ring = RingBuffer(10, (3, ), dtype=np.float32)
+        expected = np.empty((0, 3), dtype=np.float32)
+        for n_rows in [1, 4, 1, 7, 10, 1, 13, 2, 9, 1, 1, 1, 5]:
+            x = rng.standard_normal((n_rows, 3)).astype(np.float32)
+            ring.append(x)
+            expected = np.concatenate((expected, x))[-10:]
+            assert len(ring) == expected.shape[0]
+            assert np.array_equal(ring.view(), expected)
+            assert np.shares_memory(ring.view(), ring.data)  # a view, not a copy
+
+    def test_read_longer_than_fill_level(self):
+        ring = RingBuffer(8, dtype=np.int16)
+        ring.append(np.arange(1, 4, dtype=np.int16))
+        assert np.array_equal(ring.view()[-6:], [1, 2, 3])
+
+        # After wrapping around, only the rows in the buffer are returned (not the older rows of the mirrored copy)
+        ring.append(np.arange(4, 15, dtype=np.int16))
+        assert np.array_equal(ring.view()[-20:], np.arange(7, 15))
+
+        ring.clear()
+        ring.append(np.array([20, 21], dtype=np.int16))
+        assert np.array_equal(ring.view()[-5:], [20, 21])
+
+
+class TestEmbeddingWindows:
+    def test_same_as_sliced_windows(self):
+        rng = np.random.default_rng(0)
+        for n_frames in [75, 76, 83, 84, 97, 100, 76 + 8*20]:
+            spec = rng.standard_normal((n_frames, 32)).astype(np.float32)
+            windows = _get_embedding_windows(spec)
+            sliced = np.array([spec[i:i+76] for i in range(0, n_frames - 76 + 1, 8)]).reshape(-1, 76, 32)
+            assert windows.shape == sliced.shape
+            assert np.array_equal(windows, sliced)
+
+            # With a batch dimension
+            specs = np.stack([spec, spec + 1])
+            assert np.array_equal(_get_embedding_windows(specs), np.stack([sliced, sliced + 1]))
+
+    def test_custom_window(self):
+        spec = np.arange(40, dtype=np.float32).reshape(20, 2)
+        windows = _get_embedding_windows(spec, window_size=5, step_size=3)
+        assert np.array_equal(windows, [spec[i:i+5] for i in range(0, 16, 3)])
+        assert not windows.flags.writeable